@@ -1,5 +1,6 @@
 import logging
 import os
+import re
 import sys
 from logging.config import fileConfig
 
@@ -22,6 +23,8 @@ target_metadata = Base.metadata
 # access to the values within the .ini file in use.
 config = context.config
 config.set_main_option('sqlalchemy.url', settings.DB_URI)
+# Text search configuration the products fulltext index is built for.
+config.attributes.setdefault('check_search_config', settings.CHECK_SEARCH_CONFIG)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -32,6 +35,27 @@ if settings.TESTING:
     logging.getLogger('alembic').setLevel(logging.WARNING)
 
 
+# Monthly partitions, created and dropped by the manage-partitions command.
+PARTITION_NAME = re.compile(r'.+_y\d{4}m\d{2}')
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:  # noqa: A002
+    """
+    Leaves model indexes on optional extensions to their migration, which checks for the extension,
+    and partitions with the indexes and foreign keys Postgres clones onto them out of autogenerate.
+    """
+    if type_ == 'index' and not reflected and compare_to is None:
+        return 'requires_extension' not in object.info
+    if reflected and compare_to is None:
+        if type_ == 'table':
+            return not PARTITION_NAME.fullmatch(name)
+        if type_ == 'index':
+            return not PARTITION_NAME.fullmatch(object.table.name)
+        if type_ == 'foreign_key_constraint':
+            return not PARTITION_NAME.fullmatch(object.referred_table.name)
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -48,6 +72,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={'paramstyle': 'named'},
     )
@@ -70,7 +95,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,36 @@
+"""add access path indexes
+
+Revision ID: 9b41e6c07d15
+Revises: 3c8f1a9d2e47
+Create Date: 2026-10-18 11:40:07.216503
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b41e6c07d15'
+down_revision = '3c8f1a9d2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY does not lock writes but cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_checks_user_created_at_uuid',
+            'checks',
+            ['user', sa.text('created_at DESC'), sa.text('uuid DESC')],
+            postgresql_concurrently=True,
+        )
+        op.create_index('ix_products_check', 'products', ['check'], postgresql_concurrently=True)
+        op.create_index('ix_payments_check', 'payments', ['check'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_payments_check', table_name='payments', postgresql_concurrently=True)
+        op.drop_index('ix_products_check', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_checks_user_created_at_uuid', table_name='checks', postgresql_concurrently=True)
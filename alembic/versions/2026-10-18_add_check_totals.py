@@ -0,0 +1,53 @@
+"""add check totals
+
+Revision ID: 3c8f1a9d2e47
+Revises: 76b27459a403
+Create Date: 2026-10-18 10:12:31.508214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8f1a9d2e47'
+down_revision = '76b27459a403'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('checks', sa.Column('total', sa.Float(), server_default='0', nullable=False))
+    op.add_column('checks', sa.Column('rest', sa.Float(), server_default='0', nullable=False))
+    op.add_column('checks', sa.Column('product_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill from the raw rows, aggregated separately so products and payments do not multiply.
+    op.execute(
+        """
+        UPDATE checks
+        SET total = coalesce(products.total, 0),
+            product_count = coalesce(products.product_count, 0),
+            rest = coalesce(payments.amount, 0) - coalesce(products.total, 0)
+        FROM checks AS c
+        LEFT JOIN (
+            SELECT "check", sum(price * quantity) AS total, count(*) AS product_count
+            FROM products
+            GROUP BY "check"
+        ) AS products ON products."check" = c.uuid
+        LEFT JOIN (
+            SELECT "check", sum(amount) AS amount
+            FROM payments
+            GROUP BY "check"
+        ) AS payments ON payments."check" = c.uuid
+        WHERE c.uuid = checks.uuid
+        """
+    )
+    op.create_index('ix_checks_user_total', 'checks', ['user', 'total'])
+    op.create_index('ix_checks_user_rest', 'checks', ['user', 'rest'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_checks_user_rest', table_name='checks')
+    op.drop_index('ix_checks_user_total', table_name='checks')
+    op.drop_column('checks', 'product_count')
+    op.drop_column('checks', 'rest')
+    op.drop_column('checks', 'total')
@@ -0,0 +1,65 @@
+"""add daily totals
+
+Revision ID: 5d2a7c4e81f3
+Revises: e27d5f0b93a6
+Create Date: 2026-10-18 16:40:12.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a7c4e81f3'
+down_revision = 'e27d5f0b93a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_totals',
+        sa.Column('user', postgresql.UUID(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        # Stored as text like payments.type, so the rollup is filled from it without casts.
+        sa.Column(
+            'payment_type',
+            sa.Enum('CASH', 'CASHLESS', name='paymenttype', native_enum=False, create_constraint=False),
+            nullable=False,
+        ),
+        sa.Column('check_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total', sa.Float(), server_default='0', nullable=False),
+        sa.Column('cash', sa.Float(), server_default='0', nullable=False),
+        sa.Column('cashless', sa.Float(), server_default='0', nullable=False),
+        sa.Column('rest', sa.Float(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(
+            ['user'], ['users.uuid'], name=op.f('fk_daily_totals_user_users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('user', 'date', 'payment_type', name=op.f('pk_daily_totals')),
+    )
+    # Backfill, same aggregation as `reconcile-daily-totals`.
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO daily_totals ("user", date, payment_type, check_count, total, cash, cashless, rest)
+            SELECT checks."user",
+                   timezone(:timezone, checks.created_at)::date,
+                   payments.type,
+                   count(*),
+                   sum(checks.total),
+                   sum(CASE WHEN payments.type = 'CASH' THEN payments.amount ELSE 0 END),
+                   sum(CASE WHEN payments.type = 'CASHLESS' THEN payments.amount ELSE 0 END),
+                   sum(checks.rest)
+            FROM checks
+            JOIN payments ON payments."check" = checks.uuid
+            WHERE checks."user" IS NOT NULL AND checks.created_at IS NOT NULL
+            GROUP BY 1, 2, 3
+            """
+        ).bindparams(timezone=settings.CHECK_REPORT_TIMEZONE)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_totals')
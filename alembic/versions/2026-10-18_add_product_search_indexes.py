@@ -0,0 +1,57 @@
+"""add product search indexes
+
+Revision ID: e27d5f0b93a6
+Revises: 9b41e6c07d15
+Create Date: 2026-10-18 14:05:52.731940
+
+"""
+import logging
+
+from alembic import context
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e27d5f0b93a6'
+down_revision = '9b41e6c07d15'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def upgrade() -> None:
+    has_trgm = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"),
+    ).scalar()
+    if has_trgm:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    else:
+        # Substring search keeps working, only without an index.
+        logger.warning('pg_trgm is not available, skipping ix_products_name_trgm')
+    with op.get_context().autocommit_block():
+        if has_trgm:
+            op.create_index(
+                'ix_products_name_trgm',
+                'products',
+                ['name'],
+                postgresql_using='gin',
+                postgresql_ops={'name': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+        # Built for the configuration the search queries with, passed in by env.py.
+        search_config = context.config.attributes.get('check_search_config', 'simple')
+        op.create_index(
+            'ix_products_name_tsv',
+            'products',
+            [sa.text(f"to_tsvector('{search_config}'::regconfig, name)")],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_products_name_tsv')
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_products_name_trgm')
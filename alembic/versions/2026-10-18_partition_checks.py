@@ -0,0 +1,128 @@
+"""partition checks
+
+Revision ID: a4c19e7d2b60
+Revises: 5d2a7c4e81f3
+Create Date: 2026-10-18 18:05:37.512804
+
+Converts checks, products and payments into tables range partitioned by month of
+created_at. The tables are rebuilt and their rows copied, run it with the writers
+stopped, on big tables it takes a while.
+
+"""
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c19e7d2b60'
+down_revision = '5d2a7c4e81f3'
+branch_labels = None
+depends_on = None
+
+TABLES = ('checks', 'products', 'payments')
+LINE_TABLES = ('products', 'payments')
+# Months after the current one, later ones are created by the manage-partitions command.
+PRECREATE_MONTHS = 3
+
+
+def get_month(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition(table: str, month: date) -> None:
+    """Same naming and bounds as sdk.partitions.MonthlyPartitions at the time of writing."""
+    op.execute(
+        f'CREATE TABLE IF NOT EXISTS {table}_y{month.year:04d}m{month.month:02d} PARTITION OF {table} '
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def get_indexes(tables: tuple) -> list:
+    """Definitions of the secondary indexes, recreated on the rebuilt tables."""
+    rows = op.get_bind().execute(
+        sa.text(
+            'SELECT indexdef FROM pg_indexes '
+            "WHERE schemaname = current_schema() AND tablename IN :tables AND indexname NOT LIKE 'pk\\_%'"
+        ).bindparams(sa.bindparam('tables', expanding=True)),
+        {'tables': list(tables)},
+    )
+    return [row[0] for row in rows]
+
+
+def rebuild(partitioned: bool) -> None:
+    indexes = get_indexes(TABLES)
+    for table in TABLES:
+        op.rename_table(table, f'{table}_old')
+        op.execute(
+            f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS)'
+            + (' PARTITION BY RANGE (created_at)' if partitioned else '')
+        )
+    if partitioned:
+        for table in TABLES:
+            op.alter_column(table, 'created_at', nullable=False)
+        now = datetime.now(timezone.utc)
+        first = op.get_bind().execute(
+            sa.text(' UNION ALL '.join(f'SELECT min(created_at) FROM {table}_old' for table in TABLES)),
+        ).fetchall()
+        first = min((row[0] for row in first if row[0] is not None), default=None)
+        month = get_month(min(first or now, now))
+        last = add_months(get_month(now), PRECREATE_MONTHS)
+        while month <= last:
+            for table in TABLES:
+                create_partition(table, month)
+            month = add_months(month, 1)
+        # Lines get the created_at of their check, the partitions of a check and its lines match.
+        op.execute(
+            'INSERT INTO checks (uuid, created_at, updated_at, "user", total, rest, product_count) '
+            'SELECT uuid, coalesce(created_at, now()), updated_at, "user", total, rest, product_count FROM checks_old'
+        )
+        op.execute(
+            'INSERT INTO products (uuid, created_at, updated_at, name, price, quantity, "check") '
+            'SELECT lines.uuid, coalesce(checks.created_at, lines.created_at, now()), lines.updated_at, '
+            'lines.name, lines.price, lines.quantity, lines."check" '
+            'FROM products_old AS lines LEFT JOIN checks ON checks.uuid = lines."check"'
+        )
+        op.execute(
+            'INSERT INTO payments (uuid, created_at, updated_at, type, amount, "check") '
+            'SELECT lines.uuid, coalesce(checks.created_at, lines.created_at, now()), lines.updated_at, '
+            'lines.type, lines.amount, lines."check" '
+            'FROM payments_old AS lines LEFT JOIN checks ON checks.uuid = lines."check"'
+        )
+    else:
+        for table in TABLES:
+            op.alter_column(table, 'created_at', nullable=True)
+            op.execute(f'INSERT INTO {table} SELECT * FROM {table}_old')
+    for table in reversed(TABLES):
+        op.drop_table(f'{table}_old')
+
+    primary_key = ['uuid', 'created_at'] if partitioned else ['uuid']
+    check_key = ['check', 'created_at'] if partitioned else ['check']
+    for table in TABLES:
+        op.create_primary_key(f'pk_{table}', table, primary_key)
+    op.create_foreign_key('fk_checks_user_users', 'checks', 'users', ['user'], ['uuid'], ondelete='CASCADE')
+    for table in LINE_TABLES:
+        op.create_foreign_key(
+            f'fk_{table}_check_checks', table, 'checks', check_key, primary_key, ondelete='CASCADE',
+        )
+    for index in indexes:
+        op.execute(index)
+
+
+def upgrade() -> None:
+    rebuild(partitioned=True)
+
+
+def downgrade() -> None:
+    rebuild(partitioned=False)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Optional
+
+from cache import LocalCache
+from cache import RedisPool
+from cache import redis_pool
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Users whose tokens were revoked, the uuid is published with every revocation.
+REVOCATIONS_CHANNEL = 'auth:revocations'
+
+# Revocations of recently authenticated users, keyed by user uuid, evicted on REVOCATIONS_CHANNEL messages.
+revocation_cache = LocalCache(
+    name='revocations',
+    max_size=settings.AUTH_REVOCATION_CACHE_SIZE,
+)
+
+# Payloads and users of access tokens whose signature was verified, kept until the tokens expire.
+# Revocations are checked on every request still, against revocation_cache.
+token_cache = LocalCache(
+    name='tokens',
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+)
+
+
+class RevocationListener:
+    """
+    Evicts the cached revocations of a user in this worker as soon as any worker revokes its tokens.
+
+    Messages published while the subscription is down are lost, all cached revocations
+    are dropped once it is restored.
+    """
+
+    retry_delay: float = 1.0
+
+    def __init__(self, pool: RedisPool, channel: str = REVOCATIONS_CHANNEL) -> None:
+        self.pool = pool
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def handle(message: bytes) -> None:
+        revocation_cache.evict(message.decode('utf-8'))
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                redis = await self.pool.connect()
+                # Revocations cached before the subscription may have been missed.
+                async for message in redis.listen(self.channel, on_subscribe=revocation_cache.clear):
+                    self.handle(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Reported to Sentry by its logging integration, the listener must keep running.
+                logger.exception('Revocations subscription failed, retrying in %s s', self.retry_delay)
+            await asyncio.sleep(self.retry_delay)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+revocation_listener = RevocationListener(redis_pool)
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import FrozenSet
+
+from sdk.records import BaseRecord
+
+
+@dataclass
+class Revocations(BaseRecord):
+    """Revoked tokens of a user, tokens of an older generation and tokens of revoked sessions."""
+
+    __slots__ = ('version', 'sessions')
+
+    version: int
+    sessions: FrozenSet[str]
+
+    def is_revoked(self, version: int, session_id: str) -> bool:
+        return version < self.version or session_id in self.sessions
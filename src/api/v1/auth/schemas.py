@@ -21,6 +21,11 @@ class Session(BaseSchema):
         return datetime.now() + timedelta(minutes=settings.JWT_REFRESH_TOKEN_EXP_DELTA_MINUTES)
 
 
+class ActiveSession(BaseSchema):
+    expires_in: datetime
+    current: bool = False
+
+
 class AuthorizationBase(BaseSchema):
     email: EmailStr
     password: constr(strip_whitespace=True, min_length=8, max_length=20) = None
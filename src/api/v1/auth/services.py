@@ -1,12 +1,22 @@
+import time
 import uuid
 import jwt
 from datetime import datetime
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Tuple
+from typing import Union
 from cache import RedisBackend
+from cache import RedisScript
 from config import settings
+from api.v1.auth.cache import REVOCATIONS_CHANNEL
+from api.v1.auth.cache import revocation_cache
+from api.v1.auth.records import Revocations
+from api.v1.auth.schemas import ActiveSession
 from api.v1.auth.schemas import Session
+from api.v1.users.records import UserRecord
 from api.v1.users.schemas import User
 from api.v1.users.schemas import UserCreateInDb
 from api.v1.users.schemas import UserCreate
@@ -28,11 +38,15 @@ class TokenService:
             sub: str,
             expires_in: datetime,
             algorithm: str,
+            session_id: Optional[str] = None,
+            version: int = 0,
     ) -> str:
         body = {
             'iat': datetime.utcnow(),
             'exp': expires_in,
             'sub': sub,
+            'sid': session_id,
+            'ver': version,
             'data': payload,
         }
         return jwt.encode(
@@ -49,11 +63,15 @@ class TokenService:
             sub: str,
             expires_in: datetime,
             algorithm: str,
+            session_id: Optional[str] = None,
+            version: int = 0,
     ) -> str:
         body = {
             'iat': datetime.utcnow(),
             'exp': expires_in,
             'sub': sub,
+            'sid': session_id,
+            'ver': version,
         }
         return jwt.encode(
             payload=body,
@@ -66,73 +84,277 @@ class TokenService:
     def get_payload(
             cls,
             token: str,
+            verify_exp: bool = True,
     ) -> Optional[Dict[str, Any]]:
         try:
-            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.AUTH_JWT_ALGORITHM])
+            return jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=[settings.AUTH_JWT_ALGORITHM],
+                options={'verify_exp': verify_exp},
+            )
         except jwt.PyJWTError:
             return None
 
 
+# Lua function shared by the session scripts: adds a session to the index of its user, scored by when
+# it expires, and drops the expired ones. The index is kept as long as its longest living session.
+INDEX_SESSION_FUNCTION = """
+    local function index_session(index, session, expire, now)
+        redis.call('ZREMRANGEBYSCORE', index, '-inf', now)
+        redis.call('ZADD', index, now + expire, session)
+        if redis.call('TTL', index) < tonumber(expire) then
+            redis.call('EXPIRE', index, expire)
+        end
+    end
+"""
+
+# Lua function shared by the session scripts: revokes the tokens of a session until its access token
+# expires and drops the sessions whose access tokens expired. The generation of the user is kept.
+REVOKE_SESSION_FUNCTION = """
+    local function revoke_session(revocations, session_id, expires_at, now)
+        local fields = redis.call('HGETALL', revocations)
+        for i = 1, #fields, 2 do
+            if fields[i] ~= 'ver' and tonumber(fields[i + 1]) <= tonumber(now) then
+                redis.call('HDEL', revocations, fields[i])
+            end
+        end
+        if tonumber(expires_at) > tonumber(now) then
+            redis.call('HSET', revocations, session_id, expires_at)
+        end
+    end
+"""
+
+# Indexes a stored session, for sessions stored before the index existed.
+# KEYS: the session index of the user.
+# ARGV: the session key, seconds the session is still kept, the current unix time.
+INDEX_SESSION = RedisScript(
+    'index_session',
+    INDEX_SESSION_FUNCTION + """
+    index_session(KEYS[1], ARGV[1], ARGV[2], ARGV[3])
+    return 1
+    """,
+)
+
+# Revokes the tokens of a session.
+# KEYS: the revocations of the user.
+# ARGV: the session id, the unix time its access token expires, the current unix time.
+REVOKE_SESSION = RedisScript(
+    'revoke_session',
+    REVOKE_SESSION_FUNCTION + """
+    revoke_session(KEYS[1], ARGV[1], ARGV[2], ARGV[3])
+    return 1
+    """,
+)
+
+# Stores a new session and indexes it.
+# KEYS: the session, the session index of the user.
+# ARGV: the user uuid, seconds the session is kept, the current unix time.
+CREATE_SESSION = RedisScript(
+    'create_session',
+    INDEX_SESSION_FUNCTION + """
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    index_session(KEYS[2], KEYS[1], ARGV[2], ARGV[3])
+    return 1
+    """,
+)
+
+# Replaces the session of a refresh with a new one if the session exists and its tokens are not revoked.
+# KEYS: the revocations of the user, the session, the new session, the session index of the user.
+# ARGV: the session id, the unix time its access token expires, its generation, the user uuid,
+# seconds the new session is kept, the current unix time, the channel the revocation is published on.
+ROTATE_SESSION = RedisScript(
+    'rotate_session',
+    INDEX_SESSION_FUNCTION + REVOKE_SESSION_FUNCTION + """
+    local version = tonumber(redis.call('HGET', KEYS[1], 'ver') or 0)
+    if version > tonumber(ARGV[3]) or redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+        return 0
+    end
+    if redis.call('EXISTS', KEYS[2]) == 0 then
+        return 0
+    end
+    revoke_session(KEYS[1], ARGV[1], ARGV[2], ARGV[6])
+    redis.call('DEL', KEYS[2])
+    redis.call('ZREM', KEYS[4], KEYS[2])
+    redis.call('SET', KEYS[3], ARGV[4], 'EX', ARGV[5])
+    index_session(KEYS[4], KEYS[3], ARGV[5], ARGV[6])
+    redis.call('PUBLISH', ARGV[7], ARGV[4])
+    return 1
+    """,
+)
+
+
 class SessionService:
     user_schema: User = User
+    # Seconds a session is kept, as long as its refresh token is valid.
+    session_expire: int = settings.JWT_REFRESH_TOKEN_EXP_DELTA_MINUTES * 60
+
+    @staticmethod
+    def get_session_key(refresh_token: str, access_token: str, user_id: Union[str, uuid.UUID]) -> str:
+        return f'{refresh_token}:{access_token}:{user_id}'
+
+    @staticmethod
+    def parse_session_key(key: Union[str, bytes]) -> Optional[Tuple[str, str, str]]:
+        """Refresh token, access token and user id of a session key, None for other keys."""
+        if isinstance(key, bytes):
+            key = key.decode('utf-8')
+        parts = key.split(':')
+        if len(parts) != 3 or parts[0].count('.') != 2 or parts[1].count('.') != 2:
+            return None
+        return parts[0], parts[1], parts[2]
+
+    @staticmethod
+    def get_index_key(user_id: Union[str, uuid.UUID]) -> str:
+        """Sorted set of the session keys of the user, scored by the unix time they expire."""
+        return f'sessions:{user_id}'
+
+    @staticmethod
+    def get_revocations_key(user_id: Union[str, uuid.UUID]) -> str:
+        """Hash of the generation of the user's tokens, `ver`, and of its revoked sessions until they expire."""
+        return f'revocations:{user_id}'
+
+    @staticmethod
+    def get_session_id(payload: Dict[str, Any], access_token: str) -> str:
+        # Tokens issued before session ids stand for their own session.
+        return payload.get('sid') or access_token
 
     @classmethod
-    async def create_session(
+    async def get_version(cls, redis: RedisBackend, user_id: Union[str, uuid.UUID]) -> int:
+        """Current generation of the user's tokens, read from Redis, new tokens must not be issued stale."""
+        return int(await redis.hget(cls.get_revocations_key(user_id), 'ver') or 0)
+
+    @classmethod
+    async def load_revocations(cls, redis: RedisBackend, user_id: Union[str, uuid.UUID]) -> Revocations:
+        fields = await redis.hgetall(cls.get_revocations_key(user_id))
+        version = int(fields.pop(b'ver', 0))
+        now = int(time.time())
+        sessions = frozenset(session_id.decode() for session_id, expires_at in fields.items() if int(expires_at) > now)
+        return Revocations(version=version, sessions=sessions)
+
+    @classmethod
+    async def get_revocations(cls, redis: RedisBackend, user_id: Union[str, uuid.UUID]) -> Revocations:
+        """Revocations of the user, this worker reuses them until a revocation of the user is published."""
+        key = str(user_id)
+        revocations = revocation_cache.get(key)
+        if revocations is None:
+            evictions = revocation_cache.evictions
+            revocations = await cls.load_revocations(redis, key)
+            # A revocation published during the load may be missing from it, it is used once only then.
+            if revocation_cache.evictions == evictions:
+                revocation_cache.set(key, revocations, time.time() + settings.AUTH_REVOCATION_CACHE_EXPIRE)
+        return revocations
+
+    @classmethod
+    async def is_revoked(cls, redis: RedisBackend, payload: Dict[str, Any], access_token: str) -> bool:
+        revocations = await cls.get_revocations(redis, payload['sub'])
+        return revocations.is_revoked(payload.get('ver', 0), cls.get_session_id(payload, access_token))
+
+    @classmethod
+    def new_session(
             cls,
-            redis: RedisBackend,
-            user: user_schema,
-    ) -> Session:
+            user: UserRecord,
+            version: int = 0,
+    ) -> Tuple[Session, str]:
+        """Tokens of a new session of `user` of generation `version` and the key it is stored under."""
         expires_in = Session.get_access_token_expires()
+        session_id = uuid.uuid4().hex
         access_token = TokenService.create_access(
-            payload=user.dict(),
+            # Only the fields of user_schema, the token must not carry the password hash.
+            payload={name: getattr(user, name) for name in cls.user_schema.__fields__},
             secret_key=settings.SECRET_KEY,
             sub=str(user.uuid),
             expires_in=expires_in,
             algorithm=settings.AUTH_JWT_ALGORITHM,
+            session_id=session_id,
+            version=version,
         )
         refresh_token = TokenService.create_refresh(
             secret_key=settings.SECRET_KEY,
             sub=str(user.uuid),
             expires_in=Session.get_refresh_token_expires(),
             algorithm=settings.AUTH_JWT_ALGORITHM,
+            session_id=session_id,
+            version=version,
         )
-        await redis.set(
-            f'{refresh_token}:{access_token}:{user.uuid}',
-            str(user.uuid),
-            expire=settings.JWT_REFRESH_TOKEN_EXP_DELTA_MINUTES,
-        )
-        return Session(
+        session = Session(
             access_token=access_token,
             refresh_token=refresh_token,
             expires_in=expires_in,
         )
+        return session, cls.get_session_key(refresh_token, access_token, user.uuid)
+
+    @classmethod
+    async def create_session(
+            cls,
+            redis: RedisBackend,
+            user: UserRecord,
+    ) -> Session:
+        session, key = cls.new_session(user, await cls.get_version(redis, user.uuid))
+        await redis.run_script(
+            CREATE_SESSION.name,
+            keys=[key, cls.get_index_key(user.uuid)],
+            args=[str(user.uuid), cls.session_expire, int(time.time())],
+        )
+        return session
+
+    @classmethod
+    async def get_sessions(
+            cls,
+            redis: RedisBackend,
+            user_id: Union[str, uuid.UUID],
+    ) -> List[Tuple[str, int]]:
+        """Keys of the live sessions of the user and the unix time they expire, read from the index."""
+        members = await redis.zrangebyscore(cls.get_index_key(user_id), min_score=int(time.time()))
+        return [(key.decode('utf-8'), int(score)) for key, score in members]
+
+    @classmethod
+    async def list_sessions(
+            cls,
+            redis: RedisBackend,
+            user_id: Union[str, uuid.UUID],
+            access_token: str,
+    ) -> List[ActiveSession]:
+        return [
+            ActiveSession(
+                expires_in=datetime.fromtimestamp(expires_at),
+                current=cls.parse_session_key(key)[1] == access_token,
+            )
+            for key, expires_at in await cls.get_sessions(redis, user_id)
+        ]
 
     @classmethod
     async def logout(cls, access_token: str, redis: RedisBackend) -> None:
         payload = TokenService.get_payload(access_token)
-        expires_in = payload['exp'] if payload else 0
-        await redis.set(
-            f'bl:{access_token}',
-            access_token,
-            expire=expires_in,
-        )
+        if payload is None:
+            return
+        user_id = payload['sub']
+        index_key = cls.get_index_key(user_id)
+        # Only the sessions of this user are scanned, the refresh token is not known here.
+        sessions = [key for key, _ in await redis.zscan(index_key, cls.get_session_key('*', access_token, '*'))]
+        async with redis.pipeline() as pipeline:
+            pipeline.run_script(
+                REVOKE_SESSION.name,
+                keys=[cls.get_revocations_key(user_id)],
+                args=[cls.get_session_id(payload, access_token), payload['exp'], int(time.time())],
+            )
+            if sessions:
+                pipeline.delete(*sessions)
+                pipeline.zrem(index_key, *sessions)
+            pipeline.publish(REVOCATIONS_CHANNEL, user_id)
+        revocation_cache.evict(user_id)
 
     @classmethod
     async def logout_all(
             cls,
-            user_id: uuid.UUID,
+            user_id: Union[str, uuid.UUID],
             redis: RedisBackend,
     ) -> None:
-        key = f'*:*:{user_id}'
-        keys = await redis.keys(key)
-        expire = (datetime.now() - Session.get_access_token_expires()).seconds
-        for key in keys:
-            access_token = key.decode('utf-8').split(':')[2]
-            await redis.set(
-                f'bl:{access_token}',
-                access_token,
-                expire=expire,
-            )
+        """Revoke every token of the user by moving it to the next generation, its sessions are forgotten."""
+        async with redis.pipeline() as pipeline:
+            pipeline.hincrby(cls.get_revocations_key(user_id), 'ver')
+            pipeline.delete(cls.get_index_key(user_id))
+            pipeline.publish(REVOCATIONS_CHANNEL, str(user_id))
+        revocation_cache.evict(str(user_id))
 
     @classmethod
     async def refresh_session(
@@ -146,20 +368,40 @@ class SessionService:
             message='Token invalid or expired',
         )
         refresh_payload = TokenService.get_payload(refresh_token)
-        if refresh_payload is None:
+        # Refreshing is what expired access tokens are for, only their signature has to hold.
+        access_payload = TokenService.get_payload(access_token, verify_exp=False)
+        if refresh_payload is None or access_payload is None:
             raise token_invalid
         user_id = refresh_payload.get('sub')
         if user_id is None:
             raise token_invalid
         user = await UserService.get_user(uuid=user_id)
-        in_blacklist = await redis.get(f'bl:{access_token}')
-        if in_blacklist:
-            raise token_invalid
-        session = await redis.get(f'{refresh_token}:{access_token}:{user_id}')
-        if session is None:
+        # The new session stays in the generation of the old one, the script refuses older generations.
+        version = refresh_payload.get('ver', 0)
+        session, key = cls.new_session(user, version)
+        # The checks, the revocation of the old session and the new one in one round trip.
+        rotated = await redis.run_script(
+            ROTATE_SESSION.name,
+            keys=[
+                cls.get_revocations_key(user.uuid),
+                cls.get_session_key(refresh_token, access_token, user_id),
+                key,
+                cls.get_index_key(user.uuid),
+            ],
+            args=[
+                cls.get_session_id(refresh_payload, access_token),
+                access_payload['exp'],
+                version,
+                str(user.uuid),
+                cls.session_expire,
+                int(time.time()),
+                REVOCATIONS_CHANNEL,
+            ],
+        )
+        revocation_cache.evict(str(user.uuid))
+        if not rotated:
             raise token_invalid
-        await cls.logout(access_token, redis)
-        return await cls.create_session(user=user, redis=redis)
+        return session
 
 
 class AuthorizationService:
@@ -175,7 +417,7 @@ class AuthorizationService:
     async def register(
             cls,
             user: UserCreate,
-    ) -> User:
+    ) -> UserRecord:
         user_in_db = UserCreateInDb(
             email=user.email,
             name=user.name,
@@ -1,3 +1,5 @@
+from typing import List
+
 from cache import RedisBackend
 from dependencies import cache_storage
 from dependencies import get_access_token
@@ -9,13 +11,16 @@ from fastapi import Depends
 from fastapi_utils.cbv import cbv
 from fastapi_utils.inferring_router import InferringRouter
 from transaction import Transaction
+from api.v1.auth.schemas import ActiveSession
 from api.v1.auth.schemas import Session
 from api.v1.auth.schemas import AuthorizationBase
 from api.v1.auth.services import AuthorizationService
 from api.v1.auth.services import SessionService
+from api.v1.users.schemas import User
 from api.v1.users.schemas import UserCreate
 from api.v1.users.services import UserService
 from sdk.exceptions.exceptions import make_error
+from sdk.responses import ConditionalRequest
 from sdk.responses import DefaultResponse
 from sdk.responses import ResponseStatus
 from sdk.responses import DefaultResponseSchema
@@ -78,7 +83,6 @@ class AuthorizationViews:
         '/refresh-token',
         name='auth:refresh-token',
         response_model=DefaultResponseSchema[Session],
-        dependencies=[Depends(get_authenticated_user)],
     )
     async def refresh_token(
         self,
@@ -110,3 +114,33 @@ class AuthorizationViews:
     ) -> DefaultResponse:
         await SessionService.logout(access_token, redis)
         return DefaultResponse()
+
+    @router.delete(
+        '/logout-all',
+        name='auth:logout-all',
+        response_model=DefaultResponseSchema,
+    )
+    async def logout_all(
+        self,
+        *,
+        redis: RedisBackend = Depends(cache_storage),
+        user: User = Depends(get_authenticated_user),
+    ) -> DefaultResponse:
+        await SessionService.logout_all(user.uuid, redis)
+        return DefaultResponse()
+
+    @router.get(
+        '/sessions',
+        name='auth:sessions',
+        response_model=DefaultResponseSchema[List[ActiveSession]],
+    )
+    async def get_sessions(
+        self,
+        *,
+        redis: RedisBackend = Depends(cache_storage),
+        access_token: str = Depends(get_access_token),
+        user: User = Depends(get_authenticated_user),
+        conditional: ConditionalRequest = Depends(ConditionalRequest),
+    ) -> DefaultResponse:
+        sessions = await SessionService.list_sessions(redis, user.uuid, access_token)
+        return DefaultResponse(content=sessions, conditional=conditional)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from cache import TieredCache
+from config import settings
+from pydantic.json import pydantic_encoder
+
+from api.v1.checks.schemas import CheckSchema
+
+
+def _encode(o: Any) -> Any:  # noqa: ANN401, VNE001
+    # Keep full datetime precision, the API datetime format drops it.
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return pydantic_encoder(o)
+
+
+# Authenticated reads, keyed by owner and check so a check is only served to its owner.
+check_cache = TieredCache(
+    name='check',
+    max_size=settings.CHECK_CACHE_LOCAL_SIZE,
+    expire=settings.CHECK_CACHE_EXPIRE,
+    dumps=lambda check: check.json(encoder=_encode),
+    loads=CheckSchema.parse_raw,
+)
+
+# Public receipts, stored rendered so a read is a single GET.
+receipt_cache = TieredCache(
+    name='receipt',
+    max_size=settings.CHECK_CACHE_LOCAL_SIZE,
+    expire=settings.CHECK_CACHE_EXPIRE,
+    dumps=lambda text: text.encode(),
+    loads=lambda raw: raw.decode() if isinstance(raw, bytes) else raw,
+)
+
+
+def get_check_key(check_uuid: UUID, user_uuid: UUID) -> str:
+    return f'{user_uuid}:{check_uuid}'
+
+
+def get_receipt_key(check_uuid: UUID) -> str:
+    return str(check_uuid)
@@ -4,3 +4,8 @@ from enum import Enum
 class PaymentType(str, Enum):
     CASH = 'CASH'
     CASHLESS = 'CASHLESS'
+
+
+class SearchMode(str, Enum):
+    TRIGRAM = 'trigram'
+    FULLTEXT = 'fulltext'
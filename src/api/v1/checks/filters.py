@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from fastapi import Query
+
+from api.v1.checks import enums
+
+
+class CheckFilters:
+    """Filters of a user's checks, shared by the list, export and report routes."""
+
+    def __init__(
+            self,
+            search_query: Optional[str] = Query(None, alias='search'),
+            search_mode: enums.SearchMode = Query(
+                enums.SearchMode.TRIGRAM, alias='search_mode',
+                description='trigram: substring match, fulltext: ranked word match',
+            ),
+            created_at_before: Optional[datetime] = Query(
+                None, alias='created_at_before',
+                description='Example: 2024-04-01T00:00:00'
+            ),
+            created_at_after: Optional[datetime] = Query(
+                None, alias='created_at_after',
+                description='Example 2024-04-01T00:00:00'
+            ),
+            total_gte: Optional[int] = Query(None, alias='total_gte'),
+            total_lte: Optional[int] = Query(None, alias='total_lte'),
+            payment_type: Optional[enums.PaymentType] = Query(None, alias='payment_type'),
+    ) -> None:
+        self.search_query = search_query
+        self.search_mode = search_mode
+        self.created_at_before = created_at_before
+        self.created_at_after = created_at_after
+        self.total_gte = total_gte
+        self.total_lte = total_lte
+        self.payment_type = payment_type
+
+    def dict(self) -> Dict[str, Any]:
+        """Keyword arguments of CheckRepository.get_checks_query."""
+        return {
+            'search_query': self.search_query,
+            'search_mode': self.search_mode,
+            'created_at_before': self.created_at_before,
+            'created_at_after': self.created_at_after,
+            'total_gte': self.total_gte,
+            'total_lte': self.total_lte,
+            'payment_type': self.payment_type,
+        }
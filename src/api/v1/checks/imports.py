@@ -0,0 +1,232 @@
+import csv
+import json
+from datetime import datetime
+from datetime import timezone
+from itertools import groupby
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from uuid import NAMESPACE_URL
+from uuid import UUID
+from uuid import uuid5
+
+from config import settings
+from database import database
+from openpyxl import load_workbook
+from pydantic import ValidationError
+
+from api.v1.checks.models import Check
+from api.v1.checks.models import Payment
+from api.v1.checks.models import Product
+from api.v1.checks.reports import CheckReportService
+from api.v1.checks.schemas import CheckCreate
+from api.v1.checks.services import CheckPartitionService
+from api.v1.checks.services import CheckService
+from api.v1.checks.services import DailyTotalService
+from api.v1.checks.services import PreparedCheck
+from sdk.exceptions.exceptions import AppException
+from sdk.partitions import get_month
+
+ImportedCheck = Tuple[PreparedCheck, datetime]
+
+
+class CheckImportService:
+    """
+    Bulk import of historical checks.
+
+    NDJSON sources use the format of the export, one check per line. CSV and XLSX
+    sources use the format of the reports, one row per product line with the rows
+    of a check next to each other. Sources are read lazily, checks are validated
+    with the rules of the API and written with COPY, one transaction per batch.
+
+    Checks without a uuid in the source get one derived from the source and their
+    position in it, checks already stored are skipped. Importing a batch again, after
+    a crash or with --restart, adds nothing.
+    """
+
+    service = CheckService
+    formats: Tuple[str, ...] = ('csv', 'ndjson', 'xlsx')
+    check_columns: Tuple[str, ...] = ('uuid', 'created_at', 'user', 'total', 'rest', 'product_count')
+    product_columns: Tuple[str, ...] = ('uuid', 'created_at', 'name', 'price', 'quantity', 'check')
+    payment_columns: Tuple[str, ...] = ('uuid', 'created_at', 'type', 'amount', 'check')
+
+    @classmethod
+    def read_checks(cls: Type['CheckImportService'], path: str, file_format: str) -> Iterator[Dict[str, Any]]:
+        readers = {
+            'csv': cls.read_csv,
+            'ndjson': cls.read_ndjson,
+            'xlsx': cls.read_xlsx,
+        }
+        return readers[file_format](path)
+
+    @staticmethod
+    def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+        with open(path, encoding='utf-8') as in_file:
+            for line in in_file:
+                if line.strip():
+                    yield json.loads(line)
+
+    @classmethod
+    def read_csv(cls: Type['CheckImportService'], path: str) -> Iterator[Dict[str, Any]]:
+        with open(path, encoding='utf-8', newline='') as in_file:
+            reader = csv.DictReader(in_file)
+            cls._check_header(reader.fieldnames or ())
+            yield from cls.group_lines(reader)
+
+    @classmethod
+    def read_xlsx(cls: Type['CheckImportService'], path: str) -> Iterator[Dict[str, Any]]:
+        workbook = load_workbook(path, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            cls._check_header(header)
+            yield from cls.group_lines(dict(zip(header, row)) for row in rows if any(row))
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _check_header(header: Tuple[str, ...]) -> None:
+        missing = [column for column in CheckReportService.columns if column not in header]
+        if missing:
+            raise ValueError(f'Missing report columns: {", ".join(missing)}')
+
+    @staticmethod
+    def group_lines(lines: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Fold consecutive report lines of one check into a check in the export format."""
+        for check_uuid, check_lines in groupby(lines, key=lambda line: line['Check']):
+            check_lines = list(check_lines)
+            first = check_lines[0]
+            yield {
+                'uuid': check_uuid,
+                'created_at': first['Created at'],
+                'products': [
+                    {'name': line['Product'], 'price': line['Price'], 'quantity': line['Quantity']}
+                    for line in check_lines
+                ],
+                'payment': {'type': first['Payment type'], 'amount': first['Paid']},
+            }
+
+    @staticmethod
+    def parse_datetime(value: Any) -> Optional[datetime]:  # noqa: ANN401
+        if value is None or value == '':
+            return None
+        if not isinstance(value, (str, datetime)):
+            raise ValueError(f'created_at must be a date and time string, got {value!r}')
+        if isinstance(value, str):
+            try:
+                value = datetime.strptime(value, settings.DEFAULT_DATETIME_FORMAT)
+            except ValueError:
+                value = datetime.fromisoformat(value)
+        # Reports are in UTC.
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def get_namespace(source: Dict[str, Any], user_id: UUID) -> UUID:
+        """Namespace of the uuids of the checks imported from `source` for the user."""
+        return uuid5(NAMESPACE_URL, json.dumps({'source': source, 'user': str(user_id)}, sort_keys=True))
+
+    @classmethod
+    def validate(
+            cls: Type['CheckImportService'],
+            raw: Dict[str, Any],
+            user_id: UUID,
+            default_created_at: datetime,
+            default_uuid: Optional[UUID] = None,
+    ) -> ImportedCheck:
+        """Raises AppException or ValueError for a check the API would reject."""
+        if not isinstance(raw, dict):
+            raise ValueError('A check must be an object')
+        check_data = CheckCreate.parse_obj({'products': raw.get('products'), 'payment': raw.get('payment')})
+        check_uuid = UUID(str(raw['uuid'])) if raw.get('uuid') else default_uuid
+        created_at = cls.parse_datetime(raw.get('created_at')) or default_created_at
+        return cls.service.prepare_check(check_data, user_id, check_uuid), created_at
+
+    @staticmethod
+    def get_error_message(error: Exception) -> str:
+        if isinstance(error, AppException):
+            return error.message
+        if isinstance(error, ValidationError):
+            return '; '.join(
+                f'{".".join(str(part) for part in item["loc"])}: {item["msg"]}' for item in error.errors()
+            )
+        return str(error)
+
+    @classmethod
+    def validate_batch(
+            cls: Type['CheckImportService'],
+            raw_checks: List[Dict[str, Any]],
+            user_id: UUID,
+            default_created_at: datetime,
+            namespace: Optional[UUID] = None,
+            position: int = 0,
+    ) -> Tuple[List[ImportedCheck], List[Tuple[int, str]]]:
+        """
+        Split a batch into valid checks and (index in the batch, error) of the rejected ones.
+
+        :param namespace: checks without a uuid get uuid5(namespace, position in the source)
+        :param position: position of the batch in the source
+        """
+        checks = []
+        rejected = []
+        for index, raw in enumerate(raw_checks):
+            default_uuid = uuid5(namespace, str(position + index)) if namespace else None
+            try:
+                checks.append(cls.validate(raw, user_id, default_created_at, default_uuid))
+            except (AppException, ValueError) as e:
+                rejected.append((index, cls.get_error_message(e)))
+        return checks, rejected
+
+    @staticmethod
+    def get_records(checks: List[ImportedCheck]) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        """COPY records of the checks, products and payments tables."""
+        check_records = []
+        product_records = []
+        payment_records = []
+        for prepared, created_at in checks:
+            check = prepared.check
+            check_records.append(
+                (check.uuid, created_at, check.user, check.total, check.rest, check.product_count),
+            )
+            product_records.extend(
+                (product.uuid, created_at, product.name, product.price, product.quantity, product.check)
+                for product in prepared.products
+            )
+            payment = prepared.payment
+            payment_records.append((payment.uuid, created_at, payment.type.value, payment.amount, payment.check))
+        return check_records, product_records, payment_records
+
+    @classmethod
+    async def copy_batch(cls: Type['CheckImportService'], checks: List[ImportedCheck]) -> Tuple[int, int]:
+        """
+        Write the checks with COPY and add them to daily_totals in one transaction.
+
+        Returns the checks and the rows copied.
+
+        Checks already stored are skipped, COPY has no ON CONFLICT.
+        """
+        # Historical checks may fall into months without partitions.
+        await CheckPartitionService.ensure(get_month(created_at) for _, created_at in checks)
+        async with database.transaction():
+            connection = database.connection().raw_connection
+            existing = {
+                row['uuid']
+                for row in await connection.fetch(
+                    f'SELECT uuid FROM {Check.__table__.name} WHERE uuid = ANY($1::uuid[])',
+                    [prepared.check.uuid for prepared, _ in checks],
+                )
+            }
+            checks = [(prepared, created_at) for prepared, created_at in checks if prepared.check.uuid not in existing]
+            check_records, product_records, payment_records = cls.get_records(checks)
+            for table, columns, records in (
+                (Check.__table__.name, cls.check_columns, check_records),
+                (Product.__table__.name, cls.product_columns, product_records),
+                (Payment.__table__.name, cls.payment_columns, payment_records),
+            ):
+                if records:
+                    await connection.copy_records_to_table(table, records=records, columns=columns)
+            await DailyTotalService.add(checks)
+        return len(check_records), len(check_records) + len(product_records) + len(payment_records)
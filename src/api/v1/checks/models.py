@@ -2,43 +2,108 @@ from sqlalchemy.dialects.postgresql import UUID
 import sqlalchemy as sa
 
 from api.v1.checks import enums
+from config import settings
 from database import Base  # type: ignore
 from sdk.models import AuditMixin
+from sdk.models import MonthlyPartitionMixin
 from sdk.models import UUIDModelMixin
 
 
-class Check(UUIDModelMixin, AuditMixin, Base):
+class Check(UUIDModelMixin, MonthlyPartitionMixin, AuditMixin, Base):
     """Check model"""
 
     __tablename__ = 'checks'
+    __table_args__ = (
+        sa.Index('ix_checks_user_total', 'user', 'total'),
+        sa.Index('ix_checks_user_rest', 'user', 'rest'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
     user = sa.Column(
         UUID,
         sa.ForeignKey('users.uuid', ondelete='CASCADE'),
     )
+    # Denormalized from products and payments on creation, checks are immutable.
+    total = sa.Column(sa.Float, nullable=False, default=0, server_default='0')
+    rest = sa.Column(sa.Float, nullable=False, default=0, server_default='0')
+    product_count = sa.Column(sa.Integer, nullable=False, default=0, server_default='0')
+
+
+# Matches the default listing order, (-created_at, -uuid), of a single user's checks.
+sa.Index('ix_checks_user_created_at_uuid', Check.user, Check.created_at.desc(), Check.uuid.desc())
 
 
-class Product(UUIDModelMixin, AuditMixin, Base):
+class Product(UUIDModelMixin, MonthlyPartitionMixin, AuditMixin, Base):
     """Product model"""
 
     __tablename__ = 'products'
+    __table_args__ = (
+        # Created together with the check, so a check and its lines share a partition.
+        sa.ForeignKeyConstraint(
+            ['check', 'created_at'],
+            ['checks.uuid', 'checks.created_at'],
+            ondelete='CASCADE',
+        ),
+        sa.Index(
+            'ix_products_name_trgm',
+            'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            # Only created where pg_trgm is available, see alembic/env.py include_object.
+            info={'requires_extension': 'pg_trgm'},
+        ),
+        sa.Index(
+            'ix_products_name_tsv',
+            sa.text(f"to_tsvector('{settings.CHECK_SEARCH_CONFIG}'::regconfig, name)"),
+            postgresql_using='gin',
+        ),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
     name = sa.Column(sa.String, nullable=False)
     price = sa.Column(sa.Float, nullable=False)
     quantity = sa.Column(sa.Float, nullable=False, default=1.0)
-    check = sa.Column(
-        UUID,
-        sa.ForeignKey('checks.uuid', ondelete='CASCADE'),
-    )
+    check = sa.Column(UUID, index=True)
 
 
-class Payment(UUIDModelMixin, AuditMixin, Base):
+class Payment(UUIDModelMixin, MonthlyPartitionMixin, AuditMixin, Base):
     """Payment model"""
 
     __tablename__ = 'payments'
+    __table_args__ = (
+        sa.ForeignKeyConstraint(
+            ['check', 'created_at'],
+            ['checks.uuid', 'checks.created_at'],
+            ondelete='CASCADE',
+        ),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
     type = sa.Column(sa.Enum(enums.PaymentType), nullable=False)
     amount = sa.Column(sa.Float, nullable=False)
-    check = sa.Column(
+    check = sa.Column(UUID, index=True)
+
+
+class DailyTotal(Base):
+    """
+    Z-report rollup, totals of a cashier's checks per day and payment type.
+
+    Maintained together with check creation, `reconcile-daily-totals` rebuilds days from checks and payments.
+    """
+
+    __tablename__ = 'daily_totals'
+
+    user = sa.Column(
         UUID,
-        sa.ForeignKey('checks.uuid', ondelete='CASCADE'),
+        sa.ForeignKey('users.uuid', ondelete='CASCADE'),
+        primary_key=True,
     )
+    # Day in settings.CHECK_REPORT_TIMEZONE.
+    date = sa.Column(sa.Date, primary_key=True)
+    # VARCHAR like the text payments.type is created with in the migrations, no database enum type.
+    payment_type = sa.Column(sa.Enum(enums.PaymentType, native_enum=False), primary_key=True)
+    check_count = sa.Column(sa.Integer, nullable=False, default=0, server_default='0')
+    total = sa.Column(sa.Float, nullable=False, default=0, server_default='0')
+    cash = sa.Column(sa.Float, nullable=False, default=0, server_default='0')
+    cashless = sa.Column(sa.Float, nullable=False, default=0, server_default='0')
+    rest = sa.Column(sa.Float, nullable=False, default=0, server_default='0')
@@ -0,0 +1,135 @@
+from functools import lru_cache
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from api.v1.checks import enums
+from api.v1.checks.schemas import CheckSchema
+from config import settings
+
+AMOUNT_WIDTH = 10
+NAME_INDENT = '    '
+DATE_FORMAT = '%d.%m.%Y %H:%M'
+DATE_WIDTH = 16
+MIN_WIDTH = 20
+NAME_CACHE_SIZE = 4096
+
+
+class ReceiptLayout:
+    """
+    Receipt text layout compiled for one paper width.
+
+    Everything that does not depend on the check (centered header and footer,
+    separators, padded labels) is built once. Product names repeat across checks,
+    their wrapped lines are kept per layout, so rendering mostly formats amounts.
+    Get instances from `get_receipt_layout`.
+    """
+
+    def __init__(self, width: int, header: str, footer: str) -> None:
+        if width < MIN_WIDTH:
+            raise ValueError(f'Receipt width must be at least {MIN_WIDTH} characters')
+        label_width = width - AMOUNT_WIDTH
+        self.width = width
+        # Names wrap at the label column, the last line is completed with dots up to the total.
+        self.name_width = label_width
+        self.head = [header.center(width), '=' * width, '']
+        self.totals_separator = ['', '-' * width]
+        self.total_label = 'СУМА'.ljust(label_width)
+        self.payment_labels = {
+            enums.PaymentType.CASHLESS: 'Картка'.ljust(label_width),
+            enums.PaymentType.CASH: 'Готівка'.ljust(label_width),
+        }
+        self.rest_label = 'Решта'.ljust(label_width)
+        self.closing_separator = '=' * width
+        date_padding = ('#' * DATE_WIDTH).center(width).split('#' * DATE_WIDTH)
+        self.date_left, self.date_right = date_padding[0], date_padding[-1]
+        self.footer = footer.center(width)
+        self._names: Dict[str, Tuple[List[str], str, int]] = {}
+
+    def wrap(self, name: str) -> List[str]:
+        """Split a product name into lines of at most `name_width`, breaking at the last space that fits."""
+        parts = []
+        start, end, limit = 0, len(name), self.name_width
+        while end - start > limit:
+            cut = name.rfind(' ', start, start + limit)
+            if cut == -1:
+                cut = start + limit
+            parts.append(name[start:cut])
+            start = cut
+            while start < end and name[start].isspace():
+                start += 1
+        if start < end:
+            parts.append(name[start:])
+        return parts
+
+    def _get_name_lines(self, name: str) -> Optional[Tuple[List[str], str, int]]:
+        """Full lines of a wrapped name, its last line and the width left for the dotted total."""
+        name_lines = self._names.get(name)
+        if name_lines is None:
+            parts = self.wrap(name)
+            if not parts:
+                return None
+            last = NAME_INDENT + parts[-1]
+            name_lines = ([NAME_INDENT + part for part in parts[:-1]], last, self.width - len(last))
+            if len(self._names) >= NAME_CACHE_SIZE:
+                self._names.clear()
+            self._names[name] = name_lines
+        return name_lines
+
+    def write(self, check: CheckSchema, lines: List[str]) -> None:
+        """Append the lines of one receipt to `lines`."""
+        lines.extend(self.head)
+        for product in check.products:
+            lines.append(f'{product.quantity:.2f} x {product.price:.2f}')
+            name_lines = self._get_name_lines(product.name)
+            if name_lines is None:
+                continue
+            full_lines, last, total_width = name_lines
+            lines.extend(full_lines)
+            lines.append(f'{last}{product.total:.>{total_width}.2f}')
+        lines.extend(self.totals_separator)
+        lines.append(f'{self.total_label}{check.total:>{AMOUNT_WIDTH}.2f}')
+        lines.append(f'{self.payment_labels[check.payment.type]}{check.payment.amount:>{AMOUNT_WIDTH}.2f}')
+        lines.append(f'{self.rest_label}{check.rest:>{AMOUNT_WIDTH}.2f}')
+        lines.append(self.closing_separator)
+        lines.append(f'{self.date_left}{check.created_at.strftime(DATE_FORMAT)}{self.date_right}')
+        lines.append(self.footer)
+
+    def render(self, check: CheckSchema) -> str:
+        lines: List[str] = []
+        self.write(check, lines)
+        return '\n'.join(lines)
+
+    def render_many(self, checks: Iterable[CheckSchema], separator: Sequence[str] = ('',)) -> str:
+        """
+        Render checks into one buffer, e.g. for reprinting a whole shift.
+
+        :param separator: lines between receipts, a form feed line starts a new page on most printers
+        """
+        lines: List[str] = []
+        for index, check in enumerate(checks):
+            if index:
+                lines.extend(separator)
+            self.write(check, lines)
+        return '\n'.join(lines)
+
+
+@lru_cache(maxsize=16)
+def _get_receipt_layout(width: int, header: str, footer: str) -> ReceiptLayout:
+    return ReceiptLayout(width, header, footer)
+
+
+def get_receipt_layout(
+    width: Optional[int] = None,
+    header: Optional[str] = None,
+    footer: Optional[str] = None,
+) -> ReceiptLayout:
+    """Compiled layout for a paper width, settings.CHECK_* by default."""
+    return _get_receipt_layout(
+        width or settings.CHECK_LENGTH,
+        settings.CHECK_HEADER if header is None else header,
+        settings.CHECK_FOOTER if footer is None else footer,
+    )
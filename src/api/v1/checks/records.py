@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+from uuid import UUID
+
+from api.v1.checks import enums
+from sdk.records import BaseRecord
+
+
+@dataclass
+class CheckRecord(BaseRecord):
+    """Row of checks."""
+
+    __slots__ = ('uuid', 'user', 'total', 'rest', 'product_count')
+
+    uuid: UUID
+    user: UUID
+    total: float
+    rest: float
+    product_count: int
+
+
+@dataclass
+class ProductRecord(BaseRecord):
+    """Row of products."""
+
+    __slots__ = ('uuid', 'check', 'name', 'price', 'quantity')
+
+    uuid: UUID
+    check: UUID
+    name: str
+    price: float
+    quantity: float
+
+    @property
+    def total(self) -> float:
+        return float(self.price * self.quantity)
+
+
+@dataclass
+class PaymentRecord(BaseRecord):
+    """Row of payments."""
+
+    __slots__ = ('uuid', 'check', 'type', 'amount')
+
+    uuid: UUID
+    check: UUID
+    type: enums.PaymentType  # noqa: VNE003
+    amount: float
+
+
+@dataclass
+class StoredCheck(BaseRecord):
+    """A check with its lines as stored, lines share created_at with their check."""
+
+    __slots__ = ('check', 'created_at', 'products', 'payment')
+
+    check: CheckRecord
+    created_at: datetime
+    products: List[ProductRecord]
+    payment: PaymentRecord
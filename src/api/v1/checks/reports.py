@@ -0,0 +1,129 @@
+import csv
+import io
+from datetime import datetime
+from datetime import timezone
+from enum import Enum
+from typing import Any
+from typing import AsyncIterator
+from typing import List
+from typing import Tuple
+from typing import Type
+from uuid import UUID
+
+import aiofiles
+from asyncpg import Record
+from config import settings
+from openpyxl import Workbook
+from starlette.concurrency import run_in_threadpool
+
+from api.v1.checks.filters import CheckFilters
+from api.v1.checks.repositories import CheckRepository
+
+
+class CheckReportService:
+    """
+    Check reports for accounting, one row per product line with the check totals.
+
+    Rows are read through a server-side cursor and written as they arrive, CSV
+    straight to the response, XLSX into a write-only workbook that keeps rows on
+    disk. Memory does not depend on the size of the report.
+    """
+
+    repository = CheckRepository
+    columns: Tuple[str, ...] = (
+        'Check',
+        'Created at',
+        'Product',
+        'Price',
+        'Quantity',
+        'Line total',
+        'Check total',
+        'Payment type',
+        'Paid',
+        'Rest',
+    )
+    # Rows handed to openpyxl per thread pool call, keeps the event loop free.
+    xlsx_batch_size: int = 1000
+    csv_chunk_size: int = 64 * 1024
+
+    @staticmethod
+    def get_row(row: Record) -> List[Any]:
+        payment_type = row['payment_type']
+        return [
+            str(row['check_uuid']),
+            row['created_at'],
+            row['name'],
+            row['price'],
+            row['quantity'],
+            row['line_total'],
+            row['total'],
+            payment_type.value if isinstance(payment_type, Enum) else payment_type,
+            row['payment_amount'],
+            row['rest'],
+        ]
+
+    @classmethod
+    async def iterate_rows(
+            cls: Type['CheckReportService'],
+            user_uuid: UUID,
+            filters: CheckFilters,
+    ) -> AsyncIterator[List[Any]]:
+        async for row in cls.repository.iterate_check_lines(user_uuid=user_uuid, **filters.dict()):
+            yield cls.get_row(row)
+
+    @classmethod
+    async def iterate_csv(
+            cls: Type['CheckReportService'],
+            user_uuid: UUID,
+            filters: CheckFilters,
+    ) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(cls.columns)
+        async for row in cls.iterate_rows(user_uuid, filters):
+            row[1] = row[1].strftime(settings.DEFAULT_DATETIME_FORMAT)
+            writer.writerow(row)
+            if buffer.tell() >= cls.csv_chunk_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    @classmethod
+    async def write_csv(
+            cls: Type['CheckReportService'],
+            user_uuid: UUID,
+            filters: CheckFilters,
+            path: str,
+    ) -> None:
+        async with aiofiles.open(path, 'wb') as out_file:
+            async for chunk in cls.iterate_csv(user_uuid, filters):
+                await out_file.write(chunk)
+
+    @staticmethod
+    def _append_rows(worksheet: Any, rows: List[List[Any]]) -> None:  # noqa: ANN401
+        for row in rows:
+            worksheet.append(row)
+
+    @classmethod
+    async def write_xlsx(
+            cls: Type['CheckReportService'],
+            user_uuid: UUID,
+            filters: CheckFilters,
+            path: str,
+    ) -> None:
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Checks')
+        worksheet.append(cls.columns)
+        batch = []
+        async for row in cls.iterate_rows(user_uuid, filters):
+            # Excel has no time zones, reports are in UTC.
+            created_at: datetime = row[1]
+            if created_at.tzinfo is not None:
+                row[1] = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+            batch.append(row)
+            if len(batch) >= cls.xlsx_batch_size:
+                await run_in_threadpool(cls._append_rows, worksheet, batch)
+                batch = []
+        await run_in_threadpool(cls._append_rows, worksheet, batch)
+        await run_in_threadpool(workbook.save, path)
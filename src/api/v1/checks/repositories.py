@@ -1,29 +1,188 @@
-import json
+import os
+import uuid
+from datetime import date
 from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+from typing import Tuple
 from typing import Type, Optional
+from zoneinfo import ZoneInfo
+import aiofiles
 from uuid import UUID
+from asyncpg import Record
 from api.v1.checks import enums
 from api.v1.checks.models import Check
+from api.v1.checks.models import DailyTotal
 from api.v1.checks.models import Product
 from api.v1.checks.models import Payment
+from api.v1.checks.records import CheckRecord
+from api.v1.checks.records import PaymentRecord
+from api.v1.checks.records import ProductRecord
+from api.v1.checks.records import StoredCheck
 from api.v1.checks.schemas import CheckSchema
-from api.v1.checks.schemas import ProductSchema
-from api.v1.checks.schemas import PaymentCreate
+from api.v1.checks.search import ProductSearch
+from config import settings
 from database import database
 from sdk.exceptions.exceptions import make_error
 from sdk.ordering import OrderingManager
 from sdk.pagination import PaginationManager
+from sdk.rendering import RawJSON
+from sdk.rendering import json_datetime
+from sdk.rendering import json_object
 from sdk.repositories import BaseRepository
 from sdk.responses import ResponseStatus
 from sdk.schemas import PaginatedSchema
 from sqlalchemy import select
 from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
 import sqlalchemy as sa
 
 
 class CheckRepository(BaseRepository):
     model: Check = Check
 
+    @staticmethod
+    def get_lines_join(
+            table: sa.Table,
+            created_at_before: Optional[datetime] = None,
+            created_at_after: Optional[datetime] = None,
+    ) -> ColumnElement:
+        """
+        Join condition of the products or payments of checks.
+
+        Lines share created_at with their check, matching it lets the executor prune the
+        line partitions per check. The created_at bounds of the check filters are repeated
+        on the lines so hash joins scan only the partitions of the range as well.
+        """
+        checks_table = Check.__table__
+        clauses = [table.c.check == checks_table.c.uuid, table.c.created_at == checks_table.c.created_at]
+        if created_at_before:
+            clauses.append(table.c.created_at <= created_at_before)
+        if created_at_after:
+            clauses.append(table.c.created_at >= created_at_after)
+        return sa.and_(*clauses)
+
+    @classmethod
+    def get_checks_query(
+            cls: Type['CheckRepository'],
+            user_uuid: UUID,
+            created_at_before: Optional[datetime] = None,
+            created_at_after: Optional[datetime] = None,
+            total_gte: Optional[int] = None,
+            total_lte: Optional[int] = None,
+            payment_type: Optional[enums.PaymentType] = None,
+            search_query: Optional[str] = None,
+            search_mode: enums.SearchMode = enums.SearchMode.TRIGRAM,
+    ) -> Select:
+        """
+        Filtered, unordered and unpaginated query behind get_checks.
+
+        Rows carry the check rendered as CheckSchema JSON by Postgres in `check`.
+        """
+        checks_table = Check.__table__
+        products_table = Product.__table__
+        payments_table = Payment.__table__
+        query = (
+            select([
+                cls.model.uuid.label('uuid'),
+                cls.model.created_at,
+                cls.model.total,
+                cls.model.rest,
+                cls.get_check_json(products_table, payments_table).label('check'),
+            ])
+            .select_from(
+                checks_table
+                .outerjoin(products_table, cls.get_lines_join(products_table, created_at_before, created_at_after))
+                .outerjoin(payments_table, cls.get_lines_join(payments_table, created_at_before, created_at_after))
+            )
+        ).where(
+            *cls.get_checks_filters(
+                user_uuid=user_uuid,
+                created_at_before=created_at_before,
+                created_at_after=created_at_after,
+                total_gte=total_gte,
+                total_lte=total_lte,
+                payment_type=payment_type,
+                search_query=search_query,
+                search_mode=search_mode,
+            )
+        )
+        return query.group_by(
+            checks_table.c.uuid, checks_table.c.created_at, payments_table.c.amount, payments_table.c.type,
+        )
+
+    @classmethod
+    def get_check_json(
+            cls: Type['CheckRepository'],
+            products_table: sa.Table,
+            payments_table: sa.Table,
+    ) -> ColumnElement:
+        """
+        The check as CheckSchema renders it, as text, aggregated over its product rows.
+
+        The text is passed to the response untouched, nothing is decoded or validated in Python.
+        """
+        products = func.json_agg(json_object(
+            ('name', products_table.c.name),
+            ('price', products_table.c.price),
+            ('quantity', products_table.c.quantity),
+            ('total', products_table.c.price * products_table.c.quantity),
+        ))
+        payment = json_object(('type', payments_table.c.type), ('amount', payments_table.c.amount))
+        return sa.cast(
+            json_object(
+                ('created_at', json_datetime(cls.model.created_at)),
+                ('updated_at', json_datetime(cls.model.updated_at)),
+                ('uuid', cls.model.uuid),
+                ('products', products),
+                ('payment', payment),
+                ('total', cls.model.total),
+                ('rest', cls.model.rest),
+            ),
+            sa.Text,
+        )
+
+    @staticmethod
+    def get_page_results(rows: List[Record]) -> RawJSON:
+        return RawJSON.from_items(
+            [row['check'] for row in rows],
+            versions=[(str(row['uuid']), row['created_at']) for row in rows],
+        )
+
+    @classmethod
+    def get_checks_filters(
+            cls: Type['CheckRepository'],
+            user_uuid: UUID,
+            created_at_before: Optional[datetime] = None,
+            created_at_after: Optional[datetime] = None,
+            total_gte: Optional[int] = None,
+            total_lte: Optional[int] = None,
+            payment_type: Optional[enums.PaymentType] = None,
+            search_query: Optional[str] = None,
+            search_mode: enums.SearchMode = enums.SearchMode.TRIGRAM,
+    ) -> List[ColumnElement]:
+        """WHERE clauses of the check filters, the query has to join payments."""
+        clauses = [cls.model.user == user_uuid]
+        if search_query:
+            clauses.append(ProductSearch.get_filter(cls.model.uuid, cls.model.created_at, search_query, search_mode))
+        if created_at_before:
+            clauses.append(cls.model.created_at <= created_at_before)
+        if created_at_after:
+            clauses.append(cls.model.created_at >= created_at_after)
+        if total_gte:
+            clauses.append(cls.model.total >= total_gte)
+        if total_lte:
+            clauses.append(cls.model.total <= total_lte)
+        if payment_type:
+            clauses.append(Payment.type == payment_type)
+        return clauses
+
     @classmethod
     async def get_checks(
             cls: Type['CheckRepository'],
@@ -36,89 +195,139 @@ class CheckRepository(BaseRepository):
             pagination: PaginationManager,
             user_uuid: UUID,
             search_query: Optional[str] = None,
+            search_mode: enums.SearchMode = enums.SearchMode.TRIGRAM,
     ) -> PaginatedSchema[CheckSchema]:
+        query = cls.get_checks_query(
+            user_uuid=user_uuid,
+            created_at_before=created_at_before,
+            created_at_after=created_at_after,
+            total_gte=total_gte,
+            total_lte=total_lte,
+            payment_type=payment_type,
+            search_query=search_query,
+            search_mode=search_mode,
+        )
+        additional_fields = {}
+        default_ordering = ()
+        if search_query and search_mode == enums.SearchMode.FULLTEXT:
+            additional_fields['rank'] = ProductSearch.get_rank(cls.model.uuid, cls.model.created_at, search_query)
+            default_ordering = ('-rank',)
+        if pagination.is_cursor:
+            keys = ordering.get_keys(
+                cls.model,
+                additional_fields=additional_fields,
+                default=default_ordering or ('-created_at',),
+            )
+            raw_results = await database.fetch_all(pagination.paginate_by_cursor(query, keys))
+            raw_results, next_cursor, previous_cursor = pagination.get_cursor_page(raw_results, keys)
+            return pagination.get_paginated_schema(
+                cls.get_page_results(raw_results),
+                next_cursor=next_cursor,
+                previous_cursor=previous_cursor,
+            )
+        query = query.order_by(
+            *ordering.get_fields(cls.model, additional_fields=additional_fields, default=default_ordering),
+        )
+        raw_results, total_count, has_more = await pagination.fetch_page(query)
+        return pagination.get_paginated_schema(
+            cls.get_page_results(raw_results),
+            total_count=total_count,
+            has_more=has_more,
+        )
+
+    @classmethod
+    async def iterate_checks(
+            cls: Type['CheckRepository'],
+            user_uuid: UUID,
+            **filters,
+    ) -> AsyncIterator[Record]:
+        """
+        Every check matching `filters`, oldest first, read through a server-side cursor.
+
+        Rows are fetched in small batches as the caller consumes them, memory does not
+        grow with the number of checks. The connection is held until iteration ends.
+        """
+        query = cls.get_checks_query(user_uuid=user_uuid, **filters).order_by(
+            cls.model.created_at, cls.model.uuid,
+        )
+        async for row in database.iterate(query):
+            yield row
+
+    @classmethod
+    async def iterate_check_lines(
+            cls: Type['CheckRepository'],
+            user_uuid: UUID,
+            **filters,
+    ) -> AsyncIterator[Record]:
+        """
+        One row per product of every check matching `filters`, oldest check first.
+
+        Rows carry the check totals and payment as well and are read through a
+        server-side cursor like iterate_checks.
+        """
         checks_table = Check.__table__
         products_table = Product.__table__
         payments_table = Payment.__table__
-        total = func.sum(products_table.c.price * products_table.c.quantity)
-        rest = (func.coalesce(payments_table.c.amount, 0) - func.sum(
-            products_table.c.price * products_table.c.quantity))
         query = (
             select([
-                cls.model.uuid.label('uuid'),
+                cls.model.uuid.label('check_uuid'),
                 cls.model.created_at,
-                func.jsonb_agg(
-                    func.jsonb_build_object(
-                        sa.text("'name', products.name"),
-                        sa.text("'price', products.price"),
-                        sa.text("'quantity', products.quantity"),
-                        sa.text("'total', products.price * products.quantity"),
-                    )
-                ).label('products'),
-                func.jsonb_build_object(
-                    sa.text("'amount', payments.amount"),
-                    sa.text("'type', payments.type"),
-                ).label('payment'),
-                total.label('total'),
-                rest.label('rest')
+                products_table.c.name,
+                products_table.c.price,
+                products_table.c.quantity,
+                (products_table.c.price * products_table.c.quantity).label('line_total'),
+                cls.model.total,
+                payments_table.c.type.label('payment_type'),
+                payments_table.c.amount.label('payment_amount'),
+                cls.model.rest,
             ])
             .select_from(
                 checks_table
-                .outerjoin(products_table, products_table.c.check == checks_table.c.uuid)
-                .outerjoin(payments_table, payments_table.c.check == checks_table.c.uuid)
+                .join(products_table, cls.get_lines_join(
+                    products_table, filters.get('created_at_before'), filters.get('created_at_after'),
+                ))
+                .outerjoin(payments_table, cls.get_lines_join(
+                    payments_table, filters.get('created_at_before'), filters.get('created_at_after'),
+                ))
             )
-        ).where(
-            cls.model.user == user_uuid
+            .where(*cls.get_checks_filters(user_uuid=user_uuid, **filters))
+            .order_by(cls.model.created_at, cls.model.uuid, products_table.c.name)
         )
-        if search_query:
-            query = query.filter(products_table.c.name.ilike(f"%{search_query}%"))
-        if created_at_before:
-            query = query.where(cls.model.created_at <= created_at_before)
-        if created_at_after:
-            query = query.where(cls.model.created_at >= created_at_after)
-        if total_gte:
-            query = query.having(total >= total_gte)
-        if total_lte:
-            query = query.having(total <= total_lte)
-        if payment_type:
-            query = query.where(Payment.type == payment_type)
-        order_fields = ordering.get_fields(cls.model, additional_fields={
-            'total': total,
-            'rest': rest,
-        })
-        query = query.group_by(checks_table.c.uuid, payments_table.c.amount, payments_table.c.type).order_by(
-            *order_fields)
-        total_count = await database.fetch_val(
-            sa.select([sa.func.count()]).select_from(query.alias('original_query')),
-        )
-        pagination.check_page(total_count)
-        paginated_query = query.limit(pagination.page_size).offset(
-            pagination.page * pagination.page_size,
-        )
-        raw_results = await database.fetch_all(paginated_query)
-        results = [CheckSchema(
-            uuid=obj['uuid'],
+        async for row in database.iterate(query):
+            yield row
+
+    @staticmethod
+    def _to_stored_check(obj: Record) -> StoredCheck:
+        # jsonb has no float type, whole numbers come back as int.
+        products = [
+            ProductRecord(
+                uuid=UUID(product['uuid']),
+                check=obj['uuid'],
+                name=product['name'],
+                price=float(product['price']),
+                quantity=float(product['quantity']),
+            )
+            for product in obj['products']
+        ]
+        payment = obj['payment']
+        return StoredCheck(
+            check=CheckRecord.from_row(obj),
             created_at=obj['created_at'],
-            products=[ProductSchema(**product) for product in json.loads(obj['products'])],
-            payment=PaymentCreate(**json.loads(obj['payment']))
-        ) for obj in raw_results]
-        _next = pagination.get_next_page(total_count)
-        _prev = pagination.get_prev_page()
-        _page_count = pagination.get_page_count(total_count)
-        return PaginatedSchema(
-            total_count=total_count,
-            page_count=_page_count,
-            next=_next,
-            previous=_prev,
-            results=results,
+            products=products,
+            payment=PaymentRecord(
+                uuid=UUID(payment['uuid']),
+                check=obj['uuid'],
+                type=enums.PaymentType(payment['type']),
+                amount=float(payment['amount']),
+            ),
         )
 
     @classmethod
-    async def get_check(
+    def get_check_query(
             cls: Type['CheckRepository'],
             check_uuid: UUID,
             user_uuid: Optional[UUID] = None,
-    ) -> CheckSchema:
+    ) -> Select:
         checks_table = Check.__table__
         products_table = Product.__table__
         payments_table = Payment.__table__
@@ -126,41 +335,148 @@ class CheckRepository(BaseRepository):
             select([
                 cls.model.uuid.label('uuid'),
                 cls.model.created_at,
+                cls.model.user,
                 func.jsonb_agg(
                     func.jsonb_build_object(
+                        sa.text("'uuid', products.uuid"),
                         sa.text("'name', products.name"),
                         sa.text("'price', products.price"),
                         sa.text("'quantity', products.quantity"),
                     )
                 ).label('products'),
                 func.jsonb_build_object(
+                    sa.text("'uuid', payments.uuid"),
                     sa.text("'amount', payments.amount"),
                     sa.text("'type', payments.type"),
                 ).label('payment'),
+                cls.model.total,
+                cls.model.rest,
+                cls.model.product_count,
             ])
             .select_from(
                 checks_table
-                .outerjoin(products_table, products_table.c.check == checks_table.c.uuid)
-                .outerjoin(payments_table, payments_table.c.check == checks_table.c.uuid)
+                .outerjoin(products_table, cls.get_lines_join(products_table))
+                .outerjoin(payments_table, cls.get_lines_join(payments_table))
             )
         ).where(
             cls.model.uuid == check_uuid
         ).group_by(
-            checks_table.c.uuid, payments_table.c.amount, payments_table.c.type
+            checks_table.c.uuid, checks_table.c.created_at, payments_table.c.uuid, payments_table.c.amount,
+            payments_table.c.type,
         )
         if user_uuid:
             query = query.where(cls.model.user == user_uuid)
-        raw_result = await database.fetch_one(query)
+        return query
+
+    @classmethod
+    async def get_check(
+            cls: Type['CheckRepository'],
+            check_uuid: UUID,
+            user_uuid: Optional[UUID] = None,
+    ) -> StoredCheck:
+        raw_result = await database.fetch_one(cls.get_check_query(check_uuid, user_uuid))
         if raw_result is None:
             raise make_error(
                 custom_code=ResponseStatus.CHECK_NOT_FOUND,
                 message='Check not found',
             )
-        return CheckSchema(
-            uuid=raw_result['uuid'],
-            created_at=raw_result['created_at'],
-            products=[ProductSchema(**product) for product in json.loads(raw_result['products'])],
-            payment=PaymentCreate(**json.loads(raw_result['payment']))
+        return cls._to_stored_check(raw_result)
+
+    @classmethod
+    def insert_check_query(
+            cls: Type['CheckRepository'],
+            check: Dict[str, Any],
+            products: List[Dict[str, Any]],
+            payment: Dict[str, Any],
+    ) -> Select:
+        """
+        Insert a check, its products and payment as data-modifying CTEs of one statement,
+        the daily_totals rollup is updated by the same statement.
+
+        Returns one row per product with the check and payment columns as stored.
+        """
+        # Built on tables, add_cte() is lost on statements against ORM entities.
+        checks_table = Check.__table__
+        products_table = Product.__table__
+        payments_table = Payment.__table__
+        new_check = sa.insert(checks_table).values(**check).returning(
+            checks_table.c.uuid,
+            checks_table.c.user,
+            checks_table.c.created_at,
+            checks_table.c.total,
+            checks_table.c.rest,
+        ).cte('new_check')
+        new_products = sa.insert(products_table).values(products).returning(
+            products_table.c.uuid,
+            products_table.c.name,
+            products_table.c.price,
+            products_table.c.quantity,
+        ).cte('new_products')
+        new_payment = sa.insert(payments_table).values(**payment).returning(
+            payments_table.c.uuid,
+            payments_table.c.type,
+            payments_table.c.amount,
+        ).cte('new_payment')
+        return select([
+            new_check.c.uuid.label('check_uuid'),
+            new_check.c.user.label('check_user'),
+            new_check.c.created_at.label('check_created_at'),
+            new_check.c.total.label('check_total'),
+            new_check.c.rest.label('check_rest'),
+            new_products.c.uuid.label('product_uuid'),
+            new_products.c.name.label('product_name'),
+            new_products.c.price.label('product_price'),
+            new_products.c.quantity.label('product_quantity'),
+            new_payment.c.uuid.label('payment_uuid'),
+            new_payment.c.type.label('payment_type'),
+            new_payment.c.amount.label('payment_amount'),
+        ]).select_from(
+            new_check
+            .join(new_products, sa.true())
+            .join(new_payment, sa.true())
+        ).add_cte(
+            DailyTotalRepository.add_check_query(new_check, new_payment).cte('new_daily_total'),
+        )
+
+    @classmethod
+    async def insert_check(
+            cls: Type['CheckRepository'],
+            check: Dict[str, Any],
+            products: List[Dict[str, Any]],
+            payment: Dict[str, Any],
+    ) -> StoredCheck:
+        # The compiler also registers the RETURNING columns of the CTEs as result columns,
+        # which breaks lookups through it, the raw records are read by label instead.
+        rows = [row._mapping for row in await database.fetch_all(cls.insert_check_query(check, products, payment))]
+        # RETURNING order is not guaranteed, keep the products in the order they were sent.
+        positions = {str(product['uuid']): index for index, product in enumerate(products)}
+        rows = sorted(rows, key=lambda row: positions[str(row['product_uuid'])])
+        first = rows[0]
+        return StoredCheck(
+            check=CheckRecord(
+                uuid=first['check_uuid'],
+                user=first['check_user'],
+                total=first['check_total'],
+                rest=first['check_rest'],
+                product_count=len(rows),
+            ),
+            created_at=first['check_created_at'],
+            products=[
+                ProductRecord(
+                    uuid=row['product_uuid'],
+                    check=first['check_uuid'],
+                    name=row['product_name'],
+                    price=row['product_price'],
+                    quantity=row['product_quantity'],
+                )
+                for row in rows
+            ],
+            payment=PaymentRecord(
+                uuid=first['payment_uuid'],
+                check=first['check_uuid'],
+                type=enums.PaymentType(first['payment_type']),
+                amount=first['payment_amount'],
+            ),
         )
 
 
@@ -170,3 +486,181 @@ class ProductRepository(BaseRepository):
 
 class PaymentRepository(BaseRepository):
     model: Payment = Payment
+
+
+class DailyTotalRepository(BaseRepository):
+    model: DailyTotal = DailyTotal
+    key_columns: Tuple[str, ...] = ('user', 'date', 'payment_type')
+    sum_columns: Tuple[str, ...] = ('check_count', 'total', 'cash', 'cashless', 'rest')
+
+    @staticmethod
+    def get_date(created_at: ColumnElement) -> ColumnElement:
+        """Day of a timestamp in settings.CHECK_REPORT_TIMEZONE."""
+        return sa.cast(func.timezone(settings.CHECK_REPORT_TIMEZONE, created_at), sa.Date)
+
+    @staticmethod
+    def get_bounds(date_from: date, date_to: date) -> Tuple[datetime, datetime]:
+        """created_at range of days `date_from`..`date_to` inclusive."""
+        timezone = ZoneInfo(settings.CHECK_REPORT_TIMEZONE)
+        return (
+            datetime.combine(date_from, time(), timezone),
+            datetime.combine(date_to + timedelta(days=1), time(), timezone),
+        )
+
+    @classmethod
+    def get_totals_columns(
+            cls: Type['DailyTotalRepository'],
+            user: ColumnElement,
+            created_at: ColumnElement,
+            total: ColumnElement,
+            rest: ColumnElement,
+            payment_type: ColumnElement,
+            amount: ColumnElement,
+    ) -> List[ColumnElement]:
+        """Rollup columns of one check, in the order of key_columns and sum_columns."""
+        return [
+            user.label('user'),
+            cls.get_date(created_at).label('date'),
+            payment_type.label('payment_type'),
+            sa.literal_column('1', sa.Integer).label('check_count'),
+            total.label('total'),
+            sa.case((payment_type == enums.PaymentType.CASH.value, amount), else_=0).label('cash'),
+            sa.case((payment_type == enums.PaymentType.CASHLESS.value, amount), else_=0).label('cashless'),
+            rest.label('rest'),
+        ]
+
+    @classmethod
+    def upsert(cls: Type['DailyTotalRepository'], insert: postgresql.Insert) -> postgresql.Insert:
+        """Add the inserted rows to the totals already stored for their keys."""
+        table = cls.model.__table__
+        return insert.on_conflict_do_update(
+            index_elements=[table.c[column] for column in cls.key_columns],
+            set_={column: table.c[column] + insert.excluded[column] for column in cls.sum_columns},
+        )
+
+    @classmethod
+    def add_check_query(
+            cls: Type['DailyTotalRepository'],
+            new_check: ColumnElement,
+            new_payment: ColumnElement,
+    ) -> postgresql.Insert:
+        """Add a check being inserted, `new_check` and `new_payment` are its INSERT ... RETURNING CTEs."""
+        rows = select(
+            cls.get_totals_columns(
+                user=new_check.c.user,
+                created_at=new_check.c.created_at,
+                total=new_check.c.total,
+                rest=new_check.c.rest,
+                payment_type=new_payment.c.type,
+                amount=new_payment.c.amount,
+            ),
+        ).select_from(new_check.join(new_payment, sa.true()))
+        return cls.upsert(postgresql.insert(cls.model.__table__).from_select(cls.key_columns + cls.sum_columns, rows))
+
+    @classmethod
+    async def add(cls: Type['DailyTotalRepository'], rows: List[Dict[str, Any]]) -> None:
+        """Add pre-aggregated rows, one per key."""
+        if rows:
+            await database.execute(cls.upsert(postgresql.insert(cls.model).values(rows)))
+
+    @classmethod
+    async def get_totals(
+            cls: Type['DailyTotalRepository'],
+            user_uuid: UUID,
+            date_from: date,
+            date_to: date,
+    ) -> List[Record]:
+        query = select([cls.model]).where(
+            cls.model.user == user_uuid,
+            cls.model.date.between(date_from, date_to),
+        ).order_by(cls.model.date, cls.model.payment_type)
+        return await database.fetch_all(query)
+
+    @classmethod
+    def get_rebuild_query(
+            cls: Type['DailyTotalRepository'],
+            date_from: date,
+            date_to: date,
+            user_uuid: Optional[UUID] = None,
+    ) -> postgresql.Insert:
+        checks_table = Check.__table__
+        payments_table = Payment.__table__
+        start, end = cls.get_bounds(date_from, date_to)
+        lines = select(
+            cls.get_totals_columns(
+                user=checks_table.c.user,
+                created_at=checks_table.c.created_at,
+                total=checks_table.c.total,
+                rest=checks_table.c.rest,
+                payment_type=payments_table.c.type,
+                amount=payments_table.c.amount,
+            ),
+        ).select_from(
+            checks_table.join(payments_table, CheckRepository.get_lines_join(payments_table, end, start)),
+        ).where(
+            checks_table.c.created_at >= start,
+            checks_table.c.created_at < end,
+            checks_table.c.user.isnot(None),
+        )
+        if user_uuid:
+            lines = lines.where(checks_table.c.user == user_uuid)
+        lines = lines.subquery('lines')
+        rows = select(
+            [lines.c[column] for column in cls.key_columns]
+            + [func.sum(lines.c[column]).label(column) for column in cls.sum_columns],
+        ).group_by(*[lines.c[column] for column in cls.key_columns])
+        return postgresql.insert(cls.model).from_select(cls.key_columns + cls.sum_columns, rows)
+
+    @classmethod
+    async def rebuild(
+            cls: Type['DailyTotalRepository'],
+            date_from: date,
+            date_to: date,
+            user_uuid: Optional[UUID] = None,
+    ) -> None:
+        """Recompute days `date_from`..`date_to` from checks and payments."""
+        async with database.transaction():
+            # Waits for transactions that add checks and holds new ones until the rebuild commits.
+            await database.execute(sa.text(f'LOCK TABLE {cls.model.__tablename__} IN SHARE ROW EXCLUSIVE MODE'))
+            query = sa.delete(cls.model).where(cls.model.date.between(date_from, date_to))
+            if user_uuid:
+                query = query.where(cls.model.user == user_uuid)
+            await database.execute(query)
+            await database.execute(cls.get_rebuild_query(date_from, date_to, user_uuid))
+
+
+class ReceiptRepository:
+    """
+    Rendered receipts in the media tree, served as static files by the fileproxy.
+
+    Files are sharded by the first two characters of the check uuid,
+    docker/fileproxy/nginx.conf relies on this layout.
+    """
+
+    media_path: str = settings.RECEIPTS_DIR
+
+    @classmethod
+    def get_path(cls, check_uuid: UUID) -> str:
+        check_uuid = str(check_uuid)
+        return os.path.join(cls.media_path, check_uuid[:2], f'{check_uuid}.txt')
+
+    @classmethod
+    def exists(cls, check_uuid: UUID) -> bool:
+        return os.path.exists(cls.get_path(check_uuid))
+
+    @staticmethod
+    def get_etag(path: str) -> str:
+        """Same format as nginx, so both servers agree on the validator of a file."""
+        stat = os.stat(path)
+        return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+    @classmethod
+    async def store(cls, check_uuid: UUID, text: str) -> str:
+        """Write the receipt atomically, readers never see a partial file."""
+        path = cls.get_path(check_uuid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        async with aiofiles.open(tmp_path, 'wb') as out_file:
+            await out_file.write(text.encode())
+        os.replace(tmp_path, path)
+        return path
@@ -1,3 +1,4 @@
+import datetime
 from uuid import UUID
 from api.v1.checks import enums
 from sdk.exceptions.exceptions import make_error
@@ -60,8 +61,25 @@ class CheckCreate(BaseSchema):
         return v
 
 
+def validate_totals(total: float, rest: float) -> None:
+    """Business rules of a check, shared by creation and CheckSchema."""
+    if rest < 0:
+        raise make_error(
+            custom_code=ResponseStatus.NOT_ENOUGH_MONEY,
+            message='Not enough money',
+        )
+    if total < 1:
+        raise make_error(
+            custom_code=ResponseStatus.EMPTY_CHECK,
+            message='Check is empty',
+        )
+
+
 class CheckCreateInDb(UUIDSchemaMixin):
     user: UUID
+    total: float = 0
+    rest: float = 0
+    product_count: int = 0
 
 
 class CheckSchema(UUIDSchemaMixin, AuditSchemaMixin):
@@ -79,14 +97,35 @@ class CheckSchema(UUIDSchemaMixin, AuditSchemaMixin):
             values['total'] = sum(product.total for product in values.get('products', []))
         if not values.get('rest'):
             values['rest'] = values['payment'].amount - values['total']
-        if values['rest'] < 0:
-            raise make_error(
-                custom_code=ResponseStatus.NOT_ENOUGH_MONEY,
-                message='Not enough money',
-            )
-        if values['total'] < 1:
-            raise make_error(
-                custom_code=ResponseStatus.EMPTY_CHECK,
-                message='Check is empty',
-            )
+        validate_totals(values['total'], values['rest'])
         return values
+
+
+class CheckBatchResult(BaseSchema):
+    """Outcome of one item of a batch, in request order."""
+
+    index: int
+    custom_code: ResponseStatus = ResponseStatus.OK
+    message: Optional[str] = None
+    check: Optional[CheckSchema] = None
+
+
+class DailyTotalSchema(BaseSchema):
+    payment_type: enums.PaymentType
+    check_count: int
+    total: float
+    cash: float
+    cashless: float
+    rest: float
+
+
+class DailyReportSchema(BaseSchema):
+    """Z-report of a day, totals and their split by payment type."""
+
+    date: datetime.date
+    check_count: int
+    total: float
+    cash: float
+    cashless: float
+    rest: float
+    payment_types: List[DailyTotalSchema]
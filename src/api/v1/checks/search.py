@@ -0,0 +1,78 @@
+import re
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+from api.v1.checks import enums
+from api.v1.checks.models import Product
+from config import settings
+
+
+class ProductSearch:
+    """
+    Product name search for checks.
+
+    Matches are applied as an EXISTS semi-join on a separate products alias, so a
+    matching check comes back with all of its products.
+
+    trigram: case-insensitive substring match, served by the pg_trgm GIN index.
+    fulltext: tsvector match with settings.CHECK_SEARCH_CONFIG, can be ranked.
+    """
+
+    products = Product.__table__.alias('matched_products')
+
+    @classmethod
+    def get_config(cls) -> ColumnElement:
+        # Rendered as a constant so the planner can match the expression index.
+        return sa.literal_column(f"'{settings.CHECK_SEARCH_CONFIG}'::regconfig")
+
+    @classmethod
+    def get_document(cls) -> ColumnElement:
+        return func.to_tsvector(cls.get_config(), cls.products.c.name)
+
+    @classmethod
+    def get_ts_query(cls, search_query: str) -> ColumnElement:
+        return func.websearch_to_tsquery(cls.get_config(), search_query)
+
+    @classmethod
+    def get_match(cls, search_query: str, mode: enums.SearchMode) -> ColumnElement:
+        if mode == enums.SearchMode.FULLTEXT:
+            return cls.get_document().op('@@')(cls.get_ts_query(search_query))
+        escaped = re.sub(r'([\\%_])', r'\\\1', search_query)
+        return cls.products.c.name.ilike(f'%{escaped}%', escape='\\')
+
+    @classmethod
+    def get_correlation(cls, check_uuid: ColumnElement, check_created_at: ColumnElement) -> ColumnElement:
+        # Products share created_at with their check, so only the check's partition is probed.
+        return sa.and_(cls.products.c.check == check_uuid, cls.products.c.created_at == check_created_at)
+
+    @classmethod
+    def get_filter(
+            cls,
+            check_uuid: ColumnElement,
+            check_created_at: ColumnElement,
+            search_query: str,
+            mode: enums.SearchMode,
+    ) -> ColumnElement:
+        return sa.exists().where(
+            cls.get_correlation(check_uuid, check_created_at),
+        ).where(
+            cls.get_match(search_query, mode),
+        )
+
+    @classmethod
+    def get_rank(
+            cls,
+            check_uuid: ColumnElement,
+            check_created_at: ColumnElement,
+            search_query: str,
+    ) -> ColumnElement:
+        """Best full-text rank among the check's products."""
+        return sa.select([
+            func.max(func.ts_rank(cls.get_document(), cls.get_ts_query(search_query))),
+        ]).where(
+            cls.get_correlation(check_uuid, check_created_at),
+        ).where(
+            cls.get_match(search_query, enums.SearchMode.FULLTEXT),
+        ).scalar_subquery().cast(sa.Float)
@@ -1,51 +1,71 @@
 import datetime
+import logging
 import uuid
+from itertools import groupby
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterable
 from typing import Type
 from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
 from uuid import UUID
+from zoneinfo import ZoneInfo
+from cache import RedisBackend
 from api.v1.checks import enums
+from api.v1.checks.cache import check_cache
+from api.v1.checks.cache import get_check_key
+from api.v1.checks.cache import get_receipt_key
+from api.v1.checks.cache import receipt_cache
+from api.v1.checks.models import Check
+from api.v1.checks.models import Payment
+from api.v1.checks.models import Product
+from api.v1.checks.records import CheckRecord
+from api.v1.checks.records import PaymentRecord
+from api.v1.checks.records import ProductRecord
+from api.v1.checks.records import StoredCheck
+from api.v1.checks.filters import CheckFilters
+from api.v1.checks.schemas import CheckBatchResult
 from api.v1.checks.schemas import CheckCreate
 from api.v1.checks.schemas import CheckSchema
+from api.v1.checks.schemas import DailyReportSchema
+from api.v1.checks.schemas import DailyTotalSchema
 from api.v1.checks.schemas import PaymentCreate
-from api.v1.checks.schemas import PaymentInDb
-from api.v1.checks.schemas import ProductInDb
-from api.v1.checks.schemas import ProductCreate
 from api.v1.checks.schemas import ProductSchema
+from api.v1.checks.schemas import validate_totals
 from api.v1.checks.repositories import CheckRepository
+from api.v1.checks.repositories import DailyTotalRepository
 from api.v1.checks.repositories import ProductRepository
 from api.v1.checks.repositories import PaymentRepository
+from api.v1.checks.repositories import ReceiptRepository
+from api.v1.checks.receipts import get_receipt_layout
 from config import settings
+from sdk.exceptions.exceptions import AppException
+from sdk.exceptions.exceptions import make_error
+from sdk.partitions import MonthlyPartitions
+from sdk.partitions import add_months
+from sdk.partitions import get_month
+from sdk.responses import ResponseStatus
+
+logger = logging.getLogger(__name__)
 
 
 class ProductService:
     repository = ProductRepository
 
-    @classmethod
-    async def create_products(
-            cls,
-            check_uuid: UUID,
-            products: List[ProductCreate]
-    ) -> List[ProductSchema]:
-        products = [ProductInDb(
-            uuid=uuid.uuid4(),
-            check=check_uuid,
-            **product.dict()
-        ).dict() for product in products]
-        await cls.repository.create(items=products).execute()
-        return [ProductSchema(**product) for product in products]
-
 
 class PaymentService:
     repository = PaymentRepository
 
-    @classmethod
-    async def create_payment(
-            cls,
-            check_uuid: UUID,
-            payment: PaymentCreate
-    ) -> None:
-        payment = PaymentInDb(**payment.dict(), check=check_uuid, uuid=uuid.uuid4())
-        await cls.repository.create(**payment.dict()).execute()
+
+class PreparedCheck(NamedTuple):
+    """Rows of a validated check, ready to be inserted."""
+
+    check: CheckRecord
+    products: List[ProductRecord]
+    payment: PaymentRecord
 
 
 class CheckService:
@@ -57,54 +77,328 @@ class CheckService:
             check_data: CheckCreate,
             user_id: UUID
     ) -> CheckSchema:
-        check_uuid = uuid.uuid4()
-        await cls.repository.create(
-            uuid=check_uuid,
-            user=user_id
-        ).execute()
-        products = await ProductService.create_products(check_uuid, check_data.products)
-        await PaymentService.create_payment(check_uuid, check_data.payment)
-        return CheckSchema(
-            uuid=check_uuid,
-            created_at=datetime.datetime.now(),
-            products=products,
-            payment=check_data.payment,
+        """Validate and insert a check with its products and payment in a single statement."""
+        check = cls.prepare_check(check_data, user_id)
+        stored = await cls.repository.insert_check(
+            check=check.check.as_dict(),
+            products=[product.as_dict() for product in check.products],
+            payment=check.payment.as_dict(),
+        )
+        return cls.get_schema(stored)
+
+    @classmethod
+    def prepare_check(
+            cls: Type['CheckService'],
+            check_data: CheckCreate,
+            user_id: UUID,
+            check_uuid: Optional[UUID] = None,
+    ) -> PreparedCheck:
+        """Compute totals and build all rows of a check, raises NOT_ENOUGH_MONEY/EMPTY_CHECK without writing."""
+        total = sum(product.price * product.quantity for product in check_data.products)
+        rest = check_data.payment.amount - total
+        validate_totals(total, rest)
+        check_uuid = check_uuid or uuid.uuid4()
+        payment = check_data.payment
+        return PreparedCheck(
+            check=CheckRecord(
+                uuid=check_uuid,
+                user=user_id,
+                total=total,
+                rest=rest,
+                product_count=len(check_data.products),
+            ),
+            products=[
+                ProductRecord(
+                    uuid=uuid.uuid4(),
+                    check=check_uuid,
+                    name=product.name,
+                    price=product.price,
+                    quantity=product.quantity,
+                )
+                for product in check_data.products
+            ],
+            payment=PaymentRecord(uuid=uuid.uuid4(), check=check_uuid, type=payment.type, amount=payment.amount),
         )
 
     @staticmethod
-    def generate_check_text(check_data: CheckSchema) -> str:
-        lines = list()
-        lines.append(settings.CHECK_HEADER.center(settings.CHECK_LENGTH))
-        lines.append('=' * settings.CHECK_LENGTH)
-        lines.append('')
-        for product in check_data.products:
-            quantity_price = f'{product.quantity:.2f} x {product.price:.2f}'
-            lines.append(quantity_price)
-            name_parts = []
-            product_name = product.name
-            while len(product_name) > 0:
-                if len(product_name) <= settings.CHECK_LENGTH - 10:
-                    name_parts.append(product_name)
-                    break
-                else:
-                    space_index = product_name[:30].rfind(' ')
-                    if space_index == -1:
-                        space_index = settings.CHECK_LENGTH - 10
-                    name_parts.append(product_name[:space_index])
-                    product_name = product_name[space_index:].lstrip()
-            for i, part in enumerate(name_parts):
-                if i < len(name_parts) - 1:
-                    lines.append(f'    {part}')
-                else:
-                    total_space = settings.CHECK_LENGTH - len(part) - 4
-                    lines.append(f'    {part}' + f'{product.total:.2f}'.rjust(total_space, '.'))
-        lines.append('')
-        lines.append('-' * settings.CHECK_LENGTH)
-        lines.append('СУМА'.ljust(settings.CHECK_LENGTH - 10) + f'{check_data.total:.2f}'.rjust(10))
-        payment_type = 'Картка' if check_data.payment.type == enums.PaymentType.CASHLESS else 'Готівка'
-        lines.append(payment_type.ljust(settings.CHECK_LENGTH - 10) + f'{check_data.payment.amount:.2f}'.rjust(10))
-        lines.append('Решта'.ljust(settings.CHECK_LENGTH - 10) + f'{check_data.rest:.2f}'.rjust(10))
-        lines.append('=' * settings.CHECK_LENGTH)
-        lines.append(f'{check_data.created_at.strftime("%d.%m.%Y %H:%M")}'.center(settings.CHECK_LENGTH))
-        lines.append(settings.CHECK_FOOTER.center(settings.CHECK_LENGTH))
-        return '\n'.join(lines)
+    def get_schema(stored: StoredCheck) -> CheckSchema:
+        """
+        CheckSchema of a stored check.
+
+        The values were validated before they were stored, the schema is built without
+        running the validators again.
+        """
+        check = stored.check
+        return CheckSchema.construct(
+            uuid=check.uuid,
+            created_at=stored.created_at,
+            products=[product.to_schema(ProductSchema, total=product.total) for product in stored.products],
+            payment=stored.payment.to_schema(PaymentCreate),
+            total=check.total,
+            rest=check.rest,
+        )
+
+    @classmethod
+    async def create_checks(
+            cls: Type['CheckService'],
+            checks_data: List[CheckCreate],
+            user_id: UUID,
+    ) -> List[CheckBatchResult]:
+        """
+        Create a batch of checks, call inside a transaction.
+
+        Items failing validation are reported and skipped, the valid ones are written
+        with one multi-row INSERT per table.
+        """
+        if len(checks_data) > settings.CHECK_BATCH_MAX_SIZE:
+            raise make_error(
+                custom_code=ResponseStatus.VALIDATION_ERROR,
+                message=f'At most {settings.CHECK_BATCH_MAX_SIZE} checks per batch',
+            )
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        results = []
+        prepared = []
+        for index, check_data in enumerate(checks_data):
+            try:
+                item = cls.prepare_check(check_data, user_id)
+            except AppException as e:
+                results.append(CheckBatchResult(index=index, custom_code=e.custom_code, message=e.message))
+                continue
+            prepared.append(item)
+            check = cls.get_schema(StoredCheck(item.check, created_at, item.products, item.payment))
+            results.append(CheckBatchResult(index=index, check=check))
+        await cls.repository.create_many(
+            [item.check.as_dict(created_at=created_at) for item in prepared],
+        )
+        # Products and payments reference (uuid, created_at) of their check.
+        await ProductService.repository.create_many(
+            [product.as_dict(created_at=created_at) for item in prepared for product in item.products],
+        )
+        await PaymentService.repository.create_many(
+            [item.payment.as_dict(created_at=created_at) for item in prepared],
+        )
+        await DailyTotalService.add([(item, created_at) for item in prepared])
+        return results
+
+    @classmethod
+    async def cache_check(
+            cls: Type['CheckService'],
+            redis: RedisBackend,
+            check: CheckSchema,
+            user_id: UUID,
+    ) -> None:
+        """
+        Populate the read caches and the receipt file of a freshly created check, call once it is committed.
+
+        Best effort, the reads refill whatever is missing, a failure only gets logged.
+        """
+        try:
+            check_text = cls.generate_check_text(check)
+            await check_cache.set(redis, get_check_key(check.uuid, user_id), check)
+            await receipt_cache.set(redis, get_receipt_key(check.uuid), check_text)
+            await ReceiptRepository.store(check.uuid, check_text)
+        except Exception:
+            logger.exception('Caching check %s failed', check.uuid)
+
+    @classmethod
+    async def cache_checks(
+            cls: Type['CheckService'],
+            redis: RedisBackend,
+            checks: List[CheckSchema],
+            user_id: UUID,
+    ) -> None:
+        """
+        Populate the read caches of freshly created checks in a round trip per cache, call once they are committed.
+
+        Receipt files are left to get_receipt_file, most checks of a batch are never downloaded.
+        Best effort like cache_check.
+        """
+        try:
+            await check_cache.set_many(redis, {get_check_key(check.uuid, user_id): check for check in checks})
+            await receipt_cache.set_many(
+                redis,
+                {get_receipt_key(check.uuid): cls.generate_check_text(check) for check in checks},
+            )
+        except Exception:
+            logger.exception('Caching %s checks failed', len(checks))
+
+    @classmethod
+    async def get_check(
+            cls: Type['CheckService'],
+            redis: RedisBackend,
+            check_uuid: UUID,
+            user_id: UUID,
+    ) -> CheckSchema:
+        async def load() -> CheckSchema:
+            return cls.get_schema(await cls.repository.get_check(check_uuid=check_uuid, user_uuid=user_id))
+
+        return await check_cache.get_or_load(redis, get_check_key(check_uuid, user_id), load)
+
+    @classmethod
+    async def get_receipt(
+            cls: Type['CheckService'],
+            redis: RedisBackend,
+            check_uuid: UUID,
+    ) -> str:
+        async def render() -> str:
+            return cls.generate_check_text(cls.get_schema(await cls.repository.get_check(check_uuid=check_uuid)))
+
+        return await receipt_cache.get_or_load(redis, get_receipt_key(check_uuid), render)
+
+    @classmethod
+    async def get_receipt_file(
+            cls: Type['CheckService'],
+            redis: RedisBackend,
+            check_uuid: UUID,
+    ) -> str:
+        """Path of the receipt file, rendering it first if it is missing."""
+        if ReceiptRepository.exists(check_uuid):
+            return ReceiptRepository.get_path(check_uuid)
+        check_text = await cls.get_receipt(redis=redis, check_uuid=check_uuid)
+        return await ReceiptRepository.store(check_uuid, check_text)
+
+    @classmethod
+    async def export_checks_ndjson(
+            cls: Type['CheckService'],
+            user_uuid: UUID,
+            filters: CheckFilters,
+            chunk_size: int = 64 * 1024,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream checks as NDJSON while rows arrive from the cursor.
+
+        Checks are rendered to JSON by Postgres and passed through untouched,
+        lines are flushed in chunks of about `chunk_size` bytes.
+        """
+        chunk = []
+        size = 0
+        async for row in cls.repository.iterate_checks(user_uuid=user_uuid, **filters.dict()):
+            line = f'{row["check"]}\n'.encode()
+            chunk.append(line)
+            size += len(line)
+            if size >= chunk_size:
+                yield b''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield b''.join(chunk)
+
+    @staticmethod
+    def generate_check_text(check_data: CheckSchema, width: Optional[int] = None) -> str:
+        return get_receipt_layout(width).render(check_data)
+
+    @staticmethod
+    def generate_checks_text(checks: Iterable[CheckSchema], width: Optional[int] = None) -> str:
+        return get_receipt_layout(width).render_many(checks)
+
+
+class DailyTotalService:
+    repository = DailyTotalRepository
+
+    @classmethod
+    def get_rows(
+            cls: Type['DailyTotalService'],
+            checks: Iterable[Tuple[PreparedCheck, datetime.datetime]],
+    ) -> List[Dict[str, Any]]:
+        """Aggregate checks into rollup rows, one per user, day and payment type."""
+        timezone = ZoneInfo(settings.CHECK_REPORT_TIMEZONE)
+        rows: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for prepared, created_at in checks:
+            check = prepared.check
+            payment = prepared.payment
+            key = (str(check.user), created_at.astimezone(timezone).date(), payment.type.value)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {
+                    'user': check.user,
+                    'date': key[1],
+                    'payment_type': payment.type,
+                    'check_count': 0,
+                    'total': 0,
+                    'cash': 0,
+                    'cashless': 0,
+                    'rest': 0,
+                }
+            row['check_count'] += 1
+            row['total'] += check.total
+            row['cash' if payment.type == enums.PaymentType.CASH else 'cashless'] += payment.amount
+            row['rest'] += check.rest
+        # Concurrent writers lock the rollup rows in the same order.
+        return [rows[key] for key in sorted(rows)]
+
+    @classmethod
+    async def add(
+            cls: Type['DailyTotalService'],
+            checks: Iterable[Tuple[PreparedCheck, datetime.datetime]],
+    ) -> None:
+        """Add created checks to the rollup, call in the transaction that inserts them."""
+        await cls.repository.add(cls.get_rows(checks))
+
+    @classmethod
+    async def get_daily_report(
+            cls: Type['DailyTotalService'],
+            user_uuid: UUID,
+            date_from: datetime.date,
+            date_to: datetime.date,
+    ) -> List[DailyReportSchema]:
+        rows = await cls.repository.get_totals(user_uuid, date_from, date_to)
+        reports = []
+        for day, day_rows in groupby(rows, key=lambda row: row['date']):
+            payment_types = [
+                DailyTotalSchema(**{column: row[column] for column in DailyTotalSchema.__fields__})
+                for row in day_rows
+            ]
+            reports.append(DailyReportSchema(
+                date=day,
+                payment_types=payment_types,
+                **{
+                    column: sum(getattr(totals, column) for totals in payment_types)
+                    for column in cls.repository.sum_columns
+                },
+            ))
+        return reports
+
+    @classmethod
+    async def rebuild(
+            cls: Type['DailyTotalService'],
+            date_from: datetime.date,
+            date_to: datetime.date,
+            user_uuid: Optional[UUID] = None,
+    ) -> None:
+        await cls.repository.rebuild(date_from, date_to, user_uuid)
+
+
+class CheckPartitionService:
+    """Monthly partitions of checks and their products and payments, see sdk.partitions."""
+
+    # Referenced table first, lines reference (uuid, created_at) of checks.
+    partitions: Tuple[MonthlyPartitions, ...] = tuple(
+        MonthlyPartitions(model.__tablename__) for model in (Check, Product, Payment)
+    )
+
+    @classmethod
+    async def ensure(cls, months: Iterable[datetime.date]) -> List[datetime.date]:
+        """Create the missing partitions of `months`, returns the months created."""
+        months = set(months)
+        created = set()
+        for partitions in cls.partitions:
+            created.update(await partitions.ensure(months))
+        return sorted(created)
+
+    @classmethod
+    async def get_expired(cls, now: datetime.datetime, retention_months: int) -> List[datetime.date]:
+        """Attached months older than `retention_months` before the month of `now`, 0 keeps all."""
+        if retention_months <= 0:
+            return []
+        oldest = add_months(get_month(now), -retention_months)
+        months = set()
+        for partitions in cls.partitions:
+            months.update(month for month in await partitions.get_months() if month < oldest)
+        return sorted(months)
+
+    @classmethod
+    async def expire(cls, month: datetime.date, drop: bool = False) -> None:
+        """Detach or drop a month, lines before their checks."""
+        for partitions in reversed(cls.partitions):
+            if month in await partitions.get_months():
+                await (partitions.drop(month) if drop else partitions.detach(month))
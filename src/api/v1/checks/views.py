@@ -1,11 +1,29 @@
+import os
+import tempfile
+from datetime import date
 from datetime import datetime
+from typing import List
 from typing import Optional
 from uuid import UUID
+from zoneinfo import ZoneInfo
+from starlette.responses import FileResponse
 from starlette.responses import PlainTextResponse
+from starlette.responses import Response
+from starlette.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from cache import RedisBackend
+from api.v1.checks.schemas import CheckBatchResult
 from api.v1.checks.schemas import CheckCreate
 from api.v1.checks.schemas import CheckSchema
+from api.v1.checks.schemas import DailyReportSchema
+from api.v1.checks.filters import CheckFilters
+from api.v1.checks.reports import CheckReportService
+from api.v1.checks.repositories import ReceiptRepository
 from api.v1.checks.services import CheckService
+from api.v1.checks.services import DailyTotalService
 from api.v1.users.schemas import User
+from config import settings
+from dependencies import cache_storage
 from dependencies import get_transaction
 from dependencies import get_authenticated_user
 from fastapi import APIRouter
@@ -13,13 +31,16 @@ from fastapi import HTTPException
 from fastapi import Query
 from fastapi import Depends
 from fastapi_utils.cbv import cbv
-from api.v1.checks import enums
 from transaction import Transaction
+from sdk.idempotency import Idempotency
 from sdk.ordering import OrderingManager
 from sdk.ordering import get_ordering
+from sdk.exceptions.exceptions import make_error
 from sdk.pagination import PaginationManager
+from sdk.responses import ConditionalRequest
 from sdk.responses import DefaultResponse
 from sdk.responses import DefaultResponseSchema
+from sdk.responses import ResponseStatus
 from sdk.schemas import PaginatedSchema
 
 router = APIRouter()
@@ -38,15 +59,68 @@ class CheckViews:
             self,
             check_data: CheckCreate,
             transaction: Transaction = Depends(get_transaction),
-    ) -> DefaultResponse:
-        async with transaction:
-            check = await CheckService.create_check(
-                check_data=check_data,
-                user_id=self.authenticated_user.uuid
+            redis: RedisBackend = Depends(cache_storage),
+            idempotency: Idempotency = Depends(Idempotency),
+    ) -> Response:
+        created: List[CheckSchema] = []
+
+        async def create() -> DefaultResponse:
+            async with transaction:
+                check = await CheckService.create_check(
+                    check_data=check_data,
+                    user_id=self.authenticated_user.uuid
+                )
+            created.append(check)
+            return DefaultResponse(
+                content=check
             )
-        return DefaultResponse(
-            content=check
+
+        response = await idempotency.execute(
+            redis,
+            scope=f'check:create:{self.authenticated_user.uuid}',
+            payload=check_data,
+            handler=create,
+        )
+        # Once the response is stored, a failing cache write must not make the client retry.
+        for check in created:
+            await CheckService.cache_check(redis, check, self.authenticated_user.uuid)
+        return response
+
+    @router.post(
+        '/batch',
+        name='checks:create:batch',
+        response_model=DefaultResponseSchema[List[CheckBatchResult]],
+    )
+    async def create_checks_batch(
+            self,
+            checks_data: List[CheckCreate],
+            transaction: Transaction = Depends(get_transaction),
+            redis: RedisBackend = Depends(cache_storage),
+            idempotency: Idempotency = Depends(Idempotency),
+    ) -> Response:
+        created: List[CheckSchema] = []
+
+        async def create() -> DefaultResponse:
+            async with transaction:
+                results = await CheckService.create_checks(
+                    checks_data=checks_data,
+                    user_id=self.authenticated_user.uuid,
+                )
+            created.extend(result.check for result in results if result.check is not None)
+            return DefaultResponse(
+                content=results
+            )
+
+        response = await idempotency.execute(
+            redis,
+            scope=f'checks:create:batch:{self.authenticated_user.uuid}',
+            payload=checks_data,
+            handler=create,
         )
+        # Once the response is stored, a failing cache write must not make the client retry.
+        if created:
+            await CheckService.cache_checks(redis, created, self.authenticated_user.uuid)
+        return response
 
     @router.get(
         '/',
@@ -55,33 +129,101 @@ class CheckViews:
     )
     async def get_checks(
             self,
-            search_query: Optional[str] = Query(None, alias='search'),
-            created_at_before: Optional[datetime] = Query(
-                None, alias='created_at_before',
-                description='Example: 2024-04-01T00:00:00'
-            ),
-            created_at_after: Optional[datetime] = Query(
-                None, alias='created_at_after',
-                description='Example 2024-04-01T00:00:00'
-            ),
-            total_gte: Optional[int] = Query(None, alias='total_gte'),
-            total_lte: Optional[int] = Query(None, alias='total_lte'),
-            payment_type: Optional[enums.PaymentType] = Query(None, alias='payment_type'),
+            filters: CheckFilters = Depends(CheckFilters),
             ordering: OrderingManager = Depends(get_ordering),
             pagination: PaginationManager = Depends(PaginationManager),
+            conditional: ConditionalRequest = Depends(ConditionalRequest),
     ) -> DefaultResponse:
         checks = await CheckService.repository.get_checks(
-            created_at_before=created_at_before,
-            created_at_after=created_at_after,
-            total_gte=total_gte,
-            total_lte=total_lte,
-            payment_type=payment_type,
+            **filters.dict(),
             ordering=ordering,
             pagination=pagination,
-            search_query=search_query,
             user_uuid=self.authenticated_user.uuid,
         )
-        return DefaultResponse(content=checks)
+        return DefaultResponse(content=checks, conditional=conditional)
+
+    @router.get(
+        '/export.ndjson',
+        name='checks:export:ndjson',
+        response_class=StreamingResponse,
+    )
+    async def export_checks_ndjson(
+            self,
+            filters: CheckFilters = Depends(CheckFilters),
+    ) -> StreamingResponse:
+        """All matching checks, oldest first, one JSON document per line."""
+        return StreamingResponse(
+            CheckService.export_checks_ndjson(user_uuid=self.authenticated_user.uuid, filters=filters),
+            media_type='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename="checks.ndjson"'},
+        )
+
+    @router.get(
+        '/report.csv',
+        name='checks:report:csv',
+        response_class=StreamingResponse,
+    )
+    async def get_checks_report_csv(
+            self,
+            filters: CheckFilters = Depends(CheckFilters),
+    ) -> StreamingResponse:
+        return StreamingResponse(
+            CheckReportService.iterate_csv(user_uuid=self.authenticated_user.uuid, filters=filters),
+            media_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename="checks.csv"'},
+        )
+
+    @router.get(
+        '/report.xlsx',
+        name='checks:report:xlsx',
+        response_class=FileResponse,
+    )
+    async def get_checks_report_xlsx(
+            self,
+            filters: CheckFilters = Depends(CheckFilters),
+    ) -> FileResponse:
+        """The workbook is built in a temporary file, XLSX is a zip and cannot be streamed while written."""
+        file_descriptor, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(file_descriptor)
+        try:
+            await CheckReportService.write_xlsx(user_uuid=self.authenticated_user.uuid, filters=filters, path=path)
+        except Exception:
+            os.remove(path)
+            raise
+        return FileResponse(
+            path,
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            filename='checks.xlsx',
+            background=BackgroundTask(os.remove, path),
+        )
+
+    @router.get(
+        '/reports/daily',
+        name='checks:reports:daily',
+        response_model=DefaultResponseSchema[List[DailyReportSchema]],
+    )
+    async def get_daily_report(
+            self,
+            date_from: Optional[date] = Query(None, description='First day, the first day of the month by default'),
+            date_to: Optional[date] = Query(None, description='Last day, today by default'),
+            conditional: ConditionalRequest = Depends(ConditionalRequest),
+    ) -> DefaultResponse:
+        date_to = date_to or datetime.now(ZoneInfo(settings.CHECK_REPORT_TIMEZONE)).date()
+        date_from = date_from or date_to.replace(day=1)
+        if not 0 <= (date_to - date_from).days < settings.CHECK_REPORT_MAX_DAYS:
+            raise make_error(
+                custom_code=ResponseStatus.VALIDATION_ERROR,
+                message=f'date_from must be before date_to, at most {settings.CHECK_REPORT_MAX_DAYS} days',
+            )
+        reports = await DailyTotalService.get_daily_report(
+            user_uuid=self.authenticated_user.uuid,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        return DefaultResponse(
+            content=reports,
+            conditional=conditional,
+        )
 
     @router.get(
         '/{check_uuid}',
@@ -92,12 +234,15 @@ class CheckViews:
             self,
             *,
             check_uuid: UUID,
+            redis: RedisBackend = Depends(cache_storage),
+            conditional: ConditionalRequest = Depends(ConditionalRequest),
     ) -> DefaultResponse:
-        check = await CheckService.repository.get_check(
+        check = await CheckService.get_check(
+            redis=redis,
             check_uuid=check_uuid,
-            user_uuid=self.authenticated_user.uuid,
+            user_id=self.authenticated_user.uuid,
         )
-        return DefaultResponse(content=check)
+        return DefaultResponse(content=check, conditional=conditional)
 
 
 @router.get(
@@ -108,10 +253,19 @@ class CheckViews:
 async def get_check_for_client(
         *,
         check_uuid: UUID,
-) -> PlainTextResponse:
+        conditional: ConditionalRequest = Depends(ConditionalRequest),
+        redis: RedisBackend = Depends(cache_storage),
+) -> Response:
+    """
+    Fallback of the fileproxy, which serves receipt files itself once they exist.
+
+    Renders a missing file and serves it with the same ETag nginx would use.
+    """
     try:
-        check = await CheckService.repository.get_check(check_uuid=check_uuid)
-        check_text = CheckService.generate_check_text(check)
+        path = await CheckService.get_receipt_file(redis=redis, check_uuid=check_uuid)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return PlainTextResponse(content=check_text)
+    etag = ReceiptRepository.get_etag(path)
+    if conditional.is_not_modified(etag, None):
+        return Response(status_code=304, headers={'ETag': etag})
+    return FileResponse(path, media_type='text/plain', headers={'ETag': etag})
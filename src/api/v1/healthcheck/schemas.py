@@ -7,6 +7,22 @@ class HealthCheckStatuses(BaseSchema):
     default_file_storage_health_check: str
     disk_usage: str
     memory_usage: str
+    partitions: str
 
     def is_all_success(self: 'HealthCheckStatuses') -> bool:
         return all(value == HealthCheck.OK_STATUS for _, value in self.__iter__())
+
+
+class CacheStats(BaseSchema):
+    local_hits: int
+    redis_hits: int
+    misses: int
+    local_size: int
+    local_max_size: int
+
+
+class RedisPoolStats(BaseSchema):
+    max_connections: int
+    created: int
+    in_use: int
+    idle: int
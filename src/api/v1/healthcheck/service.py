@@ -1,14 +1,23 @@
 import os
 import uuid
+from datetime import datetime
+from datetime import timezone
+from typing import Dict
 
 import aiofiles
 import psutil
 
 
 from cache import RedisBackend
+from cache import TieredCache
 from database import database
 
+from api.v1.checks.services import CheckPartitionService
 from api.v1.healthcheck.config import HealthCheck
+from api.v1.healthcheck.schemas import CacheStats
+from api.v1.healthcheck.schemas import RedisPoolStats
+from sdk.partitions import add_months
+from sdk.partitions import get_month
 
 
 async def check_database() -> str:
@@ -81,3 +90,26 @@ async def check_redis(redis_client: RedisBackend) -> str:
     return HealthCheck.OK_STATUS
 
 
+async def check_partitions() -> str:
+    """Checks can not be created in a month without partitions, manage-partitions has to run ahead of it."""
+    current = get_month(datetime.now(timezone.utc))
+    required = {current, add_months(current, 1)}
+    try:
+        for partitions in CheckPartitionService.partitions:
+            missing = required - set(await partitions.get_months())
+            if missing:
+                months = ', '.join(month.strftime('%Y-%m') for month in sorted(missing))
+                return f'{partitions.table} has no partition for {months}'
+    except Exception as e:
+        return str(e)
+    return HealthCheck.OK_STATUS
+
+
+def get_cache_stats() -> Dict[str, CacheStats]:
+    """Counters of this worker only, every process keeps its own local tier."""
+    return {name: CacheStats(**cache.get_stats()) for name, cache in TieredCache.instances.items()}
+
+
+def get_redis_pool_stats(redis_client: RedisBackend) -> RedisPoolStats:
+    """Connections of this worker's pool, `created` only grows while connections are opened."""
+    return RedisPoolStats(**redis_client.get_pool_stats())
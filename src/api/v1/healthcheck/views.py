@@ -1,3 +1,5 @@
+from typing import Dict
+
 from cache import RedisBackend
 from dependencies import cache_storage
 from fastapi import APIRouter
@@ -29,6 +31,24 @@ async def redis_check(redis_client: RedisBackend = Depends(cache_storage)) -> De
     return DefaultResponse(content=await service.check_redis(redis_client))
 
 
+@router.get('/redis/pool', response_model=DefaultResponseSchema[schemas.RedisPoolStats])
+async def redis_pool_stats(redis_client: RedisBackend = Depends(cache_storage)) -> DefaultResponse:
+    """Connection pool usage of the current worker"""
+    return DefaultResponse(content=service.get_redis_pool_stats(redis_client))
+
+
+@router.get('/partitions', response_model=DefaultResponseSchema[str])
+async def partitions_check() -> DefaultResponse:
+    """Partitions of the checks tables exist for this month and the next one"""
+    return DefaultResponse(content=await service.check_partitions())
+
+
+@router.get('/cache', response_model=DefaultResponseSchema[Dict[str, schemas.CacheStats]])
+def cache_stats() -> DefaultResponse:
+    """Hit/miss counters of the read-through caches of the current worker"""
+    return DefaultResponse(content=service.get_cache_stats())
+
+
 @router.get('/liveness', response_model=DefaultResponseSchema[schemas.HealthCheckStatuses])
 async def liveness(redis_client: RedisBackend = Depends(cache_storage)) -> DefaultResponse:
     """Сводная информация по работоспособности различных компонентов, используемых сервисом"""
@@ -39,6 +59,7 @@ async def liveness(redis_client: RedisBackend = Depends(cache_storage)) -> Defau
         default_file_storage_health_check=await service.check_file_storage(),
         disk_usage=service.check_disk_usage(),
         memory_usage=service.check_memory_usage(),
+        partitions=await service.check_partitions(),
         redis_health_check=await service.check_redis(redis_client),
     )
     if not hc_statuses.is_all_success():
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sdk.records import BaseRecord
+
+
+@dataclass
+class UserRecord(BaseRecord):
+    """Row of users, keep it away from responses, it carries the password hash."""
+
+    __slots__ = ('uuid', 'name', 'email', 'hashed_password', 'created_at', 'updated_at')
+
+    uuid: UUID
+    name: str
+    email: Optional[str]
+    hashed_password: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
@@ -2,6 +2,7 @@
 from typing import Optional
 from pydantic import EmailStr
 from pydantic import constr
+from sdk.schemas import AuditSchemaMixin
 from sdk.schemas import BaseSchema
 from sdk.schemas import UUIDSchemaMixin
 
@@ -30,3 +31,7 @@ class UserCreateInDbWithUUID(UserCreateInDb, UUIDSchemaMixin):
 class User(UUIDSchemaMixin):
     name: str
     email: Optional[str] = None
+
+
+class UserSchema(User, AuditSchemaMixin):
+    pass
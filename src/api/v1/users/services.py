@@ -1,9 +1,9 @@
 import uuid
 from uuid import UUID
+from api.v1.users.records import UserRecord
 from api.v1.users.repositories import UserRepository
-from api.v1.users.schemas import User
 from api.v1.users.schemas import UserCreateInDb
-from api.v1.users.schemas import UserCreateInDbWithUUID
+from api.v1.users.schemas import UserSchema
 from api.v1.users.schemas import UserUpdate
 from sdk.exceptions.exceptions import make_error
 from sdk.responses import ResponseStatus
@@ -27,38 +27,51 @@ class UserService:
     async def get_user(
             cls,
             **kwargs,
-    ) -> User:
+    ) -> UserRecord:
         user = await cls.repository.get().where(**kwargs).execute()
         if not user:
             raise make_error(
                 custom_code=ResponseStatus.USER_NOT_FOUND,
                 message='User not found',
             )
-        return User(**user)
+        return UserRecord.from_row(user)
+
+    @classmethod
+    async def get_me(
+            cls,
+            user_uuid: UUID,
+    ) -> UserSchema:
+        return (await cls.get_user(uuid=user_uuid)).to_schema(UserSchema)
 
     @classmethod
     async def get_user_with_password_hash(
             cls,
             **kwargs,
-    ) -> UserCreateInDbWithUUID:
-        user = await cls.repository.get().where(**kwargs).execute()
-        if not user:
-            raise make_error(
-                custom_code=ResponseStatus.USER_NOT_FOUND,
-                message='User not found',
-            )
-        return UserCreateInDbWithUUID(**user)
+    ) -> UserRecord:
+        return await cls.get_user(**kwargs)
 
     @classmethod
     async def create_user(
             cls,
             user_data: UserCreateInDb,
-    ) -> User:
+    ) -> UserRecord:
         if await cls.repository.count().where(email=user_data.email).execute():
             raise make_error(
                 custom_code=ResponseStatus.USER_ALREADY_EXISTS,
                 message='User with this email already exists',
             )
-        user_uuid = uuid.uuid4()
-        await cls.repository.create(**user_data.dict(), uuid=user_uuid).execute()
-        return User(**user_data.dict(), uuid=user_uuid)
+        user = UserRecord(
+            uuid=uuid.uuid4(),
+            name=user_data.name,
+            email=user_data.email,
+            hashed_password=user_data.hashed_password,
+            created_at=None,
+            updated_at=None,
+        )
+        await cls.repository.create(
+            uuid=user.uuid,
+            name=user.name,
+            email=user.email,
+            hashed_password=user.hashed_password,
+        ).execute()
+        return user
@@ -4,8 +4,10 @@ from fastapi import Depends
 from fastapi_utils.cbv import cbv
 
 from api.v1.users.schemas import User
+from api.v1.users.schemas import UserSchema
 from api.v1.users.schemas import UserUpdate
 from api.v1.users.services import UserService
+from sdk.responses import ConditionalRequest
 from sdk.responses import DefaultResponse
 from sdk.responses import DefaultResponseSchema
 
@@ -19,13 +21,15 @@ class UserViews:
     @router.get(
         '/me',
         name='users:me',
-        response_model=DefaultResponseSchema[User],
+        response_model=DefaultResponseSchema[UserSchema],
     )
     async def get_me(
         self,
+        conditional: ConditionalRequest = Depends(ConditionalRequest),
     ) -> DefaultResponse:
         return DefaultResponse(
-            content=await UserService.get_user(uuid=self.authenticated_user.uuid),
+            content=await UserService.get_me(user_uuid=self.authenticated_user.uuid),
+            conditional=conditional,
         )
 
     @router.patch(
@@ -1,7 +1,132 @@
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
 from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
 from typing import Union
 
+from aioredis import BlockingConnectionPool
 from aioredis import Redis
+from aioredis.client import Pipeline
+from aioredis.client import Script
+from aioredis.connection import Connection
+from config import settings
+
+RedisValue = Union[str, bytes, int, float]
+
+
+class RedisScript:
+    """
+    A Lua script, run atomically by Redis in one round trip.
+
+    Scripts are registered by name when their module is imported and run with
+    RedisBackend.run_script(). Every key a script touches has to be passed in `keys`.
+    """
+
+    registry: Dict[str, 'RedisScript'] = {}
+
+    def __init__(self, name: str, source: str) -> None:
+        self.name = name
+        self.source = source
+        RedisScript.registry[name] = self
+
+
+class RedisPipeline:
+    """
+    Commands queued by RedisBackend.pipeline(), sent together when the block exits.
+
+    Replies are in `results`, in the order the commands were queued.
+    """
+
+    def __init__(self, pipeline: Pipeline, scripts: Callable[[str], Script]) -> None:
+        self._pipeline = pipeline
+        self._get_script = scripts
+        self.results: List[Any] = []
+
+    def get(self, key: Union[str, bytes]) -> 'RedisPipeline':
+        self._pipeline.get(key)
+        return self
+
+    def set(  # noqa: A003
+        self,
+        key: str,
+        value: RedisValue,
+        expire: int = 0,
+        nx: bool = False,
+    ) -> 'RedisPipeline':
+        self._pipeline.set(key, value, ex=expire or None, nx=nx)
+        return self
+
+    def delete(self, *keys: Union[str, bytes]) -> 'RedisPipeline':
+        self._pipeline.delete(*keys)
+        return self
+
+    def incr(self, key: str) -> 'RedisPipeline':
+        self._pipeline.incr(key)
+        return self
+
+    def expire(self, key: str, expire: int) -> 'RedisPipeline':
+        self._pipeline.expire(key, expire)
+        return self
+
+    def ttl(self, key: Union[str, bytes]) -> 'RedisPipeline':
+        self._pipeline.ttl(key)
+        return self
+
+    def zadd(self, key: str, members: Mapping[Union[str, bytes], float]) -> 'RedisPipeline':
+        self._pipeline.zadd(key, members)
+        return self
+
+    def zrem(self, key: str, *members: Union[str, bytes]) -> 'RedisPipeline':
+        self._pipeline.zrem(key, *members)
+        return self
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> 'RedisPipeline':
+        self._pipeline.hincrby(key, field, amount)
+        return self
+
+    def publish(self, channel: str, message: RedisValue) -> 'RedisPipeline':
+        self._pipeline.publish(channel, message)
+        return self
+
+    def run_script(self, name: str, keys: Sequence[str] = (), args: Sequence[RedisValue] = ()) -> 'RedisPipeline':
+        # Queued as EVALSHA, the pipeline loads missing scripts before it is sent.
+        script = self._get_script(name)
+        self._pipeline.scripts.add(script)
+        self._pipeline.evalsha(script.sha, len(keys), *keys, *args)
+        return self
+
+
+class CountingConnectionPool(BlockingConnectionPool):
+    """BlockingConnectionPool that counts its connections, aioredis only keeps them in private attributes."""
+
+    def reset(self) -> None:
+        super().reset()
+        self.created = 0
+        self.checked_out: Set[int] = set()
+
+    def make_connection(self) -> Connection:
+        self.created += 1
+        return super().make_connection()
+
+    async def get_connection(self, command_name: str, *keys: Any, **options: Any) -> Connection:  # noqa: ANN401
+        connection = await super().get_connection(command_name, *keys, **options)
+        self.checked_out.add(id(connection))
+        return connection
+
+    async def release(self, connection: Connection) -> None:
+        # Also called by get_connection for connections it failed to hand out.
+        self.checked_out.discard(id(connection))
+        await super().release(connection)
 
 
 class RedisBackend:
@@ -9,43 +134,361 @@ class RedisBackend:
 
     def __init__(self, redis: Redis) -> None:
         self._redis = redis
+        self._scripts: Dict[str, Script] = {}
 
     @staticmethod
-    async def create_pool(uri: str) -> 'RedisBackend':
-        redis = await Redis.from_url(uri)
-        return RedisBackend(redis)
+    async def create_pool(
+        uri: str,
+        max_connections: int = settings.REDIS_MAX_CONNECTIONS,
+        timeout: Optional[float] = settings.REDIS_POOL_TIMEOUT,
+        socket_timeout: Optional[float] = settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout: Optional[float] = settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval: int = settings.REDIS_HEALTH_CHECK_INTERVAL,
+    ) -> 'RedisBackend':
+        """
+        Backend on a pool of at most `max_connections` connections, opened on demand.
+
+        Callers wait up to `timeout` seconds for a free connection when all of them are in use.
+        Connections idle for more than `health_check_interval` seconds are pinged before reuse.
+        """
+        pool = CountingConnectionPool.from_url(
+            uri,
+            max_connections=max_connections,
+            timeout=timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            health_check_interval=health_check_interval,
+        )
+        return RedisBackend(Redis(connection_pool=pool))
 
     async def close(self) -> None:
         await self._redis.close()
+        # Redis closes only the pools it created itself.
+        await self._redis.connection_pool.disconnect()
+
+    def get_pool_stats(self) -> Dict[str, int]:
+        pool: CountingConnectionPool = self._redis.connection_pool
+        in_use = len(pool.checked_out)
+        return {
+            'max_connections': pool.max_connections,
+            'created': pool.created,
+            'in_use': in_use,
+            'idle': max(pool.created - in_use, 0),
+        }
 
     async def get(self: 'RedisBackend', key: Union[str, bytes]) -> bytes:
         return await self._redis.get(key)
 
-    async def delete(self: 'RedisBackend', key: Union[str, bytes]) -> None:
-        await self._redis.delete(key)
+    async def mget(self: 'RedisBackend', *keys: Union[str, bytes]) -> List[Optional[bytes]]:
+        return await self._redis.mget(*keys)
+
+    async def delete(self: 'RedisBackend', *keys: Union[str, bytes]) -> None:
+        await self._redis.delete(*keys)
 
     async def keys(self: 'RedisBackend', match: Union[str, bytes]) -> List[bytes]:
         return await self._redis.keys(match)
 
-    async def set(
+    async def scan(self: 'RedisBackend', match: str, count: int = 1000) -> AsyncIterator[List[bytes]]:
+        """
+        Keys matching `match` in batches of about `count`, without blocking Redis like KEYS.
+
+        Keys written while scanning may be missed or returned twice.
+        """
+        cursor = 0
+        while True:
+            cursor, keys = await self._redis.scan(cursor, match=match, count=count)
+            if keys:
+                yield keys
+            if not cursor:
+                return
+
+    async def zrangebyscore(
         self: 'RedisBackend',
         key: str,
-        value: Union[str, bytes, int],
+        min_score: float = float('-inf'),
+        max_score: float = float('inf'),
+    ) -> List[Tuple[bytes, float]]:
+        """Members of a sorted set scored between `min_score` and `max_score` with their scores."""
+        return await self._redis.zrangebyscore(key, min_score, max_score, withscores=True)
+
+    async def zscan(self: 'RedisBackend', key: str, match: str) -> List[Tuple[bytes, float]]:
+        """Members of a sorted set matching `match` with their scores."""
+        return [member async for member in self._redis.zscan_iter(key, match=match)]
+
+    async def zrem(self: 'RedisBackend', key: str, *members: Union[str, bytes]) -> None:
+        await self._redis.zrem(key, *members)
+
+    async def hget(self: 'RedisBackend', key: str, field: str) -> Optional[bytes]:
+        return await self._redis.hget(key, field)
+
+    async def hgetall(self: 'RedisBackend', key: str) -> Dict[bytes, bytes]:
+        return await self._redis.hgetall(key)
+
+    async def set(  # noqa: A003
+        self: 'RedisBackend',
+        key: str,
+        value: RedisValue,
         expire: int = 0,
-    ) -> None:
-        await self._redis.set(key, value, ex=expire)
+        nx: bool = False,
+    ) -> bool:
+        """
+        SET with its expiry in one command, 0 keeps the key forever.
+
+        With `nx` only a missing key is set. Returns whether the key was set.
+        """
+        return bool(await self._redis.set(key, value, ex=expire or None, nx=nx))
 
     async def setnx(
         self: 'RedisBackend',
         key: str,
-        value: Union[str, bytes, int],
+        value: RedisValue,
         expire: int,
-    ) -> None:
-        await self._redis.setnx(key, value)
-        await self._redis.expire(key, expire)
+    ) -> bool:
+        """Set the key if it does not exist, atomically with its expiry. Returns whether it was set."""
+        return await self.set(key, value, expire=expire, nx=True)
+
+    async def mset(self: 'RedisBackend', values: Mapping[str, RedisValue], expire: int = 0) -> None:
+        """Set all `values` in one round trip, MSET has no expiry, expiring keys are pipelined SETs."""
+        if not values:
+            return
+        if not expire:
+            await self._redis.mset(values)
+            return
+        async with self.pipeline(transaction=False) as pipeline:
+            for key, value in values.items():
+                pipeline.set(key, value, expire=expire)
+
+    @asynccontextmanager
+    async def pipeline(self: 'RedisBackend', transaction: bool = True) -> AsyncIterator[RedisPipeline]:
+        """
+        Queue commands on the yielded pipeline, they are sent in one round trip when the block exits.
+
+        With `transaction` they run in MULTI/EXEC, no other client's command runs in between.
+        Nothing is sent if the block raises.
+        """
+        async with self._redis.pipeline(transaction=transaction) as pipe:
+            pipeline = RedisPipeline(pipe, self._get_script)
+            yield pipeline
+            pipeline.results = await pipe.execute()
+
+    def _get_script(self: 'RedisBackend', name: str) -> Script:
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = self._redis.register_script(RedisScript.registry[name].source)
+        return script
+
+    async def run_script(
+        self: 'RedisBackend',
+        name: str,
+        keys: Sequence[str] = (),
+        args: Sequence[RedisValue] = (),
+    ) -> Any:  # noqa: ANN401
+        """Run a registered RedisScript by EVALSHA, the script is loaded on the first NOSCRIPT reply."""
+        return await self._get_script(name)(keys=keys, args=args)
 
     async def incr(self: 'RedisBackend', key: str) -> str:
         return await self._redis.incr(key)
 
+    async def publish(self: 'RedisBackend', channel: str, message: RedisValue) -> int:
+        return await self._redis.publish(channel, message)
+
+    async def listen(
+            self: 'RedisBackend',
+            channel: str,
+            on_subscribe: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Messages published on `channel` from now on, for as long as the caller iterates.
+
+        Holds a connection of the pool meanwhile, raises RedisError when it is lost,
+        messages published until the caller subscribes again are lost. `on_subscribe`
+        is called once Redis confirmed the subscription.
+        """
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            while True:
+                # Polled, a blocking read would hit the socket timeout of the pool.
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                if message['type'] == 'message':
+                    yield message['data']
+                elif message['type'] == 'subscribe' and on_subscribe is not None:
+                    on_subscribe()
+        finally:
+            await pubsub.reset()
+
     async def ping(self) -> bool:
         return await self._redis.ping()
+
+
+class RedisPool:
+    """
+    The RedisBackend of this process, shared by all requests.
+
+    Opened in the startup hook next to the database, requests get it through
+    dependencies.cache_storage. Opened on first use where no startup hook runs.
+    """
+
+    def __init__(self, uri: Optional[str]) -> None:
+        self.uri = uri
+        self._backend: Optional[RedisBackend] = None
+
+    async def connect(self) -> RedisBackend:
+        if self._backend is None:
+            self._backend = await RedisBackend.create_pool(self.uri)
+        return self._backend
+
+    async def disconnect(self) -> None:
+        backend, self._backend = self._backend, None
+        if backend is not None:
+            await backend.close()
+
+
+redis_pool = RedisPool(settings.REDIS_URI)
+
+
+class TieredCache:
+    """
+    Read-through cache for immutable values: a bounded per-process LRU in front of Redis.
+
+    Values are never updated once stored, so the local tier needs no invalidation,
+    `expire` only bounds how long Redis keeps them.
+    """
+
+    instances: Dict[str, 'TieredCache'] = {}
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        expire: int,
+        dumps: Callable[[Any], Union[str, bytes]],
+        loads: Callable[[bytes], Any],
+    ) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.expire = expire
+        self.dumps = dumps
+        self.loads = loads
+        self._local: 'OrderedDict[str, Any]' = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        TieredCache.instances[name] = self
+
+    def get_key(self, key: str) -> str:
+        return f'{self.name}:{key}'
+
+    def _remember(self, key: str, value: Any) -> None:  # noqa: ANN401
+        if self.max_size <= 0:
+            return
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def get(self, redis: RedisBackend, key: str) -> Optional[Any]:
+        if key in self._local:
+            self._local.move_to_end(key)
+            self.local_hits += 1
+            return self._local[key]
+        raw = await redis.get(self.get_key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.redis_hits += 1
+        value = self.loads(raw)
+        self._remember(key, value)
+        return value
+
+    async def set(self, redis: RedisBackend, key: str, value: Any) -> None:  # noqa: ANN401
+        self._remember(key, value)
+        await redis.set(self.get_key(key), self.dumps(value), expire=self.expire)
+
+    async def set_many(self, redis: RedisBackend, values: Mapping[str, Any]) -> None:
+        """Like `set` for every item, in one round trip."""
+        for key, value in values.items():
+            self._remember(key, value)
+        await redis.mset({self.get_key(key): self.dumps(value) for key, value in values.items()}, expire=self.expire)
+
+    async def get_or_load(
+        self,
+        redis: RedisBackend,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+    ) -> Any:  # noqa: ANN401
+        value = await self.get(redis, key)
+        if value is None:
+            value = await load()
+            await self.set(redis, key, value)
+        return value
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'local_size': len(self._local),
+            'local_max_size': self.max_size,
+        }
+
+
+class LocalCache:
+    """
+    Bounded per-process LRU for values that change, every entry expires at its own unix time.
+
+    Workers do not share it, whoever changes a value evicts it, other workers
+    serve their copy until it expires.
+    """
+
+    instances: Dict[str, 'LocalCache'] = {}
+
+    def __init__(self, name: str, max_size: int) -> None:
+        self.name = name
+        self.max_size = max_size
+        self._local: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by evict and clear, a value loaded while it changed may be stale already.
+        self.evictions = 0
+        LocalCache.instances[name] = self
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._local.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._local[key]
+            self.misses += 1
+            return None
+        self._local.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:  # noqa: A003, ANN401
+        if self.max_size <= 0:
+            return
+        self._local[key] = (expires_at, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    def evict(self, key: str) -> None:
+        self.evictions += 1
+        self._local.pop(key, None)
+
+    def clear(self) -> None:
+        self.evictions += 1
+        self._local.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._local),
+            'max_size': self.max_size,
+        }
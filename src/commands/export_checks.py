@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from commands.base import BaseCommand
+
+from api.v1.checks import enums
+from api.v1.checks.filters import CheckFilters
+from api.v1.checks.reports import CheckReportService
+
+
+class ExportChecks(BaseCommand):
+    command_name = 'export-checks'
+    help_text = 'Export checks of a user to a CSV or XLSX report, one row per product line.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('--user', type=UUID, required=True, help='UUID of the cashier.')
+        parser.add_argument('-o', '--output', required=True, help='Report path, .csv or .xlsx.')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'xlsx'),
+            help='Report format, taken from the output extension by default.',
+        )
+        parser.add_argument('--created-at-after', type=datetime.fromisoformat, help='Example: 2024-04-01T00:00:00')
+        parser.add_argument('--created-at-before', type=datetime.fromisoformat, help='Example: 2024-04-01T00:00:00')
+        parser.add_argument('--total-gte', type=int)
+        parser.add_argument('--total-lte', type=int)
+        parser.add_argument('--payment-type', type=enums.PaymentType, choices=list(enums.PaymentType))
+        parser.add_argument('--search')
+        parser.add_argument(
+            '--search-mode',
+            type=enums.SearchMode,
+            choices=list(enums.SearchMode),
+            default=enums.SearchMode.TRIGRAM,
+        )
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        report_format = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+        if report_format not in ('csv', 'xlsx'):
+            raise ValueError('Report format must be csv or xlsx')
+        filters = CheckFilters(
+            search_query=args.search,
+            search_mode=args.search_mode,
+            created_at_before=args.created_at_before,
+            created_at_after=args.created_at_after,
+            total_gte=args.total_gte,
+            total_lte=args.total_lte,
+            payment_type=args.payment_type,
+        )
+        started = time.perf_counter()
+        if report_format == 'csv':
+            await CheckReportService.write_csv(user_uuid=args.user, filters=filters, path=args.output)
+        else:
+            await CheckReportService.write_xlsx(user_uuid=args.user, filters=filters, path=args.output)
+        print(f'{args.output} written in {time.perf_counter() - started:.1f} s')  # noqa: T201
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from datetime import timezone
+from itertools import islice
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TextIO
+from uuid import UUID
+
+from commands.base import BaseCommand
+
+from api.v1.checks.imports import CheckImportService
+
+
+class ImportCheckpoint:
+    """Progress of an import, saved next to the source after every committed batch."""
+
+    def __init__(self, path: str, source: Dict[str, Any]) -> None:
+        self.path = path
+        self.source = source
+        self.position = 0
+        self.imported = 0
+        self.rejected = 0
+
+    @staticmethod
+    def get_source(input_path: str) -> Dict[str, Any]:
+        return {'path': os.path.abspath(input_path), 'size': os.path.getsize(input_path)}
+
+    @classmethod
+    def load(cls, path: str, input_path: str) -> 'ImportCheckpoint':
+        checkpoint = cls(path, cls.get_source(input_path))
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path) as checkpoint_file:
+            data = json.load(checkpoint_file)
+        if data['source'] != checkpoint.source:
+            raise ValueError(f'{path} belongs to another file, use --restart to import from the beginning')
+        checkpoint.position = data['position']
+        checkpoint.imported = data['imported']
+        checkpoint.rejected = data['rejected']
+        return checkpoint
+
+    def save(self) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump(
+                {
+                    'source': self.source,
+                    'position': self.position,
+                    'imported': self.imported,
+                    'rejected': self.rejected,
+                },
+                checkpoint_file,
+            )
+        os.replace(tmp_path, self.path)
+
+
+class ImportChecks(BaseCommand):
+    command_name = 'import-checks'
+    help_text = 'Bulk load historical checks of a user from an NDJSON export or a CSV/XLSX report.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('-i', '--input', required=True, help='Source path, .ndjson, .csv or .xlsx.')
+        parser.add_argument('--user', type=UUID, required=True, help='UUID of the cashier the checks belong to.')
+        parser.add_argument(
+            '--format',
+            choices=CheckImportService.formats,
+            help='Source format, taken from the input extension by default.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Checks per COPY transaction.')
+        parser.add_argument('--checkpoint', help='Checkpoint path, <input>.checkpoint by default.')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over.')
+        parser.add_argument('--rejects', help='Append rejected checks with the reason to this NDJSON file.')
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        file_format = args.format or os.path.splitext(args.input)[1].lstrip('.').lower()
+        if file_format not in CheckImportService.formats:
+            raise ValueError(f'Source format must be one of {", ".join(CheckImportService.formats)}')
+        if args.batch_size < 1:
+            raise ValueError('Batch size must be positive')
+        checkpoint_path = args.checkpoint or f'{args.input}.checkpoint'
+        if args.restart:
+            checkpoint = ImportCheckpoint(checkpoint_path, ImportCheckpoint.get_source(args.input))
+        else:
+            checkpoint = ImportCheckpoint.load(checkpoint_path, args.input)
+        if checkpoint.position:
+            print(f'Resuming after {checkpoint.position} checks')  # noqa: T201
+        # Checks without a timestamp in the source get the start of the import.
+        default_created_at = datetime.now(timezone.utc)
+        rejects_file = open(args.rejects, 'a', encoding='utf-8') if args.rejects else None
+        started = time.perf_counter()
+        read = rows = 0
+        try:
+            raw_checks = islice(CheckImportService.read_checks(args.input, file_format), checkpoint.position, None)
+            while True:
+                batch = list(islice(raw_checks, args.batch_size))
+                if not batch:
+                    break
+                rows += await cls.import_batch(batch, args.user, default_created_at, checkpoint, rejects_file)
+                read += len(batch)
+                elapsed = time.perf_counter() - started
+                print(  # noqa: T201
+                    f'{checkpoint.position} checks read, {checkpoint.imported} imported, '
+                    f'{checkpoint.rejected} rejected, {read / elapsed:.0f} checks/s',
+                )
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+        elapsed = time.perf_counter() - started
+        print(  # noqa: T201
+            f'Done in {elapsed:.1f} s: {read} checks read, {rows} rows written, '
+            f'{read / elapsed if elapsed else 0:.0f} checks/s, {rows / elapsed if elapsed else 0:.0f} rows/s. '
+            f'Total {checkpoint.imported} imported, {checkpoint.rejected} rejected.',
+        )
+
+    @classmethod
+    async def import_batch(
+            cls,
+            batch: List[Dict[str, Any]],
+            user_id: UUID,
+            default_created_at: datetime,
+            checkpoint: ImportCheckpoint,
+            rejects_file: Optional[TextIO],
+    ) -> int:
+        namespace = CheckImportService.get_namespace(checkpoint.source, user_id)
+        checks, rejected = CheckImportService.validate_batch(
+            batch,
+            user_id,
+            default_created_at,
+            namespace,
+            checkpoint.position,
+        )
+        # Checks stored by an earlier run are skipped, only the new ones count as imported.
+        imported, rows = await CheckImportService.copy_batch(checks)
+        if rejects_file is not None:
+            for index, error in rejected:
+                reject = {'position': checkpoint.position + index, 'error': error, 'check': batch[index]}
+                rejects_file.write(json.dumps(reject, default=str, ensure_ascii=False) + '\n')
+            rejects_file.flush()
+        checkpoint.position += len(batch)
+        checkpoint.imported += imported
+        checkpoint.rejected += len(rejected)
+        checkpoint.save()
+        return rows
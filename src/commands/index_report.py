@@ -0,0 +1,104 @@
+import argparse
+import uuid
+from typing import Dict
+from typing import Optional
+
+import sqlalchemy as sa
+from commands.base import BaseCommand
+from database import database
+from sqlalchemy.sql import Select
+
+from api.v1.checks.enums import SearchMode
+from api.v1.checks.models import Check
+from api.v1.checks.repositories import CheckRepository
+from api.v1.users.repositories import UserRepository
+from sdk.enums import CountStrategy
+from sdk.enums import PaginationMode
+from sdk.explain import explain
+from sdk.explain import iter_plan_nodes
+from sdk.ordering import OrderingManager
+from sdk.pagination import PaginationManager
+
+
+class IndexReport(BaseCommand):
+    command_name = 'index-report'
+    help_text = 'EXPLAIN repository queries and flag sequential scans on large tables.'
+    page_size: int = 25
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            help='Flag sequential scans on tables with at least this many rows.',
+            default=10000,
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Use EXPLAIN ANALYZE, the queries are executed.',
+        )
+
+    @classmethod
+    def get_query_shapes(cls, check_uuid: str, user_uuid: str, email: str) -> Dict[str, Select]:
+        checks = CheckRepository.get_checks_query(user_uuid=user_uuid)
+        cursor_pagination = PaginationManager(
+            page=1,
+            page_size=cls.page_size,
+            mode=PaginationMode.CURSOR,
+            cursor=None,
+            count_strategy=CountStrategy.NONE,
+        )
+        return {
+            'checks:all': checks.limit(cls.page_size + 1),
+            'checks:all ordering=-total': checks.order_by(Check.total.desc()).limit(cls.page_size + 1),
+            'checks:all total_gte': CheckRepository.get_checks_query(
+                user_uuid=user_uuid,
+                total_gte=100,
+            ).limit(cls.page_size + 1),
+            'checks:all search': CheckRepository.get_checks_query(
+                user_uuid=user_uuid,
+                search_query='milk',
+            ).limit(cls.page_size + 1),
+            'checks:all search_mode=fulltext': CheckRepository.get_checks_query(
+                user_uuid=user_uuid,
+                search_query='milk',
+                search_mode=SearchMode.FULLTEXT,
+            ).limit(cls.page_size + 1),
+            'checks:all pagination=cursor': cursor_pagination.paginate_by_cursor(
+                checks,
+                OrderingManager(list()).get_keys(Check, default=('-created_at',)),
+            ),
+            'checks:get': CheckRepository.get_check_query(check_uuid, user_uuid),
+            'client:checks:get': CheckRepository.get_check_query(check_uuid),
+            'users:get': UserRepository.get().where(uuid=user_uuid).query,
+            'users:get email': UserRepository.get().where(email=email).query,
+        }
+
+    @classmethod
+    async def get_table_sizes(cls) -> Dict[str, float]:
+        rows = await database.fetch_all(
+            sa.text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')"),
+        )
+        return {row['relname']: row['reltuples'] for row in rows}
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        min_rows = args.min_rows if args else 10000
+        analyze = args.analyze if args else False
+        # Real ids give the planner realistic selectivity, random ones keep the report runnable on empty databases.
+        sample = await CheckRepository.get('uuid', 'user').execute()
+        check_uuid = str(sample['uuid']) if sample else str(uuid.uuid4())
+        user_uuid = str(sample['user']) if sample else str(uuid.uuid4())
+        table_sizes = await cls.get_table_sizes()
+        flagged = 0
+        for name, query in cls.get_query_shapes(check_uuid, user_uuid, 'index-report@example.com').items():
+            plan = await explain(query, analyze=analyze)
+            print(f'{name}: cost={plan["Total Cost"]} rows={plan["Plan Rows"]}')  # noqa: T201
+            for node in iter_plan_nodes(plan):
+                relation = node.get('Relation Name')
+                if node['Node Type'] != 'Seq Scan' or table_sizes.get(relation, 0) < min_rows:
+                    continue
+                flagged += 1
+                print(f'    SEQ SCAN on {relation} (~{int(table_sizes[relation])} rows)')  # noqa: T201
+        print(f'{flagged} sequential scan(s) on tables with at least {min_rows} rows')  # noqa: T201
@@ -0,0 +1,47 @@
+import argparse
+import time
+from typing import Optional
+
+from cache import redis_pool
+from commands.base import BaseCommand
+
+from api.v1.auth.services import INDEX_SESSION
+from api.v1.auth.services import SessionService
+
+
+class IndexSessions(BaseCommand):
+    command_name = 'index-sessions'
+    help_text = 'Add the sessions stored before session indexes to the index of their user, walks the keys with SCAN.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('--count', type=int, default=1000, help='Keys per SCAN call.')
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        redis = await redis_pool.connect()
+        indexed = 0
+        skipped = 0
+        # Both tokens are JWTs, the dots keep idempotency and cache keys out.
+        match = SessionService.get_session_key('*.*.*', '*.*.*', '*')
+        async for keys in redis.scan(match, count=args.count):
+            sessions = [key for key in keys if SessionService.parse_session_key(key)]
+            async with redis.pipeline(transaction=False) as ttls:
+                for key in sessions:
+                    ttls.ttl(key)
+            now = int(time.time())
+            # Indexing is idempotent, sessions created meanwhile are indexed already.
+            async with redis.pipeline(transaction=False) as pipeline:
+                for key, ttl in zip(sessions, ttls.results):
+                    if ttl <= 0:
+                        # Expired meanwhile or without expiry, an index cannot outlive it.
+                        skipped += 1
+                        continue
+                    _, _, user_id = SessionService.parse_session_key(key)
+                    pipeline.run_script(
+                        INDEX_SESSION.name,
+                        keys=[SessionService.get_index_key(user_id)],
+                        args=[key, ttl, now],
+                    )
+                    indexed += 1
+        print(f'Indexed {indexed} sessions, skipped {skipped} expired or without expiry.')  # noqa: T201
@@ -0,0 +1,59 @@
+import argparse
+from datetime import datetime
+from datetime import timezone
+from typing import Optional
+
+from commands.base import BaseCommand
+from config import settings
+from sdk.partitions import add_months
+from sdk.partitions import get_month
+
+from api.v1.checks.services import CheckPartitionService
+
+
+class ManagePartitions(BaseCommand):
+    command_name = 'manage-partitions'
+    help_text = 'Create the coming monthly partitions of checks, detach or drop the expired ones.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            '--precreate',
+            type=int,
+            help='Months to create after the current one, CHECK_PARTITION_PRECREATE_MONTHS by default.',
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            help='Months to keep before the current one, 0 keeps all, CHECK_PARTITION_RETENTION_MONTHS by default.',
+        )
+        parser.add_argument('--drop', action='store_true', default=None, help='Drop expired partitions.')
+        parser.add_argument('--dry-run', action='store_true', help='Only print what would be done.')
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        precreate = getattr(args, 'precreate', None)
+        retention = getattr(args, 'retention', None)
+        drop = getattr(args, 'drop', None)
+        dry_run = getattr(args, 'dry_run', False)
+        if precreate is None:
+            precreate = settings.CHECK_PARTITION_PRECREATE_MONTHS
+        if retention is None:
+            retention = settings.CHECK_PARTITION_RETENTION_MONTHS
+        if drop is None:
+            drop = settings.CHECK_PARTITION_DROP_EXPIRED
+
+        now = datetime.now(timezone.utc)
+        current = get_month(now)
+        months = [add_months(current, offset) for offset in range(precreate + 1)]
+        expired = await CheckPartitionService.get_expired(now, retention)
+        if dry_run:
+            print(f'Would ensure {months[0]:%Y-%m}..{months[-1]:%Y-%m}')  # noqa: T201
+            for month in expired:
+                print(f'Would {"drop" if drop else "detach"} {month:%Y-%m}')  # noqa: T201
+            return
+        for month in await CheckPartitionService.ensure(months):
+            print(f'Created {month:%Y-%m}')  # noqa: T201
+        for month in expired:
+            await CheckPartitionService.expire(month, drop=drop)
+            print(f'{"Dropped" if drop else "Detached"} {month:%Y-%m}')  # noqa: T201
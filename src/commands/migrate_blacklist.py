@@ -0,0 +1,45 @@
+import argparse
+import time
+from typing import Optional
+
+from cache import redis_pool
+from commands.base import BaseCommand
+
+from api.v1.auth.services import REVOKE_SESSION
+from api.v1.auth.services import SessionService
+from api.v1.auth.services import TokenService
+
+
+class MigrateBlacklist(BaseCommand):
+    command_name = 'migrate-blacklist'
+    help_text = 'Move tokens revoked by bl:{token} keys to the revocations of their users, walks keys with SCAN.'
+
+    blacklist_prefix = 'bl:'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('--count', type=int, default=1000, help='Keys per SCAN call.')
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        redis = await redis_pool.connect()
+        revoked = 0
+        expired = 0
+        async for keys in redis.scan(f'{cls.blacklist_prefix}*', count=args.count):
+            now = int(time.time())
+            async with redis.pipeline(transaction=False) as pipeline:
+                for key in keys:
+                    access_token = key.decode('utf-8')[len(cls.blacklist_prefix):]
+                    payload = TokenService.get_payload(access_token)
+                    if payload is None:
+                        # Expired, nothing to revoke anymore.
+                        expired += 1
+                    else:
+                        pipeline.run_script(
+                            REVOKE_SESSION.name,
+                            keys=[SessionService.get_revocations_key(payload['sub'])],
+                            args=[SessionService.get_session_id(payload, access_token), payload['exp'], now],
+                        )
+                        revoked += 1
+                    pipeline.delete(key)
+        print(f'Revoked {revoked} tokens, dropped {expired} expired, bl: keys are deleted.')  # noqa: T201
@@ -0,0 +1,134 @@
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+from datetime import timezone
+from typing import Callable
+from typing import List
+from typing import Optional
+
+from commands.base import BaseCommand
+from config import settings
+
+from api.v1.checks import enums
+from api.v1.checks.receipts import get_receipt_layout
+from api.v1.checks.schemas import CheckSchema
+from api.v1.checks.schemas import PaymentCreate
+from api.v1.checks.schemas import ProductSchema
+
+PRODUCT_NAMES = (
+    'Bread',
+    'Milk 2.5% 900 ml',
+    'Butter Selianske extra 82% 200 g',
+    'Chocolate Roshen milk with whole hazelnuts 90 g',
+    'Sunflower oil Oleina refined deodorized first grade 850 ml',
+    'Detergentforwashingmachinesconcentrated3kg',
+)
+
+
+def generate_check_text_before(check_data: CheckSchema, width: int) -> str:
+    """The renderer before ReceiptLayout, kept as the baseline of the benchmark."""
+    lines = list()
+    lines.append(settings.CHECK_HEADER.center(width))
+    lines.append('=' * width)
+    lines.append('')
+    for product in check_data.products:
+        quantity_price = f'{product.quantity:.2f} x {product.price:.2f}'
+        lines.append(quantity_price)
+        name_parts = []
+        product_name = product.name
+        while len(product_name) > 0:
+            if len(product_name) <= width - 10:
+                name_parts.append(product_name)
+                break
+            else:
+                space_index = product_name[:30].rfind(' ')
+                if space_index == -1:
+                    space_index = width - 10
+                name_parts.append(product_name[:space_index])
+                product_name = product_name[space_index:].lstrip()
+        for i, part in enumerate(name_parts):
+            if i < len(name_parts) - 1:
+                lines.append(f'    {part}')
+            else:
+                total_space = width - len(part) - 4
+                lines.append(f'    {part}' + f'{product.total:.2f}'.rjust(total_space, '.'))
+    lines.append('')
+    lines.append('-' * width)
+    lines.append('СУМА'.ljust(width - 10) + f'{check_data.total:.2f}'.rjust(10))
+    payment_type = 'Картка' if check_data.payment.type == enums.PaymentType.CASHLESS else 'Готівка'
+    lines.append(payment_type.ljust(width - 10) + f'{check_data.payment.amount:.2f}'.rjust(10))
+    lines.append('Решта'.ljust(width - 10) + f'{check_data.rest:.2f}'.rjust(10))
+    lines.append('=' * width)
+    lines.append(f'{check_data.created_at.strftime("%d.%m.%Y %H:%M")}'.center(width))
+    lines.append(settings.CHECK_FOOTER.center(width))
+    return '\n'.join(lines)
+
+
+class ReceiptBenchmark(BaseCommand):
+    command_name = 'receipt-benchmark'
+    help_text = 'Compare the compiled receipt layout with the previous renderer on generated checks.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('--checks', type=int, default=5000, help='Number of checks to render.')
+        parser.add_argument('--products', type=int, default=6, help='Products per check.')
+        parser.add_argument(
+            '--width',
+            type=int,
+            action='append',
+            help='Paper width in characters, can be repeated. Defaults to CHECK_LENGTH.',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is reported.')
+
+    @staticmethod
+    def generate_checks(count: int, products: int) -> List[CheckSchema]:
+        rng = random.Random(0)
+        checks = []
+        for _ in range(count):
+            items = [
+                ProductSchema(
+                    name=rng.choice(PRODUCT_NAMES),
+                    price=round(rng.uniform(5, 500), 2),
+                    quantity=rng.randint(1, 5),
+                )
+                for _ in range(products)
+            ]
+            total = sum(item.total for item in items)
+            checks.append(
+                CheckSchema(
+                    uuid=uuid.uuid4(),
+                    created_at=datetime.now(timezone.utc),
+                    products=items,
+                    payment=PaymentCreate(type=rng.choice(list(enums.PaymentType)), amount=total + 100),
+                ),
+            )
+        return checks
+
+    @staticmethod
+    def measure(render: Callable[[], str], repeat: int) -> float:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        checks = cls.generate_checks(args.checks, args.products)
+        for width in args.width or [settings.CHECK_LENGTH]:
+            layout = get_receipt_layout(width)
+
+            def render_before() -> str:
+                return '\n\n'.join(generate_check_text_before(check, width) for check in checks)
+
+            before = cls.measure(render_before, args.repeat)
+            after = cls.measure(lambda: layout.render_many(checks), args.repeat)
+            # The previous renderer wraps names at a fixed 30 columns, it is only correct for width 40.
+            same = render_before() == layout.render_many(checks)
+            print(  # noqa: T201
+                f'width={width} checks={len(checks)}: before {before * 1000:.1f} ms, '
+                f'compiled {after * 1000:.1f} ms, x{before / after:.1f}, identical output: {same}',
+            )
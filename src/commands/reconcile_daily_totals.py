@@ -0,0 +1,29 @@
+import argparse
+import time
+from datetime import date
+from typing import Optional
+from uuid import UUID
+
+from commands.base import BaseCommand
+
+from api.v1.checks.services import DailyTotalService
+
+
+class ReconcileDailyTotals(BaseCommand):
+    command_name = 'reconcile-daily-totals'
+    help_text = 'Rebuild the daily_totals rollup of some days from checks and payments.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('--date', type=date.fromisoformat, required=True, help='First day, e.g. 2024-04-01.')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day, the same as --date by default.')
+        parser.add_argument('--user', type=UUID, help='Only the checks of this cashier.')
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        date_to = args.until or args.date
+        if date_to < args.date:
+            raise ValueError('--until must not be before --date')
+        started = time.perf_counter()
+        await DailyTotalService.rebuild(args.date, date_to, args.user)
+        print(f'{args.date}..{date_to} rebuilt in {time.perf_counter() - started:.1f} s')  # noqa: T201
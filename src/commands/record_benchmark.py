@@ -0,0 +1,166 @@
+import argparse
+import gc
+import random
+import tracemalloc
+import uuid
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from commands.base import BaseCommand
+from commands.receipt_benchmark import PRODUCT_NAMES
+from commands.receipt_benchmark import ReceiptBenchmark
+
+from api.v1.checks import enums
+from api.v1.checks.records import ProductRecord
+from api.v1.checks.repositories import CheckRepository
+from api.v1.checks.schemas import CheckSchema
+from api.v1.checks.schemas import PaymentCreate
+from api.v1.checks.schemas import ProductCreate
+from api.v1.checks.schemas import ProductInDb
+from api.v1.checks.schemas import ProductSchema
+from api.v1.checks.services import CheckService
+
+
+def to_check_schema_before(row: Dict[str, Any]) -> CheckSchema:
+    """CheckRepository._to_check_schema before records, kept as the baseline of the benchmark."""
+    return CheckSchema(
+        uuid=row['uuid'],
+        created_at=row['created_at'],
+        products=[ProductSchema(**product) for product in row['products']],
+        payment=PaymentCreate(**row['payment']),
+        total=row['total'],
+        rest=row['rest'],
+    )
+
+
+def create_products_before(
+        check_uuid: uuid.UUID,
+        products: List[ProductCreate],
+) -> Tuple[List[Dict[str, Any]], List[ProductSchema]]:
+    """INSERT values and result of CheckService.prepare_check before records."""
+    rows = [ProductInDb(uuid=uuid.uuid4(), check=check_uuid, **product.dict()).dict() for product in products]
+    return rows, [ProductSchema(**row) for row in rows]
+
+
+def create_products_after(
+        check_uuid: uuid.UUID,
+        products: List[ProductCreate],
+) -> Tuple[List[Dict[str, Any]], List[ProductRecord]]:
+    """INSERT values and result of CheckService.prepare_check."""
+    records = [
+        ProductRecord(
+            uuid=uuid.uuid4(),
+            check=check_uuid,
+            name=product.name,
+            price=product.price,
+            quantity=product.quantity,
+        )
+        for product in products
+    ]
+    return [record.as_dict() for record in records], records
+
+
+class RecordBenchmark(BaseCommand):
+    command_name = 'record-benchmark'
+    help_text = 'Compare records with pydantic models on the repository to service path of generated checks.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument('--runs', type=int, default=200, help='Conversions per run.')
+        parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is reported.')
+
+    @staticmethod
+    def generate_rows(count: int, products: int) -> List[Dict[str, Any]]:
+        """Rows as CheckRepository.get_check reads them, jsonb returns whole numbers as int."""
+        rng = random.Random(0)
+        rows = []
+        for _ in range(count):
+            items = [
+                {
+                    'uuid': str(uuid.uuid4()),
+                    'name': rng.choice(PRODUCT_NAMES),
+                    'price': rng.choice([rng.randint(5, 500), round(rng.uniform(5, 500), 2)]),
+                    'quantity': rng.randint(1, 5),
+                }
+                for _ in range(products)
+            ]
+            total = sum(item['price'] * item['quantity'] for item in items)
+            rows.append({
+                'uuid': uuid.uuid4(),
+                'user': uuid.uuid4(),
+                'created_at': datetime.now(timezone.utc),
+                'products': items,
+                'payment': {
+                    'uuid': str(uuid.uuid4()),
+                    'type': rng.choice(list(enums.PaymentType)).value,
+                    'amount': total + 100,
+                },
+                'total': float(total),
+                'rest': 100.0,
+                'product_count': products,
+            })
+        return rows
+
+    @staticmethod
+    def get_retained(build: Callable[[], Any]) -> int:
+        """Bytes allocated by `build` and still held by its result."""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = build()  # noqa: F841
+            return tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+    @classmethod
+    def compare(cls, label: str, before: Callable[[], Any], after: Callable[[], Any], runs: int, repeat: int) -> None:
+        time_before = ReceiptBenchmark.measure(lambda: [before() for _ in range(runs)], repeat)
+        time_after = ReceiptBenchmark.measure(lambda: [after() for _ in range(runs)], repeat)
+        memory_before = cls.get_retained(before)
+        memory_after = cls.get_retained(after)
+        print(  # noqa: T201
+            f'{label}: pydantic {time_before / runs * 1000:.3f} ms {memory_before / 1024:.1f} KiB, '
+            f'records {time_after / runs * 1000:.3f} ms {memory_after / 1024:.1f} KiB, '
+            f'x{time_before / time_after:.1f} faster, x{memory_before / memory_after:.1f} smaller',
+        )
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        runs = args.runs
+        repeat = args.repeat
+        for label, count, products in (('check of 100 products', 1, 100), ('page of 100 checks', 100, 6)):
+            rows = cls.generate_rows(count, products)
+            schemas = [to_check_schema_before(row) for row in rows]
+            same = all(
+                CheckService.get_schema(CheckRepository._to_stored_check(row)).json() == schema.json()
+                for row, schema in zip(rows, schemas)
+            )
+            cls.compare(
+                f'{label}, read records',
+                lambda: [to_check_schema_before(row) for row in rows],
+                lambda: [CheckRepository._to_stored_check(row) for row in rows],
+                runs,
+                repeat,
+            )
+            cls.compare(
+                f'{label}, read to response schema',
+                lambda: [to_check_schema_before(row) for row in rows],
+                lambda: [CheckService.get_schema(CheckRepository._to_stored_check(row)) for row in rows],
+                runs,
+                repeat,
+            )
+            print(f'{label}: identical responses: {same}')  # noqa: T201
+            created = [[ProductCreate(**product) for product in row['products']] for row in rows]
+            cls.compare(
+                f'{label}, create products',
+                lambda: [create_products_before(row['uuid'], items) for row, items in zip(rows, created)],
+                lambda: [create_products_after(row['uuid'], items) for row, items in zip(rows, created)],
+                runs,
+                repeat,
+            )
@@ -0,0 +1,53 @@
+import argparse
+from typing import Optional
+
+from commands.base import BaseCommand
+from commands.receipt_benchmark import ReceiptBenchmark
+from sdk.responses import DefaultResponse
+from sdk.responses import DefaultResponseSchema
+from sdk.schemas import PaginatedSchema
+
+from api.v1.checks.schemas import CheckSchema
+
+
+class ResponseBenchmark(BaseCommand):
+    command_name = 'response-benchmark'
+    help_text = 'Compare DefaultResponse rendering with DefaultResponseSchema.json() on pages of generated checks.'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            action='append',
+            help='Checks per page, can be repeated. Defaults to 10, 25, 50 and 100.',
+        )
+        parser.add_argument('--products', type=int, default=6, help='Products per check.')
+        parser.add_argument('--pages', type=int, default=200, help='Pages rendered per run.')
+        parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is reported.')
+
+    @classmethod
+    async def run(cls, args: Optional[argparse.Namespace] = None) -> None:
+        for page_size in args.page_size or [10, 25, 50, 100]:
+            checks = ReceiptBenchmark.generate_checks(page_size, args.products)
+            page = PaginatedSchema[CheckSchema](
+                total_count=page_size,
+                page_count=1,
+                next=None,
+                previous=None,
+                results=checks,
+            )
+
+            def render_before() -> bytes:
+                return DefaultResponseSchema(data=page).json().encode()
+
+            def render_after() -> bytes:
+                return DefaultResponse(content=page).body
+
+            before = ReceiptBenchmark.measure(lambda: [render_before() for _ in range(args.pages)], args.repeat)
+            after = ReceiptBenchmark.measure(lambda: [render_after() for _ in range(args.pages)], args.repeat)
+            print(  # noqa: T201
+                f'page_size={page_size}: schema {before / args.pages * 1000:.2f} ms, '
+                f'renderer {after / args.pages * 1000:.2f} ms per page, x{before / after:.1f}, '
+                f'identical output: {render_before() == render_after()}',
+            )
@@ -6,6 +6,7 @@ from typing import Type
 
 from commands.base import BaseCommand
 from commands.file_cleaner import FileCleaner
+from commands.manage_partitions import ManagePartitions
 from croniter import croniter
 
 
@@ -51,6 +52,7 @@ class Schedule(BaseCommand):
     async def get_jobs(cls) -> List[Job]:
         return [
             cls.schedule.command(FileCleaner).cron('0 0 * * *'),  # noqa: E800
+            cls.schedule.command(ManagePartitions).cron('30 0 * * *'),
         ]
 
     @classmethod
@@ -1,10 +1,13 @@
 import os
+import re
 from enum import Enum
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Union
+from zoneinfo import ZoneInfo
+from zoneinfo import ZoneInfoNotFoundError
 from passlib.context import CryptContext
 from pydantic import AnyHttpUrl
 from pydantic import BaseSettings
@@ -25,6 +28,7 @@ class HardSettings:
     MEDIA_DIR: str = os.path.join(PROJECT_ROOT, 'media')
     CREDENTIALS_DIR: str = os.path.join(PROJECT_ROOT, 'credentials')
     TMP_MEDIA_DIR: str = os.path.join(PROJECT_ROOT, 'media/tmp')
+    RECEIPTS_DIR: str = os.path.join(PROJECT_ROOT, 'media/receipts')
     PWD_CONTEXT: CryptContext = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 
@@ -50,6 +54,9 @@ class EnvSettings(BaseSettings):
     AUTH_JWT_ALGORITHM: str = 'HS256'
     AUTH_JWT_ACCESS_TOKEN_EXP_DELTA_MINUTES: int = 60 * 24 * 2  # 60 * 24 * 2  # 60 minutes * 24 hours * 2 days = 2 days
     JWT_REFRESH_TOKEN_EXP_DELTA_MINUTES: int = 60 * 24 * 14  # 60 minutes * 24 hours * 14 days = 2 week
+    AUTH_REVOCATION_CACHE_SIZE: int = 10000  # users whose revocations a worker keeps
+    AUTH_REVOCATION_CACHE_EXPIRE: int = 60 * 5  # revocations are evicted when published, bounds a missed message
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # verified access tokens a worker keeps until they expire
 
     # API configuration.
     DEFAULT_DATETIME_FORMAT: str = '%Y-%m-%dT%H:%M:%S%z'
@@ -96,6 +103,12 @@ class EnvSettings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: str = '1'
     REDIS_URI: Optional[str] = None
+    # One pool per worker process, see cache.RedisPool.
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: Optional[float] = 5  # seconds a request waits for a free connection
+    REDIS_SOCKET_TIMEOUT: Optional[float] = 5  # seconds
+    REDIS_SOCKET_CONNECT_TIMEOUT: Optional[float] = 2  # seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds idle before a connection is pinged on reuse
 
     @validator('REDIS_URI', pre=True)
     def assemble_redis_uri(
@@ -160,6 +173,47 @@ class EnvSettings(BaseSettings):
     CHECK_HEADER: str = 'ФОП Дядько Байден'
     CHECK_LENGTH: int = 40
     CHECK_FOOTER: str = 'Дякуємо за покупку!'
+    # Read-through cache of checks and rendered receipts, checks are immutable once created.
+    CHECK_CACHE_LOCAL_SIZE: int = 1024  # entries per process and per cache, 0 disables the local tier
+    CHECK_CACHE_EXPIRE: int = 60 * 60 * 24  # seconds in Redis
+    CHECK_BATCH_MAX_SIZE: int = 1000  # checks per POST /checks/batch
+    # Days of the daily_totals rollup (Z-reports) start at midnight in this time zone.
+    # Rebuild the rollup with `reconcile-daily-totals` on change.
+    CHECK_REPORT_TIMEZONE: str = 'UTC'
+    CHECK_REPORT_MAX_DAYS: int = 366  # days per GET /checks/reports/daily
+    # checks, products and payments are partitioned by month of created_at (UTC), `manage-partitions`
+    # creates the partitions ahead and detaches, or drops, the expired ones.
+    CHECK_PARTITION_PRECREATE_MONTHS: int = 3  # months after the current one
+    CHECK_PARTITION_RETENTION_MONTHS: int = 0  # months before the current one kept attached, 0 keeps all
+    CHECK_PARTITION_DROP_EXPIRED: bool = False  # drop instead of detaching
+    # Idempotency-Key of POST /checks/, the first response is replayed to retries.
+    IDEMPOTENCY_EXPIRE: int = 60 * 60 * 24  # seconds a response is kept
+    IDEMPOTENCY_LOCK_EXPIRE: int = 60  # seconds an in-flight marker outlives its process, extended while it runs
+    IDEMPOTENCY_WAIT: float = 10  # seconds a duplicate waits for the first request to finish
+    # Text search configuration of the fulltext product search, e.g. 'simple', 'english'
+    # or a custom 'ukrainian' one. ix_products_name_tsv is built for it by the migrations,
+    # on change it has to be recreated with the new configuration.
+    CHECK_SEARCH_CONFIG: str = 'simple'
+
+    @validator('CHECK_SEARCH_CONFIG')
+    def validate_search_config(
+        cls,  # noqa: N805
+        value: str,
+    ) -> str:
+        if not re.fullmatch(r'[a-z_][a-z0-9_.]*', value):
+            raise ValueError('CHECK_SEARCH_CONFIG must be a text search configuration name')
+        return value
+
+    @validator('CHECK_REPORT_TIMEZONE')
+    def validate_report_timezone(
+        cls,  # noqa: N805
+        value: str,
+    ) -> str:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError('CHECK_REPORT_TIMEZONE must be an IANA time zone name')
+        return value
 
 
 class Settings(HardSettings, EnvSettings):
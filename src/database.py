@@ -1,5 +1,7 @@
+import json
 from typing import TypeVar
 
+import asyncpg
 import databases
 from config import settings
 from sqlalchemy import MetaData
@@ -7,11 +9,18 @@ from sqlalchemy.ext.declarative import declarative_base
 
 __all__ = ('database', 'metadata', 'Base')
 
+
+async def init_connection(connection: asyncpg.Connection) -> None:
+    """json and jsonb values are decoded once, by the driver, and arrive as Python objects."""
+    for type_name in ('json', 'jsonb'):
+        await connection.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
 database: databases.core.Database
 if settings.TESTING:
-    database = databases.Database(str(settings.DB_URI), force_rollback=True)
+    database = databases.Database(str(settings.DB_URI), force_rollback=True, init=init_connection)
 else:
-    database = databases.Database(str(settings.DB_URI))
+    database = databases.Database(str(settings.DB_URI), init=init_connection)
 
 meta = MetaData(
     naming_convention={
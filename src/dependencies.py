@@ -1,10 +1,8 @@
-from typing import AsyncGenerator
 from typing import Optional
-from typing import Union
 
 import sentry_sdk
 from cache import RedisBackend
-from config import settings
+from cache import redis_pool
 from database import database  # type: ignore
 from databases.core import Transaction
 from fastapi import Depends
@@ -12,6 +10,8 @@ from fastapi import Header
 from fastapi import Request
 from fastapi.security import OAuth2AuthorizationCodeBearer
 
+from api.v1.auth.cache import token_cache
+from api.v1.auth.services import SessionService
 from api.v1.auth.services import TokenService
 from api.v1.users.schemas import User
 from sdk.exceptions.exceptions import make_error
@@ -24,12 +24,8 @@ oauth2_scheme = OAuth2AuthorizationCodeBearer(
 )
 
 
-async def cache_storage() -> Union[RedisBackend, AsyncGenerator]:
-    pool = await RedisBackend.create_pool(settings.REDIS_URI)
-    try:
-        yield pool
-    finally:
-        await pool.close()
+async def cache_storage() -> RedisBackend:
+    return await redis_pool.connect()
 
 
 async def get_tracking_data(
@@ -60,12 +56,17 @@ async def get_authenticated_user(
         custom_code=ResponseStatus.UNAUTHORIZED,
         message='Not authenticated',
     )
-    user = TokenService.get_payload(token)
-    if user is None:
-        raise auth_error
-    in_blacklist = await redis.get(f'bl:{token}')
-    if in_blacklist:
+    # Verified tokens are kept by the worker, with cached revocations a request does no I/O for auth.
+    verified = token_cache.get(token)
+    if verified is None:
+        payload = TokenService.get_payload(token)
+        if payload is None:
+            raise auth_error
+        verified = payload, User(**payload['data'])
+        token_cache.set(token, verified, payload['exp'])
+    payload, user = verified
+    if await SessionService.is_revoked(redis, payload, token):
         raise auth_error
     with sentry_sdk.configure_scope() as scope:
-        scope.set_user(user['data'])
-    return User(**user['data'])
+        scope.set_user(payload['data'])
+    return user
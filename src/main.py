@@ -1,6 +1,7 @@
 import time
 from typing import Callable
 import uvicorn
+from cache import redis_pool
 from config import settings
 from database import database  # type: ignore
 from fastapi import FastAPI
@@ -9,6 +10,7 @@ from fastapi import Security
 from fastapi.openapi.models import Response
 from starlette.middleware.cors import CORSMiddleware
 from api.router import api_router
+from api.v1.auth.cache import revocation_listener
 from sdk.exceptions.exception_handler_mapping import exception_handler_mapping
 from sdk.utils import fake_http_bearer
 
@@ -40,11 +42,15 @@ if settings.BACKEND_CORS_ORIGINS:
 @app.on_event('startup')
 async def startup() -> None:
     await database.connect()
+    await redis_pool.connect()
+    revocation_listener.start()
 
 
 @app.on_event('shutdown')
 async def shutdown() -> None:
     await database.disconnect()
+    await revocation_listener.stop()
+    await redis_pool.disconnect()
 
 
 @app.middleware('http')
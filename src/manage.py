@@ -2,6 +2,7 @@ import argparse
 import asyncio
 
 import sentry_sdk
+from cache import redis_pool
 from commands import *  # noqa: F401, F403
 from commands.base import command_parser
 from database import database
@@ -13,6 +14,7 @@ async def startup() -> None:
 
 async def shutdown() -> None:
     await database.disconnect()
+    await redis_pool.disconnect()
 
 
 class ConsoleManager:
@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class PaginationMode(str, Enum):
+    OFFSET = 'offset'
+    CURSOR = 'cursor'
+
+
+class CountStrategy(str, Enum):
+    """How a paginated endpoint computes `total_count`."""
+
+    EXACT = 'exact'  # separate SELECT count(*) over the filtered query
+    WINDOW = 'window'  # count(*) OVER () in the page query itself
+    ESTIMATED = 'estimated'  # planner row estimate from EXPLAIN
+    NONE = 'none'  # no total, only whether a next page exists
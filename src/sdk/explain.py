@@ -0,0 +1,47 @@
+import json
+from typing import Any
+from typing import Dict
+from typing import Iterator
+
+from database import database  # type: ignore[attr-defined]
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement
+from sqlalchemy.sql.expression import Executable
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) wrapper that keeps the bind parameters of the explained statement."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement, analyze: bool = False) -> None:
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, 'postgresql')
+def visit_explain(element: Explain, compiler: SQLCompiler, **kw) -> str:
+    options = 'ANALYZE, BUFFERS, ' if element.analyze else ''
+    return f'EXPLAIN ({options}FORMAT JSON) {compiler.process(element.statement, **kw)}'
+
+
+async def explain(statement: ClauseElement, analyze: bool = False) -> Dict[str, Any]:
+    """Return the root plan node of `statement`."""
+    # execute() hands back the raw value, without result processors of the explained columns.
+    raw_plan = await database.execute(Explain(statement, analyze=analyze))
+    plan = json.loads(raw_plan) if isinstance(raw_plan, str) else raw_plan
+    return plan[0]['Plan']
+
+
+async def estimate_count(statement: ClauseElement) -> int:
+    """Planner row estimate, costs one planning round trip and no execution."""
+    plan = await explain(statement)
+    return int(plan['Plan Rows'])
+
+
+def iter_plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Walk a plan tree depth first, root included."""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from iter_plan_nodes(child)
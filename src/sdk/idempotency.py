@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+from cache import RedisBackend
+from cache import RedisScript
+from config import settings
+from fastapi import Header
+from pydantic.json import pydantic_encoder
+from starlette.responses import Response
+
+from sdk.exceptions.exceptions import make_error
+from sdk.responses import ResponseStatus
+
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+
+# The marker scripts act only while KEYS[1] still holds the in-flight marker ARGV[1] of the request,
+# a marker taken over by another request after it expired is left alone.
+RELEASE_MARKER = RedisScript(
+    'idempotency_release',
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """,
+)
+
+# ARGV[2]: seconds the marker is extended by.
+EXTEND_MARKER = RedisScript(
+    'idempotency_extend',
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """,
+)
+
+# ARGV[2]: the stored response, ARGV[3]: seconds it is kept.
+STORE_RESPONSE = RedisScript(
+    'idempotency_store',
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        return 1
+    end
+    return 0
+    """,
+)
+
+
+class Idempotency:
+    """
+    Idempotency-Key support for endpoints that create things.
+
+    The first request with a key runs and its successful response is stored for
+    IDEMPOTENCY_EXPIRE, retries with the same key get the stored response back
+    without running again. Duplicates arriving while the first request runs wait
+    on its in-flight marker. A key is bound to the request payload, reusing it
+    for a different payload is an error. Failed requests store nothing, so they
+    can be retried with the same key.
+
+    The marker is extended while the request runs, it expires IDEMPOTENCY_LOCK_EXPIRE
+    seconds after the process running it died. Every marker carries a token of its
+    request, a request only releases or replaces its own marker.
+    """
+
+    key_prefix: str = 'idempotency'
+    max_key_length: int = 255
+    poll_interval: float = 0.05
+    replayed_header: str = 'Idempotent-Replayed'
+
+    def __init__(
+        self,
+        key: Optional[str] = Header(None, alias='Idempotency-Key'),
+    ) -> None:
+        if key is not None and not 0 < len(key) <= self.max_key_length:
+            raise make_error(
+                custom_code=ResponseStatus.VALIDATION_ERROR,
+                message=f'Idempotency-Key must be 1 to {self.max_key_length} characters long',
+            )
+        self.key = key
+
+    def get_cache_key(self, scope: str) -> str:
+        return f'{self.key_prefix}:{scope}:{self.key}'
+
+    @staticmethod
+    def get_fingerprint(payload: Any) -> str:  # noqa: ANN401
+        raw = json.dumps(payload, default=pydantic_encoder, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    async def keep_alive(redis: RedisBackend, cache_key: str, marker: str) -> None:
+        """Extend the in-flight marker until cancelled or until it is not ours anymore."""
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_LOCK_EXPIRE / 3)
+            extended = await redis.run_script(
+                EXTEND_MARKER.name,
+                keys=[cache_key],
+                args=[marker, settings.IDEMPOTENCY_LOCK_EXPIRE],
+            )
+            if not extended:
+                return
+
+    @classmethod
+    def replay(cls, stored: Dict[str, Any]) -> Response:
+        return Response(
+            content=stored['body'],
+            status_code=stored['status_code'],
+            media_type=stored['media_type'],
+            headers={cls.replayed_header: 'true'},
+        )
+
+    async def execute(
+        self,
+        redis: RedisBackend,
+        scope: str,
+        payload: Any,  # noqa: ANN401
+        handler: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        Run `handler` at most once per key.
+
+        :param scope: separates the keys of endpoints and users
+        :param payload: the request data, a key is valid for one payload only
+        """
+        if self.key is None:
+            return await handler()
+        cache_key = self.get_cache_key(scope)
+        fingerprint = self.get_fingerprint(payload)
+        marker = json.dumps({'state': IN_FLIGHT, 'fingerprint': fingerprint, 'token': uuid.uuid4().hex})
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while not await redis.setnx(cache_key, marker, expire=settings.IDEMPOTENCY_LOCK_EXPIRE):
+            stored = await redis.get(cache_key)
+            if stored is None:
+                # The first request failed in the meantime, take over.
+                continue
+            stored = json.loads(stored)
+            if stored['fingerprint'] != fingerprint:
+                raise make_error(
+                    custom_code=ResponseStatus.IDEMPOTENCY_KEY_REUSED,
+                    message='Idempotency-Key was already used for another request',
+                )
+            if stored['state'] == DONE:
+                return self.replay(stored)
+            if time.monotonic() >= deadline:
+                raise make_error(
+                    custom_code=ResponseStatus.REQUEST_IN_PROGRESS,
+                    message='A request with this Idempotency-Key is in progress',
+                )
+            await asyncio.sleep(self.poll_interval)
+        keep_alive = asyncio.create_task(self.keep_alive(redis, cache_key, marker))
+        try:
+            response = await handler()
+        except BaseException:
+            await redis.run_script(RELEASE_MARKER.name, keys=[cache_key], args=[marker])
+            raise
+        finally:
+            keep_alive.cancel()
+            await asyncio.gather(keep_alive, return_exceptions=True)
+        if not 200 <= response.status_code < 300:
+            await redis.run_script(RELEASE_MARKER.name, keys=[cache_key], args=[marker])
+            return response
+        stored = {
+            'state': DONE,
+            'fingerprint': fingerprint,
+            'status_code': response.status_code,
+            'media_type': response.media_type,
+            'body': response.body.decode(),
+        }
+        await redis.run_script(
+            STORE_RESPONSE.name,
+            keys=[cache_key],
+            args=[marker, json.dumps(stored), settings.IDEMPOTENCY_EXPIRE],
+        )
+        return response
@@ -16,6 +16,17 @@ class AuditMixin:
     updated_at = sa.Column(sa.DateTime(timezone=True), onupdate=sa.func.now())
 
 
+class MonthlyPartitionMixin:
+    """
+    Tables range partitioned by month of `created_at`, see sdk.partitions.
+
+    The partition key has to be part of the primary key, rows are identified by (uuid, created_at).
+    Precede AuditMixin in the bases.
+    """
+
+    created_at = sa.Column(sa.DateTime(timezone=True), primary_key=True, default=sa.func.now())
+
+
 class TrackingMixin:
     ip_address = sa.Column(sa.String, nullable=True)
     user_agent = sa.Column(sa.String, nullable=True)
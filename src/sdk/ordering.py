@@ -3,12 +3,14 @@ from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import NamedTuple
 from typing import Optional
 
 import sqlalchemy as sa
 from database import Base  # type: ignore[attr-defined]
 from fastapi import Query
 from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.sql.elements import UnaryExpression
 
 from sdk.exceptions.exceptions import make_error
@@ -17,6 +19,14 @@ from sdk.responses import ResponseStatus
 AdditionalFields = Dict[str, Any]
 
 
+class OrderingKey(NamedTuple):
+    """Single column of a keyset: result name, sql expression and direction."""
+
+    name: str
+    expression: ColumnElement
+    descending: bool
+
+
 class OrderingManager:
     """
     Simple manager class for request, that handles the ordering of a query.
@@ -97,10 +107,42 @@ class OrderingManager:
         self,
         model: Base,
         additional_fields: Optional[AdditionalFields] = None,
+        default: Iterable[str] = (),
     ) -> List[UnaryExpression]:
         if additional_fields is None:
             additional_fields = {}
-        return [self._get_ordering(model, field, additional_fields) for field in self.ordering_fields]
+        return [self._get_ordering(model, field, additional_fields) for field in self.ordering_fields or default]
+
+    def get_keys(
+        self,
+        model: Base,
+        additional_fields: Optional[AdditionalFields] = None,
+        default: Iterable[str] = (),
+        tiebreaker: str = 'uuid',
+    ) -> List[OrderingKey]:
+        """
+        Keyset used by cursor pagination.
+
+        Requested fields (or `default` when nothing was requested) followed by the
+        unique `tiebreaker` column, which takes the direction of the last field
+        unless it was requested explicitly.
+        """
+        if additional_fields is None:
+            additional_fields = {}
+        keys: List[OrderingKey] = []
+        descending = None
+        for field in self.ordering_fields or default:
+            field = self.is_available(field.strip())
+            if field.lstrip('-') == tiebreaker:
+                # Unique column, anything ordered after it is irrelevant.
+                descending = field.startswith('-')
+                break
+            attribute = self._get_model_attribute(model, field, additional_fields)
+            keys.append(OrderingKey(field.lstrip('-'), attribute, field.startswith('-')))
+        if descending is None:
+            descending = keys[-1].descending if keys else False
+        keys.append(OrderingKey(tiebreaker, getattr(model, tiebreaker), descending))
+        return keys
 
 
 def get_ordering(
@@ -1,20 +1,56 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
 
+import sqlalchemy as sa
+from asyncpg import Record
+from database import database  # type: ignore[attr-defined]
 from fastapi import Query
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
 
+from sdk.enums import CountStrategy
+from sdk.enums import PaginationMode
 from sdk.exceptions.exceptions import make_error
+from sdk.explain import estimate_count
+from sdk.ordering import OrderingKey
+from sdk.rendering import RawJSON
 from sdk.responses import ResponseStatus
+from sdk.schemas import PaginatedSchema
+from sdk.utils import DefaultJSONEncoder
 
 
 class PaginationManager:
     """
     Simple pagination manager.
+
+    Offset mode pages with LIMIT/OFFSET. Cursor mode seeks past the ordering keys
+    of the last returned row, so every page costs the same as the first one.
+    The cursor is opaque for clients: take `next_cursor`/`previous_cursor` from
+    the response and send it back as `cursor`.
+
+    `count` picks how offset pages compute `total_count`, see CountStrategy.
+    Cursor pages are never counted.
     """
 
+    cursor_column_prefix: str = '_cursor_'
+    total_count_column: str = '_total_count'
+
     def __init__(
         self,
         page: int = Query(1),
         page_size: int = Query(25, description='Available only 10, 25, 50, 100'),
+        mode: PaginationMode = Query(PaginationMode.OFFSET, alias='pagination'),
+        cursor: Optional[str] = Query(None, description='Cursor from next_cursor or previous_cursor'),
+        count_strategy: CountStrategy = Query(CountStrategy.WINDOW, alias='count'),
     ) -> None:
         if page_size not in [10, 25, 50, 100, None]:
             raise make_error(
@@ -28,6 +64,13 @@ class PaginationManager:
             )
         self.page = page - 1
         self.page_size = page_size
+        self.mode = PaginationMode.CURSOR if cursor else mode
+        self.cursor = self.decode_cursor(cursor) if cursor else None
+        self.count_strategy = count_strategy
+
+    @property
+    def is_cursor(self) -> bool:
+        return self.mode == PaginationMode.CURSOR
 
     def get_page_count(self, count: int) -> int:
         return count // self.page_size + count % self.page_size if self.page_size else None  # noqa: S001
@@ -46,3 +89,183 @@ class PaginationManager:
                 custom_code=ResponseStatus.PAGINATION_PAGE_ERROR,
                 message='Page does not exists',
             )
+
+    async def _count(self, query: Select) -> Optional[int]:
+        if self.count_strategy == CountStrategy.EXACT:
+            return await database.fetch_val(
+                sa.select([sa.func.count()]).select_from(query.alias('original_query')),
+            )
+        if self.count_strategy == CountStrategy.ESTIMATED:
+            return await estimate_count(query)
+        return None
+
+    async def fetch_page(self, query: Select) -> Tuple[List[Record], Optional[int], bool]:
+        """
+        Fetch the current offset page of `query`.
+
+        Returns the rows, the total count (None for CountStrategy.NONE) and whether a next page exists.
+        The page is fetched with one extra row instead of relying on the count.
+        """
+        if self.page_size is None:
+            rows = await database.fetch_all(query)
+            return rows, len(rows), False
+        total_count = await self._count(query)
+        if self.count_strategy == CountStrategy.EXACT:
+            self.check_page(total_count)
+        elif self.count_strategy == CountStrategy.WINDOW:
+            query = query.add_columns(sa.func.count().over().label(self.total_count_column))
+        offset = self.page * self.page_size
+        rows = await database.fetch_all(query.limit(self.page_size + 1).offset(offset))
+        if not rows and self.page > 0:
+            raise make_error(
+                custom_code=ResponseStatus.PAGINATION_PAGE_ERROR,
+                message='Page does not exists',
+            )
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.count_strategy == CountStrategy.WINDOW:
+            total_count = rows[0][self.total_count_column] if rows else 0
+        elif self.count_strategy == CountStrategy.ESTIMATED:
+            # The estimate can be off either way, clamp it to what the page proves.
+            seen = offset + len(rows)
+            total_count = max(total_count, seen + 1) if has_more else seen
+        return rows, total_count, has_more
+
+    def get_paginated_schema(
+        self,
+        results: Union[List[Any], RawJSON],
+        total_count: Optional[int] = None,
+        has_more: bool = False,
+        next_cursor: Optional[str] = None,
+        previous_cursor: Optional[str] = None,
+    ) -> PaginatedSchema:
+        """Page of `results`, pre-rendered results are passed through unvalidated."""
+        # The page fields are built by the manager itself.
+        schema = PaginatedSchema.construct if isinstance(results, RawJSON) else PaginatedSchema
+        if self.is_cursor:
+            return schema(
+                total_count=None,
+                page_count=None,
+                next=None,
+                previous=None,
+                next_cursor=next_cursor,
+                previous_cursor=previous_cursor,
+                count_strategy=CountStrategy.NONE,
+                results=results,
+            )
+        return schema(
+            total_count=total_count,
+            page_count=self.get_page_count(total_count) if total_count is not None else None,
+            next=self.page + 2 if has_more else None,
+            previous=self.get_prev_page(),
+            count_strategy=self.count_strategy,
+            results=results,
+        )
+
+    @staticmethod
+    def encode_cursor(keys: Sequence[OrderingKey], values: Sequence[Any], backwards: bool) -> str:
+        payload = {'k': [key.name for key in keys], 'v': list(values), 'b': backwards}
+        raw = json.dumps(payload, cls=CursorJSONEncoder, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Dict[str, Any]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if not isinstance(payload, dict) or len(payload['k']) != len(payload['v']):
+                raise ValueError(cursor)
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise make_error(
+                custom_code=ResponseStatus.PAGINATION_PAGE_ERROR,
+                message='Invalid cursor',
+            )
+        return payload
+
+    @staticmethod
+    def _load_value(key: OrderingKey, value: Any) -> Any:  # noqa: ANN401
+        try:
+            python_type = key.expression.type.python_type
+        except NotImplementedError:
+            return value
+        if python_type is datetime and isinstance(value, str):
+            return datetime.fromisoformat(value)
+        return value
+
+    def _get_cursor_values(self, keys: Sequence[OrderingKey]) -> List[Any]:
+        if self.cursor['k'] != [key.name for key in keys]:
+            raise make_error(
+                custom_code=ResponseStatus.PAGINATION_PAGE_ERROR,
+                message='Cursor does not match the requested ordering',
+            )
+        return [self._load_value(key, value) for key, value in zip(keys, self.cursor['v'])]
+
+    @staticmethod
+    def _get_seek_clause(keys: Sequence[OrderingKey], values: Sequence[Any], backwards: bool) -> ColumnElement:
+        directions = {key.descending for key in keys}
+        if len(directions) == 1:
+            # Row comparison, can be answered by a single index range scan.
+            descending = directions.pop() != backwards
+            left = sa.tuple_(*[key.expression for key in keys])
+            right = sa.tuple_(*[sa.literal(value, key.expression.type) for key, value in zip(keys, values)])
+            return left < right if descending else left > right
+        clauses = []
+        for index, key in enumerate(keys):
+            equal = [keys[i].expression == values[i] for i in range(index)]
+            if key.descending != backwards:
+                clauses.append(sa.and_(*equal, key.expression < values[index]))
+            else:
+                clauses.append(sa.and_(*equal, key.expression > values[index]))
+        return sa.or_(*clauses)
+
+    def paginate_by_cursor(self, query: Select, keys: Sequence[OrderingKey], having: bool = False) -> Select:
+        """
+        Turn `query` into a keyset page query.
+
+        :param having: apply the seek predicate in HAVING, for aggregated keys
+        """
+        backwards = bool(self.cursor and self.cursor['b'])
+        ordering = [
+            sa.desc(key.expression) if key.descending != backwards else sa.asc(key.expression) for key in keys
+        ]
+        query = query.order_by(None).order_by(*ordering).add_columns(
+            *[key.expression.label(f'{self.cursor_column_prefix}{index}') for index, key in enumerate(keys)],
+        )
+        if self.cursor is not None:
+            seek = self._get_seek_clause(keys, self._get_cursor_values(keys), backwards)
+            query = query.having(seek) if having else query.where(seek)
+        return query.limit(self.page_size + 1)
+
+    def get_cursor_page(
+        self,
+        rows: List[Record],
+        keys: Sequence[OrderingKey],
+    ) -> Tuple[List[Record], Optional[str], Optional[str]]:
+        """Trim the look-ahead row and build next/previous cursors for a `paginate_by_cursor` result."""
+        backwards = bool(self.cursor and self.cursor['b'])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows = rows[::-1]
+        if not rows:
+            return rows, None, None
+
+        def make_cursor(row: Record, to_previous: bool) -> str:
+            values = [row[f'{self.cursor_column_prefix}{index}'] for index in range(len(keys))]
+            return self.encode_cursor(keys, values, to_previous)
+
+        has_next = True if backwards else has_more
+        has_previous = has_more if backwards else self.cursor is not None
+        return (
+            rows,
+            make_cursor(rows[-1], False) if has_next else None,
+            make_cursor(rows[0], True) if has_previous else None,
+        )
+
+
+class CursorJSONEncoder(DefaultJSONEncoder):
+    """Keep full datetime precision, cursors must round-trip exactly."""
+
+    def default(self, o: Any) -> Any:  # noqa: ANN401, VNE001
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
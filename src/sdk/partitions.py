@@ -0,0 +1,96 @@
+import re
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+from typing import Iterable
+from typing import List
+
+import sqlalchemy as sa
+from database import database  # type: ignore[attr-defined]
+
+
+def get_month(value: datetime) -> date:
+    """First day of the UTC month of `value`, partitions are bounded by UTC months."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class MonthlyPartitions:
+    """
+    Monthly range partitions of a table partitioned by `created_at`.
+
+    Partitions are named `<table>_yYYYYmMM`, other partitions of the table are left alone.
+    The SQL builders are shared with the migrations, the coroutines run on the app database.
+    """
+
+    def __init__(self, table: str) -> None:
+        self.table = table
+        self.name_pattern = re.compile(rf'{re.escape(table)}_y(\d{{4}})m(\d{{2}})')
+
+    def get_name(self, month: date) -> str:
+        return f'{self.table}_y{month.year:04d}m{month.month:02d}'
+
+    def get_create_sql(self, month: date) -> str:
+        return (
+            f'CREATE TABLE IF NOT EXISTS {self.get_name(month)} PARTITION OF {self.table} '
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+
+    async def get_months(self) -> List[date]:
+        """Months of the attached partitions, ascending."""
+        rows = await database.fetch_all(
+            sa.text(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent '
+                'JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid '
+                'WHERE parent.relname = :table',
+            ).bindparams(table=self.table),
+        )
+        months = []
+        for row in rows:
+            match = self.name_pattern.fullmatch(row[0])
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    async def create(self, month: date) -> None:
+        await database.execute(sa.text(self.get_create_sql(month)))
+
+    async def ensure(self, months: Iterable[date]) -> List[date]:
+        """Create the missing partitions of `months`, returns the created ones."""
+        existing = set(await self.get_months())
+        created = []
+        for month in sorted(set(months) - existing):
+            await self.create(month)
+            created.append(month)
+        return created
+
+    async def detach(self, month: date) -> None:
+        """
+        Detach a partition, its rows leave the table but are kept in a standalone table.
+
+        The detached table keeps no foreign keys, they would pin the rows it references.
+        """
+        name = self.get_name(month)
+        async with database.transaction():
+            await database.execute(sa.text(f'ALTER TABLE {self.table} DETACH PARTITION {name}'))
+            rows = await database.fetch_all(
+                sa.text(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'",
+                ).bindparams(name=name),
+            )
+            for row in rows:
+                await database.execute(sa.text(f'ALTER TABLE {name} DROP CONSTRAINT "{row[0]}"'))
+
+    async def drop(self, month: date) -> None:
+        # Partitions of a referenced table can not be dropped while attached.
+        async with database.transaction():
+            await self.detach(month)
+            await database.execute(sa.text(f'DROP TABLE {self.get_name(month)}'))
@@ -0,0 +1,40 @@
+from typing import Any
+from typing import Dict
+from typing import Mapping
+from typing import Type
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+RecordType = TypeVar('RecordType', bound='BaseRecord')
+SchemaType = TypeVar('SchemaType', bound=BaseModel)
+
+
+class BaseRecord:
+    """
+    Data passed between repositories and services.
+
+    Records hold values that were validated on the way in or read from our own database,
+    they are never validated again. Subclasses are dataclasses declaring their fields in
+    `__slots__` as well, instances have no __dict__. Schemas are built from records at the
+    HTTP boundary only, with to_schema().
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls: Type[RecordType], row: Mapping[str, Any]) -> RecordType:
+        """Record of the columns of `row` named like the fields, other columns are ignored."""
+        return cls(*[row[name] for name in cls.__slots__])
+
+    def as_dict(self, **extra) -> Dict[str, Any]:
+        """Fields and `extra` values, e.g. the values of an INSERT."""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(extra)
+        return values
+
+    def to_schema(self, schema: Type[SchemaType], **extra) -> SchemaType:
+        """`schema` of the fields it declares and `extra` values, built without validation."""
+        values = {name: getattr(self, name) for name in schema.__fields__ if name in self.__slots__}
+        values.update(extra)
+        return schema.construct(**values)
@@ -0,0 +1,93 @@
+import re
+from datetime import datetime
+from typing import Any
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import sqlalchemy as sa
+from config import settings
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+# strftime directives and their to_char patterns, timestamps are rendered in UTC.
+TO_CHAR_PATTERNS = {
+    'Y': 'YYYY',
+    'y': 'YY',
+    'm': 'MM',
+    'd': 'DD',
+    'j': 'DDD',
+    'H': 'HH24',
+    'I': 'HH12',
+    'p': 'AM',
+    'M': 'MI',
+    'S': 'SS',
+    'f': 'US',
+    'b': 'Mon',
+    'B': 'FMMonth',
+    'a': 'Dy',
+    'A': 'FMDay',
+    'z': '"+0000"',
+    'Z': '"UTC"',
+}
+
+
+def get_to_char_format(strftime_format: str) -> str:
+    """to_char() pattern rendering UTC timestamps like `strftime_format` renders aware UTC datetimes."""
+    parts = []
+    for literal, directive in re.findall(r'([^%]*)(?:%(.)|$)', strftime_format):
+        if literal:
+            parts.append('"{}"'.format(literal.replace('\\', '\\\\').replace('"', '\\"')))
+        if directive == '%':
+            parts.append('"%"')
+        elif directive:
+            if directive not in TO_CHAR_PATTERNS:
+                raise ValueError(f'%{directive} can not be rendered by Postgres')
+            parts.append(TO_CHAR_PATTERNS[directive])
+    return ''.join(parts)
+
+
+def json_datetime(column: ColumnElement) -> ColumnElement:
+    """A timestamptz as JSON renders it, in settings.DEFAULT_DATETIME_FORMAT."""
+    pattern = get_to_char_format(settings.DEFAULT_DATETIME_FORMAT).replace("'", "''")
+    return func.to_char(func.timezone('UTC', column), sa.literal_column(f"'{pattern}'"))
+
+
+def json_object(*fields: Tuple[str, Any]) -> ColumnElement:
+    """json_build_object() of (key, value) pairs, json keeps the key order, jsonb would sort them."""
+    arguments = []
+    for key, value in fields:
+        # Keys are names from the code, rendered inline as json_build_object() needs typed arguments.
+        arguments.extend([sa.literal_column(f"'{key}'"), value])
+    return func.json_build_object(*arguments)
+
+
+class RawJSON:
+    """
+    A JSON document rendered outside of the response, by Postgres usually.
+
+    Responses splice the bytes in as they are. `versions` are the (uuid, modified at)
+    of the objects in it, the ETag of a page is derived from them without rendering.
+    """
+
+    __slots__ = ('body', 'versions')
+
+    def __init__(self, body: bytes, versions: Optional[List[Tuple[str, datetime]]] = None) -> None:
+        self.body = body
+        self.versions = versions
+
+    @classmethod
+    def from_items(
+        cls,
+        items: Iterable[str],
+        versions: Optional[List[Tuple[str, datetime]]] = None,
+    ) -> 'RawJSON':
+        """Array of rendered items."""
+        return cls(b'[' + ', '.join(items).encode() + b']', versions)
+
+
+def splice(document: str, key: str, raw: bytes) -> bytes:
+    """Add `raw` as the last member `key` of the JSON object `document`."""
+    separator = ', ' if document != '{}' else ''
+    return f'{document[:-1]}{separator}"{key}": '.encode() + raw + b'}'
@@ -330,29 +330,27 @@ class PaginateMixin:
         self,
         model_schemer: Type[BaseSchema],
         manager: PaginationManager,
+        ordering: Optional[OrderingManager] = None,
     ) -> PaginatedSchema:
-        if manager.page_size is not None:
-            paginated_query = self.query.limit(manager.page_size).offset(
-                manager.page * manager.page_size,
-            )
-        else:
-            paginated_query = self.query
-        count = await database.fetch_val(
-            sa.select([sa.func.count()]).select_from(self.query.alias('original_query')),
-        )
-        manager.check_page(count)
-
-        raw_results = await database.fetch_all(paginated_query)
-        _next = manager.get_next_page(count)
-        _prev = manager.get_prev_page()
-        _page_count = manager.get_page_count(count)
+        if manager.is_cursor:
+            return await self.get_cursor_paginated_response(model_schemer, manager, ordering)
+        raw_results, count, has_more = await manager.fetch_page(self.query)
         results = [model_schemer(**dict(obj)) for obj in raw_results]
-        return PaginatedSchema(
-            total_count=count,
-            page_count=_page_count,
-            next=_next,
-            previous=_prev,
-            results=results,
+        return manager.get_paginated_schema(results, total_count=count, has_more=has_more)
+
+    async def get_cursor_paginated_response(
+        self,
+        model_schemer: Type[BaseSchema],
+        manager: PaginationManager,
+        ordering: Optional[OrderingManager] = None,
+    ) -> PaginatedSchema:
+        keys = (ordering or OrderingManager(list())).get_keys(self.model)
+        raw_results = await database.fetch_all(manager.paginate_by_cursor(self.query, keys))
+        raw_results, next_cursor, previous_cursor = manager.get_cursor_page(raw_results, keys)
+        return manager.get_paginated_schema(
+            [model_schemer(**dict(obj)) for obj in raw_results],
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
         )
 
 
@@ -475,6 +473,8 @@ class CountOperation(BaseOperation, ExpireMixin, WhereMixin):
 
 class BaseRepository(BaseOperation):
     model: Type[ModelType]
+    # Postgres accepts at most 32767 bind parameters in one statement.
+    max_bind_parameters: int = 32767
 
     @classmethod
     def get(
@@ -490,6 +490,18 @@ class BaseRepository(BaseOperation):
     ) -> CreateOperation:
         return CreateOperation(cls.model, **kwargs)
 
+    @classmethod
+    async def create_many(
+        cls,
+        items: List[Dict[str, Any]],
+    ) -> None:
+        """Insert `items` with multi-row INSERTs, as few as the bind parameter limit allows."""
+        if not items:
+            return
+        batch_size = max(1, cls.max_bind_parameters // len(items[0]))
+        for start in range(0, len(items), batch_size):
+            await cls.create(items=items[start:start + batch_size]).execute()
+
     @classmethod
     def update(
         cls,
@@ -1,16 +1,35 @@
+import hashlib
+import json
+from datetime import datetime
+from datetime import timezone
+from email.utils import format_datetime
+from email.utils import parsedate_to_datetime
 from enum import Enum
+from functools import lru_cache
+from types import GeneratorType
 from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import Generic
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Tuple
 from typing import TypeVar
 
+from config import settings
+from fastapi import Header
 from fastapi import status
 from pydantic import BaseModel
 from pydantic.generics import GenericModel
+from pydantic.json import pydantic_encoder
 from starlette.responses import Response
 
+from sdk.rendering import RawJSON
+from sdk.rendering import splice
+from sdk.schemas import AuditSchemaMixin
 from sdk.schemas import BaseSchema
+from sdk.schemas import PaginatedSchema
 
 AnyResponseType = TypeVar('AnyResponseType')
 
@@ -40,6 +59,8 @@ class ResponseStatus(int, Enum):
     PRODUCT_LIST_CANNOT_BE_EMPTY = 4018
     CHECK_NOT_FOUND = 4019
     EMPTY_CHECK = 4020
+    IDEMPOTENCY_KEY_REUSED = 4021
+    REQUEST_IN_PROGRESS = 4022
 
     @staticmethod
     def from_status_code(status_code: int) -> 'ResponseStatus':
@@ -80,6 +101,134 @@ class DefaultResponseSchema(GenericModel, Generic[AnyResponseType], BaseSchema):
     data: Optional[AnyResponseType] = None
 
 
+class JSONRenderer:
+    """
+    JSON of already validated content, as the .json() of a BaseSchema renders it.
+
+    Models are walked through their field values instead of .dict(), other values
+    go through BaseSchema.Config.json_encoders (the datetime format) and then
+    pydantic's encoder, so the C encoder of json serializes plain data without a
+    default hook. Nothing is validated again. Models with aliased or excluded
+    fields go through .dict(), which applies those options.
+    """
+
+    encoders: Dict[type, Callable[[Any], Any]] = BaseSchema.__config__.json_encoders
+    plain_types: frozenset = frozenset((str, int, float, bool, type(None)))
+    sequence_types: tuple = (list, tuple, set, frozenset, GeneratorType)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def get_encoder(cls, value_type: type) -> Callable[[Any], Any]:
+        for base in value_type.__mro__[:-1]:
+            if base in cls.encoders:
+                return cls.encoders[base]
+        return pydantic_encoder
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def has_field_options(cls, model_type: type) -> bool:
+        return any(
+            field.alias != name or field.field_info.exclude is not None or field.field_info.include is not None
+            for name, field in model_type.__fields__.items()
+        )
+
+    @classmethod
+    def encode(cls, value: Any) -> Any:  # noqa: ANN401
+        plain_types = cls.plain_types
+        if type(value) in plain_types:
+            return value
+        encode = cls.encode
+        # Plain members are checked inline, most values of a model are plain.
+        if isinstance(value, BaseModel):
+            if cls.has_field_options(type(value)):
+                return encode(value.dict())
+            return {
+                name: item if type(item) in plain_types else encode(item)
+                for name, item in value.__dict__.items()
+            }
+        if isinstance(value, cls.sequence_types):
+            return [item if type(item) in plain_types else encode(item) for item in value]
+        if isinstance(value, dict):
+            return {encode(key): item if type(item) in plain_types else encode(item) for key, item in value.items()}
+        return encode(cls.get_encoder(type(value))(value))
+
+    @classmethod
+    def render(cls, content: Any) -> bytes:  # noqa: ANN401
+        return json.dumps(cls.encode(content)).encode()
+
+
+def _to_utc(value: datetime) -> datetime:
+    # Naive datetimes come from the app itself and are UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _get_audit_version(content: Any) -> Optional[Tuple[str, datetime]]:  # noqa: ANN401
+    if not isinstance(content, AuditSchemaMixin) or not hasattr(content, 'uuid'):
+        return None
+    return str(content.uuid), _to_utc(content.updated_at or content.created_at)
+
+
+def get_validators(content: Any) -> Tuple[Optional[str], Optional[datetime]]:  # noqa: ANN401
+    """
+    ETag and Last-Modified of `content` known without rendering it.
+
+    Audited objects are versioned by uuid and updated_at/created_at, pages of them
+    by the page metadata and the versions of their results. Pages get no
+    Last-Modified, their membership can change without any result being newer.
+    Returns (None, None) when the content has to be rendered to be validated.
+    """
+    version = _get_audit_version(content)
+    if version is not None:
+        uuid, modified_at = version
+        return make_etag(f'{uuid}:{modified_at.isoformat()}'.encode()), modified_at
+    if isinstance(content, PaginatedSchema):
+        if isinstance(content.results, RawJSON):
+            versions = content.results.versions if content.results.versions is not None else [None]
+        else:
+            versions = [_get_audit_version(result) for result in content.results]
+        if None in versions:
+            return None, None
+        page = content.json(exclude={'results'}).encode()
+        results = ';'.join(f'{uuid}:{modified_at.isoformat()}' for uuid, modified_at in versions).encode()
+        return make_etag(page + b';' + results), None
+    return None, None
+
+
+def make_etag(data: bytes) -> str:
+    # The release is part of every tag, a deploy can change the representation.
+    digest = hashlib.sha1(f'{settings.RELEASE}:'.encode() + data, usedforsecurity=False)
+    return f'"{digest.hexdigest()}"'
+
+
+class ConditionalRequest:
+    """Validators sent by the client with a GET, inject into read routes and pass to DefaultResponse."""
+
+    def __init__(
+        self,
+        if_none_match: Optional[str] = Header(None, alias='If-None-Match'),
+        if_modified_since: Optional[str] = Header(None, alias='If-Modified-Since'),
+    ) -> None:
+        self.if_none_match = if_none_match
+        self.if_modified_since = if_modified_since
+
+    def is_not_modified(self, etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+        # If-None-Match wins over If-Modified-Since when both are sent, RFC 9110 13.2.2.
+        if self.if_none_match is not None:
+            if etag is None:
+                return False
+            tags = [tag.strip() for tag in self.if_none_match.split(',')]
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+        if self.if_modified_since is None or last_modified is None:
+            return False
+        try:
+            modified_since = parsedate_to_datetime(self.if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _to_utc(last_modified).replace(microsecond=0) <= _to_utc(modified_since)
+
+
 class DefaultResponse(Response):
     media_type = 'application/json'
 
@@ -89,21 +238,66 @@ class DefaultResponse(Response):
         custom_code: int = ResponseStatus.OK,
         message: Optional[str] = None,
         details: Optional[FieldErrorsSchema] = None,
+        conditional: Optional[ConditionalRequest] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[datetime] = None,
         **kwargs,
     ) -> None:
+        """
+        :param conditional: validators of the request, enables ETag/Last-Modified and 304 answers
+        :param etag: precomputed ETag, derived from the content or its rendered body otherwise
+        :param last_modified: precomputed Last-Modified, derived from audited content otherwise
+        """
         self.message = message
         self.details = details
         self.custom_code = custom_code
+        self.conditional = conditional
+        self.etag = etag
+        self.last_modified = last_modified
         super().__init__(*args, **kwargs)
 
     def render(self, content: Any) -> bytes:  # noqa: ANN401
-        return (
-            DefaultResponseSchema(
-                custom_code=self.custom_code,
-                message=self.message,
-                details=self.details,
-                data=content,
-            )
-            .json()
-            .encode()
+        is_conditional = (
+            self.conditional is not None
+            and self.status_code == status.HTTP_200_OK
+            and self.custom_code == ResponseStatus.OK
         )
+        if is_conditional:
+            if self.etag is None and self.last_modified is None:
+                self.etag, self.last_modified = get_validators(content)
+            # Known validators answer a match before the body is rendered at all.
+            if self.conditional.is_not_modified(self.etag, self.last_modified):
+                self.status_code = status.HTTP_304_NOT_MODIFIED
+                return b''
+        body = self.render_body(content)
+        if is_conditional and self.etag is None:
+            self.etag = make_etag(body)
+            if self.conditional.is_not_modified(self.etag, None):
+                self.status_code = status.HTTP_304_NOT_MODIFIED
+                return b''
+        return body
+
+    def render_body(self, content: Any) -> bytes:  # noqa: ANN401
+        envelope = {
+            'custom_code': self.custom_code,
+            'message': self.message,
+            'details': self.details,
+        }
+        if isinstance(content, PaginatedSchema) and isinstance(content.results, RawJSON):
+            # Pre-rendered results are spliced into the envelope as they are.
+            page = {name: value for name, value in content.__dict__.items() if name != 'results'}
+            page = splice(JSONRenderer.render(page).decode(), 'results', content.results.body)
+            return splice(JSONRenderer.render(envelope).decode(), 'data', page)
+        return JSONRenderer.render(dict(envelope, data=content))
+
+    def init_headers(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        super().init_headers(headers)
+        if self.conditional is None:
+            return
+        if self.etag is not None:
+            self.raw_headers.append((b'etag', self.etag.encode('latin-1')))
+        if self.last_modified is not None:
+            last_modified = format_datetime(_to_utc(self.last_modified), usegmt=True)
+            self.raw_headers.append((b'last-modified', last_modified.encode('latin-1')))
+        # Responses are per user, clients may keep them but have to revalidate.
+        self.raw_headers.append((b'cache-control', b'private, no-cache'))
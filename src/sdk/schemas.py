@@ -6,6 +6,7 @@ from typing import Optional
 from typing import TypeVar
 from uuid import UUID
 from config import settings
+from sdk.enums import CountStrategy
 from pydantic import BaseModel
 from pydantic.generics import GenericModel
 
@@ -23,10 +24,13 @@ class UUIDSchemaMixin(BaseSchema):
 
 
 class PaginatedSchema(GenericModel, Generic[BaseSchemaType]):
-    total_count: int = 0
-    page_count: int
+    total_count: Optional[int] = 0
+    page_count: Optional[int]
     next: Optional[int]  # noqa: VNE003
     previous: Optional[int]
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+    count_strategy: Optional[CountStrategy] = None
     results: List[BaseSchemaType]
 
 
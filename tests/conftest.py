@@ -1,12 +1,17 @@
 import asyncio
-from typing import Generator, List
+from pathlib import Path
+from typing import AsyncGenerator, Generator, List
 
 import pytest
 import pytest_asyncio
 from alembic.command import upgrade as alembic_upgrade
+from cache import LocalCache
+from cache import TieredCache
+from cache import redis_pool
 from api.v1.auth.schemas import Session
 from api.v1.auth.services import SessionService
 from api.v1.checks import enums
+from api.v1.checks.repositories import ReceiptRepository
 from api.v1.users.schemas import UserCreateInDbWithUUID
 from api.v1.users.schemas import UserCreateInDb
 from api.v1.checks.schemas import CheckCreateInDb
@@ -81,6 +86,26 @@ def redis() -> MockCacheBackend:
     return MockCacheBackend()
 
 
+@pytest.fixture(autouse=True)
+def receipts_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(ReceiptRepository, 'media_path', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def clear_local_caches() -> Generator[None, None, None]:
+    yield
+    for cache in [*TieredCache.instances.values(), *LocalCache.instances.values()]:
+        cache.clear()
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_redis_pool() -> AsyncGenerator[None, None]:
+    # Tests patch RedisBackend.create_pool, every test opens the shared pool anew.
+    yield
+    await redis_pool.disconnect()
+
+
 def pytest_sessionfinish() -> None:
     if database_exists(settings.DB_URI):
         drop_database(settings.DB_URI)
@@ -106,7 +131,10 @@ async def fake_user(fake_client: UserCreateInDbWithUUID) -> UserCreateInDbWithUU
 def fake_check(fake_client: UserCreateInDbWithUUID) -> CheckCreateInDb:
     return CheckCreateInDb(
         uuid='1a5ae7d3-7c2c-4d14-ad3f-c81bf3092831',
-        user=str(fake_client.uuid)
+        user=str(fake_client.uuid),
+        total=297.7,
+        rest=702.3,
+        product_count=3,
     )
 
 
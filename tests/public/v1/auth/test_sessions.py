@@ -0,0 +1,48 @@
+import argparse
+
+import pytest
+from api.v1.auth.schemas import Session
+from api.v1.auth.services import SessionService
+from api.v1.auth.services import TokenService
+from api.v1.users.schemas import UserCreateInDbWithUUID
+from commands.index_sessions import IndexSessions
+from commands.migrate_blacklist import MigrateBlacklist
+from transaction import Transaction
+from pytest_mock import MockerFixture
+from tests.utils import MockCacheBackend
+
+
+@pytest.mark.asyncio
+class TestSessionCommands:
+    async def test_index_sessions(
+            self,
+            db_connection: Transaction,
+            fake_user: UserCreateInDbWithUUID,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        _, key = SessionService.new_session(fake_user)
+        # Stored before the index, other keys with colons are left alone.
+        await redis.set(key, str(fake_user.uuid))
+        await redis.set(f'idempotency:check:create:{fake_user.uuid}:key', '1')
+        await IndexSessions.run(argparse.Namespace(count=1))
+        assert [key for key, _ in await SessionService.get_sessions(redis, fake_user.uuid)] == [key]
+        await IndexSessions.run(argparse.Namespace(count=1))
+        assert len(await SessionService.get_sessions(redis, fake_user.uuid)) == 1
+
+    async def test_migrate_blacklist(
+            self,
+            db_connection: Transaction,
+            fake_user: UserCreateInDbWithUUID,
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        await redis.set(f'bl:{fake_session.access_token}', fake_session.access_token)
+        await redis.set('bl:expired', 'expired')
+        await MigrateBlacklist.run(argparse.Namespace(count=10))
+        assert await redis.keys('bl:*') == []
+        payload = TokenService.get_payload(fake_session.access_token)
+        assert await SessionService.is_revoked(redis, payload, fake_session.access_token)
@@ -1,6 +1,19 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from datetime import timedelta
+
 import pytest
+from api.v1.auth.cache import REVOCATIONS_CHANNEL
+from api.v1.auth.cache import RevocationListener
+from api.v1.auth.cache import revocation_cache
+from api.v1.auth.records import Revocations
 from api.v1.auth.schemas import Session
+from api.v1.auth.services import SessionService
+from api.v1.auth.services import TokenService
 from api.v1.users.schemas import UserCreateInDbWithUUID
+from cache import RedisPool
 from fastapi import FastAPI
 from httpx import AsyncClient
 from pytest_mock import MockerFixture
@@ -121,6 +134,7 @@ class TestAuthorizationViews(TestBase):
             self,
             app: FastAPI,
             client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,
             fake_session: Session,
             redis: MockCacheBackend,
             mocker: MockerFixture,
@@ -137,3 +151,189 @@ class TestAuthorizationViews(TestBase):
         json_data = response.json()
         assert json_data['custom_code'] == ResponseStatus.OK
         assert DefaultResponseSchema(**json_data)
+        # The session is created from the stored user, the token carries its public fields only.
+        payload = TokenService.get_payload(json_data['data']['access_token'])
+        assert payload['data'] == {'uuid': str(fake_user.uuid), 'name': fake_user.name, 'email': fake_user.email}
+
+    async def test_refresh_token_expired_access(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        mocker.patch.object(Session, 'get_access_token_expires', return_value=datetime.utcnow() - timedelta(minutes=5))
+        session = await SessionService.create_session(redis, fake_user)
+        assert TokenService.get_payload(session.access_token) is None
+        response = await client.post(
+            app.url_path_for('auth:refresh-token'),
+            json={'refresh_token': session.refresh_token},
+            headers={'Authorization': f'Bearer {session.access_token}'},
+        )
+        assert response.json()['custom_code'] == ResponseStatus.OK
+
+    async def test_refresh_token_reused(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        # The old session is replaced by the refresh.
+        for custom_code in (ResponseStatus.OK, ResponseStatus.INVALID_ACCESS_OR_REFRESH_TOKEN):
+            response = await client.post(
+                app.url_path_for('auth:refresh-token'),
+                json={'refresh_token': fake_session.refresh_token},
+                headers={'Authorization': f'Bearer {fake_session.access_token}'},
+            )
+            assert response.json()['custom_code'] == custom_code
+
+    async def test_sessions(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+        response = await client.get(app.url_path_for('auth:sessions'), headers=headers)
+        json_data = response.json()
+        assert json_data['custom_code'] == ResponseStatus.OK
+        assert [session['current'] for session in json_data['data']] == [True]
+        response = await client.get(
+            app.url_path_for('auth:sessions'),
+            headers={**headers, 'If-None-Match': response.headers['etag']},
+        )
+        assert response.status_code == 304
+        response = await client.delete(app.url_path_for('auth:logout'), headers=headers)
+        assert response.json()['custom_code'] == ResponseStatus.OK
+        assert await SessionService.get_sessions(redis, fake_user.uuid) == []
+        # Only the session is revoked, no key per token.
+        revocations = await SessionService.load_revocations(redis, fake_user.uuid)
+        assert revocations.version == 0 and len(revocations.sessions) == 1
+        response = await client.get(app.url_path_for('auth:sessions'), headers=headers)
+        assert response.json()['custom_code'] == ResponseStatus.UNAUTHORIZED
+
+    async def test_logout_all(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+        response = await client.delete(app.url_path_for('auth:logout-all'), headers=headers)
+        assert response.json()['custom_code'] == ResponseStatus.OK
+        assert await redis.get(SessionService.get_index_key(fake_user.uuid)) is None
+        assert await SessionService.get_version(redis, fake_user.uuid) == 1
+        response = await client.get(app.url_path_for('auth:sessions'), headers=headers)
+        assert response.json()['custom_code'] == ResponseStatus.UNAUTHORIZED
+        # Sessions created afterwards are of the new generation.
+        session = await SessionService.create_session(redis, fake_user)
+        # Indexed until its refresh token expires.
+        [(_, expires_at)] = await SessionService.get_sessions(redis, fake_user.uuid)
+        assert abs(expires_at - TokenService.get_payload(session.refresh_token)['exp']) <= 1
+        response = await client.get(
+            app.url_path_for('auth:sessions'),
+            headers={'Authorization': f'Bearer {session.access_token}'},
+        )
+        assert response.json()['custom_code'] == ResponseStatus.OK
+
+    async def test_authenticated_user_cached(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        get_payload = mocker.spy(TokenService, 'get_payload')
+        hgetall = mocker.spy(redis, 'hgetall')
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+        for _ in range(3):
+            response = await client.get(app.url_path_for('auth:sessions'), headers=headers)
+            assert response.json()['custom_code'] == ResponseStatus.OK
+        # Verified and checked for revocations once, later requests are served by the caches.
+        assert get_payload.call_count == 1
+        assert hgetall.call_count == 1
+
+    async def test_revocation_published(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        user_id = str(fake_user.uuid)
+        await SessionService.get_revocations(redis, user_id)
+        assert revocation_cache.get(user_id) is not None
+        # Another worker revoked the tokens of the user.
+        RevocationListener.handle(user_id.encode())
+        assert revocation_cache.get(user_id) is None
+        response = await client.delete(
+            app.url_path_for('auth:logout'),
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        assert response.json()['custom_code'] == ResponseStatus.OK
+        assert redis.published == [(REVOCATIONS_CHANNEL, user_id)]
+
+    async def test_revocation_during_load(
+            self,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        user_id = str(uuid.uuid4())
+        load_revocations = SessionService.load_revocations
+
+        async def load_and_revoke(*args, **kwargs) -> Revocations:
+            revocations = await load_revocations(*args, **kwargs)
+            # Published by another worker while the hash was read.
+            RevocationListener.handle(user_id.encode())
+            return revocations
+
+        mocker.patch.object(SessionService, 'load_revocations', side_effect=load_and_revoke)
+        await SessionService.get_revocations(redis, user_id)
+        assert revocation_cache.get(user_id) is None
+        await SessionService.get_revocations(redis, user_id)
+        assert revocation_cache.get(user_id) is None
+        mocker.patch.object(SessionService, 'load_revocations', side_effect=load_revocations)
+        await SessionService.get_revocations(redis, user_id)
+        assert revocation_cache.get(user_id) is not None
+
+    async def test_revocation_listener(
+            self,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        # The first connection fails with an error that is not a RedisError.
+        mocker.patch('cache.RedisBackend.create_pool', side_effect=[RuntimeError('boom'), redis])
+        listener = RevocationListener(RedisPool('redis://localhost'))
+        listener.retry_delay = 0
+        revocation_cache.set('stale', object(), expires_at=time.time() + 60)
+        listener.start()
+        try:
+            while REVOCATIONS_CHANNEL not in redis.subscribers:
+                await asyncio.sleep(0)
+            # Dropped once subscribed, revocations may have been missed before.
+            assert revocation_cache.get('stale') is None
+            revocation_cache.set('user', object(), expires_at=time.time() + 60)
+            await redis.publish(REVOCATIONS_CHANNEL, 'user')
+            await asyncio.sleep(0)
+            assert revocation_cache.get('user') is None
+        finally:
+            await listener.stop()
+        assert redis.subscribers[REVOCATIONS_CHANNEL] == []
@@ -0,0 +1,122 @@
+import argparse
+import datetime
+import json
+import uuid
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from api.v1.checks import enums
+from api.v1.checks.filters import CheckFilters
+from api.v1.checks.imports import CheckImportService
+from api.v1.checks.models import Check
+from api.v1.checks.reports import CheckReportService
+from api.v1.checks.schemas import CheckCreate
+from api.v1.checks.services import CheckService
+from api.v1.checks.services import ProductService
+from api.v1.users.schemas import UserCreateInDbWithUUID
+from commands.import_checks import ImportChecks
+from database import database
+from transaction import Transaction
+
+
+def get_args(source: Path, user: UserCreateInDbWithUUID, **kwargs) -> argparse.Namespace:
+    args = {
+        'input': str(source),
+        'user': user.uuid,
+        'format': None,
+        'batch_size': 2,
+        'checkpoint': None,
+        'restart': False,
+        'rejects': None,
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def make_check(amount: float, *prices: float) -> dict:
+    return {
+        'products': [{'name': f'Product {price}', 'price': price, 'quantity': 2} for price in prices],
+        'payment': {'type': enums.PaymentType.CASH.value, 'amount': amount},
+    }
+
+
+@pytest.mark.asyncio
+class TestImportChecks:
+    async def test_import_ndjson_resumable(
+            self,
+            db_connection: Transaction,
+            fake_user: UserCreateInDbWithUUID,
+            tmp_path: Path,
+    ) -> None:
+        source = tmp_path / 'checks.ndjson'
+        source.write_text('\n'.join(json.dumps(check) for check in [
+            make_check(100, 10, 20),
+            make_check(10, 10, 20),
+            dict(make_check(50, 5), created_at='2024-04-01T12:30:00+0000'),
+        ]))
+        rejects = tmp_path / 'rejects.ndjson'
+        await ImportChecks.run(get_args(source, fake_user, rejects=str(rejects)))
+
+        assert await CheckService.repository.count().execute() == 2
+        assert await ProductService.repository.count().execute() == 3
+        checkpoint = json.loads((tmp_path / 'checks.ndjson.checkpoint').read_text())
+        assert (checkpoint['position'], checkpoint['imported'], checkpoint['rejected']) == (3, 2, 1)
+        reject = json.loads(rejects.read_text())
+        assert (reject['position'], reject['error']) == (1, 'Not enough money')
+        check = await database.fetch_one(sa.select([Check]).where(Check.total == 10))
+        assert check['created_at'].isoformat() == '2024-04-01T12:30:00+00:00'
+        assert check['rest'] == pytest.approx(40)
+
+        await ImportChecks.run(get_args(source, fake_user))
+        assert await CheckService.repository.count().execute() == 2
+        # Batches committed before the checkpoint was saved are not imported twice.
+        await ImportChecks.run(get_args(source, fake_user, restart=True))
+        assert await CheckService.repository.count().execute() == 2
+        checkpoint = json.loads((tmp_path / 'checks.ndjson.checkpoint').read_text())
+        assert (checkpoint['position'], checkpoint['imported'], checkpoint['rejected']) == (3, 0, 1)
+        assert await ProductService.repository.count().execute() == 3
+
+    async def test_import_rejects_invalid_created_at(self) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        checks, rejected = CheckImportService.validate_batch(
+            [dict(make_check(100, 10), created_at=1700000000), make_check(100, 10)],
+            uuid.uuid4(),
+            now,
+        )
+        assert len(checks) == 1
+        assert rejected == [(0, 'created_at must be a date and time string, got 1700000000')]
+
+    @pytest.mark.parametrize('report_format', ['csv', 'xlsx'])
+    async def test_import_report(
+            self,
+            db_connection: Transaction,
+            fake_user: UserCreateInDbWithUUID,
+            tmp_path: Path,
+            report_format: str,
+    ) -> None:
+        created = [
+            await CheckService.create_check(CheckCreate.parse_obj(check), fake_user.uuid)
+            for check in (make_check(100, 10, 20), make_check(30, 7.5), make_check(500, 1, 2, 3))
+        ]
+        report = tmp_path / f'report.{report_format}'
+        writer = CheckReportService.write_csv if report_format == 'csv' else CheckReportService.write_xlsx
+        filters = CheckFilters(
+            search_query=None,
+            search_mode=enums.SearchMode.TRIGRAM,
+            created_at_before=None,
+            created_at_after=None,
+            total_gte=None,
+            total_lte=None,
+            payment_type=None,
+        )
+        await writer(user_uuid=fake_user.uuid, filters=filters, path=str(report))
+        await database.execute(sa.delete(Check))
+
+        await ImportChecks.run(get_args(report, fake_user))
+        for check in created:
+            imported = CheckService.get_schema(await CheckService.repository.get_check(check.uuid, fake_user.uuid))
+            # CSV keeps seconds, XLSX milliseconds.
+            assert abs(imported.created_at - check.created_at) < datetime.timedelta(seconds=1)
+            assert sorted(imported.products, key=lambda product: product.name) == check.products
+            assert (imported.total, imported.rest, imported.payment) == (check.total, check.rest, check.payment)
@@ -0,0 +1,52 @@
+import argparse
+import datetime
+
+import pytest
+import sqlalchemy as sa
+from api.v1.checks.schemas import CheckCreate
+from api.v1.checks.services import CheckPartitionService
+from api.v1.checks.services import CheckService
+from api.v1.users.schemas import UserCreateInDbWithUUID
+from commands.manage_partitions import ManagePartitions
+from database import database
+from sdk.partitions import add_months
+from sdk.partitions import get_month
+from transaction import Transaction
+
+
+def get_args(**kwargs) -> argparse.Namespace:
+    args = {'precreate': 2, 'retention': 6, 'drop': False, 'dry_run': False}
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+@pytest.mark.asyncio
+class TestPartitions:
+    async def test_manage_partitions(self, db_connection: Transaction, fake_user: UserCreateInDbWithUUID) -> None:
+        current = get_month(datetime.datetime.now(datetime.timezone.utc))
+        expired = add_months(current, -12)
+        kept = add_months(current, -6)
+        assert await CheckPartitionService.ensure([expired, kept]) == [expired, kept]
+        await ManagePartitions.run(get_args())
+
+        for partitions in CheckPartitionService.partitions:
+            months = await partitions.get_months()
+            assert expired not in months
+            assert {kept, current, add_months(current, 2)} <= set(months)
+        detached = await database.fetch_val(
+            sa.text('SELECT count(*) FROM pg_class WHERE relname = :name').bindparams(
+                name=CheckPartitionService.partitions[0].get_name(expired),
+            ),
+        )
+        assert detached == 1
+
+        await ManagePartitions.run(get_args(retention=3, drop=True))
+        assert kept not in await CheckPartitionService.partitions[0].get_months()
+        check = await CheckService.create_check(
+            CheckCreate.parse_obj({
+                'products': [{'name': 'Milk', 'price': 40, 'quantity': 1}],
+                'payment': {'type': 'CASH', 'amount': 50},
+            }),
+            fake_user.uuid,
+        )
+        assert CheckService.get_schema(await CheckService.repository.get_check(check.uuid)).products == check.products
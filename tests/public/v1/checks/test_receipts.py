@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+from api.v1.checks import enums
+from api.v1.checks.receipts import get_receipt_layout
+from api.v1.checks.schemas import CheckSchema
+from api.v1.checks.schemas import PaymentCreate
+from api.v1.checks.schemas import ProductSchema
+from commands.receipt_benchmark import generate_check_text_before
+
+
+@pytest.fixture()
+def receipt_check() -> CheckSchema:
+    return CheckSchema(
+        uuid='1a5ae7d3-7c2c-4d14-ad3f-c81bf3092831',
+        created_at=datetime.datetime(2024, 4, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        products=[
+            ProductSchema(name='Butter', price=13.3, quantity=3),
+            ProductSchema(name='Chocolate Roshen milk with whole hazelnuts 90 g', price=54.9, quantity=1),
+            ProductSchema(name='Detergentforwashingmachinesconcentrated3kg', price=317, quantity=2),
+        ],
+        payment=PaymentCreate(type=enums.PaymentType.CASHLESS, amount=1000),
+    )
+
+
+class TestReceiptLayout:
+    def test_matches_previous_renderer(self, receipt_check: CheckSchema) -> None:
+        assert get_receipt_layout(40).render(receipt_check) == generate_check_text_before(receipt_check, 40)
+
+    @pytest.mark.parametrize('width', [32, 40, 48, 80])
+    def test_widths(self, receipt_check: CheckSchema, width: int) -> None:
+        lines = get_receipt_layout(width).render(receipt_check).split('\n')
+        assert all(len(line) <= width for line in lines)
+        assert lines[1] == '=' * width
+        assert lines[-2] == '01.04.2024 12:30'.center(width)
+        name = 'Detergentforwashingmachinesconcentrated3kg'
+        if len(name) > width - 10:
+            assert f'    {name[:width - 10]}' in lines
+            assert f'    {name[width - 10:]}' + '634.00'.rjust(width - 4 - len(name[width - 10:]), '.') in lines
+        else:
+            assert f'    {name}' + '634.00'.rjust(width - 4 - len(name), '.') in lines
+
+    def test_render_many(self, receipt_check: CheckSchema) -> None:
+        layout = get_receipt_layout(32)
+        assert layout.render_many([receipt_check] * 3) == '\n\n'.join([layout.render(receipt_check)] * 3)
+        assert layout.render_many([receipt_check] * 2, separator=('\f',)).count('\n\f\n') == 1
+
+    def test_width_too_small(self) -> None:
+        with pytest.raises(ValueError):
+            get_receipt_layout(10)
@@ -1,20 +1,42 @@
+import asyncio
+import csv
 import datetime
+import io
+import json
+import os
 import uuid
 from typing import List
+import fastapi.routing
 import pytest
+import sqlalchemy as sa
 from api.v1.auth.schemas import Session
+from api.v1.auth.services import SessionService
 from api.v1.checks import enums
+from api.v1.checks.cache import check_cache
+from api.v1.checks.cache import get_check_key
+from api.v1.checks.models import DailyTotal
+from api.v1.checks.cache import receipt_cache
 from api.v1.checks.schemas import CheckCreateInDb
 from api.v1.checks.schemas import ProductInDb
 from api.v1.checks.schemas import PaymentInDb
+from api.v1.checks.schemas import CheckSchema
+from api.v1.checks.repositories import ReceiptRepository
 from api.v1.checks.services import CheckService, ProductService, PaymentService
+from api.v1.checks.services import CheckPartitionService
+from api.v1.checks.services import DailyTotalService
 from api.v1.users.schemas import UserCreateInDbWithUUID
+from database import database
 from fastapi import FastAPI
 from httpx import AsyncClient
+from openpyxl import load_workbook
+from pydantic import Field
 from pytest_mock import MockerFixture
+from sdk.idempotency import Idempotency
 from api.v1.users.services import UserService
+from sdk.responses import DefaultResponse
 from sdk.responses import DefaultResponseSchema
 from sdk.responses import ResponseStatus
+from sdk.schemas import BaseSchema
 from tests.public.v1.common import TestBase
 from tests.utils import MockCacheBackend
 
@@ -56,6 +78,153 @@ class TestChecksViews(TestBase):
         json_data = response.json()
         assert json_data['custom_code'] == ResponseStatus.OK
         assert DefaultResponseSchema(**json_data)
+        check = await CheckService.repository.get().where(uuid=json_data['data']['uuid']).execute()
+        assert check['total'] == pytest.approx(297.7)
+        assert check['rest'] == pytest.approx(702.3)
+        assert check['product_count'] == 3
+        assert CheckSchema(**json_data['data']).created_at == check['created_at'].replace(microsecond=0)
+        assert [product['name'] for product in json_data['data']['products']] == [
+            product.name for product in fake_products
+        ]
+
+    async def test_check_daily_report(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_products: List[ProductInDb],
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+        products_as_dicts = [
+            {'name': product.name, 'price': product.price, 'quantity': product.quantity}
+            for product in fake_products
+        ]
+        await client.post(
+            app.url_path_for('check:create'),
+            json={'products': products_as_dicts, 'payment': {'type': enums.PaymentType.CASH, 'amount': 1000}},
+            headers=headers,
+        )
+        await client.post(
+            app.url_path_for('checks:create:batch'),
+            json=[
+                {'products': products_as_dicts, 'payment': {'type': enums.PaymentType.CASH, 'amount': 300}},
+                {'products': products_as_dicts[:1], 'payment': {'type': enums.PaymentType.CASHLESS, 'amount': 40}},
+            ],
+            headers=headers,
+        )
+
+        async def get_report() -> dict:
+            response = await client.get(app.url_path_for('checks:reports:daily'), headers=headers)
+            json_data = response.json()
+            assert json_data['custom_code'] == ResponseStatus.OK
+            assert DefaultResponseSchema(**json_data)
+            return json_data['data']
+
+        report = await get_report()
+        assert len(report) == 1
+        day = report[0]
+        assert day['date'] == datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        assert day['check_count'] == 3
+        assert day['total'] == pytest.approx(297.7 * 2 + 39.9)
+        assert day['cash'] == pytest.approx(1300)
+        assert day['cashless'] == pytest.approx(40)
+        assert day['rest'] == pytest.approx(1340 - 297.7 * 2 - 39.9)
+        assert [(totals['payment_type'], totals['check_count']) for totals in day['payment_types']] == [
+            (enums.PaymentType.CASH, 2),
+            (enums.PaymentType.CASHLESS, 1),
+        ]
+
+        # The rollup can be rebuilt from the raw rows.
+        await database.execute(sa.update(DailyTotal).values(check_count=0, total=0))
+        today = datetime.date.fromisoformat(day['date'])
+        await DailyTotalService.rebuild(today, today, fake_user.uuid)
+        assert await get_report() == report
+
+        response = await client.get(app.url_path_for('checks:reports:daily'), headers=headers)
+        response = await client.get(
+            app.url_path_for('checks:reports:daily'),
+            headers={**headers, 'If-None-Match': response.headers['etag']},
+        )
+        assert response.status_code == 304
+
+        response = await client.get(
+            app.url_path_for('checks:reports:daily'),
+            params={'date_from': '2024-04-02', 'date_to': '2024-04-01'},
+            headers=headers,
+        )
+        assert response.json()['custom_code'] == ResponseStatus.VALIDATION_ERROR
+
+    async def test_check_create_idempotent(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        check_data = {
+            'products': [
+                {'name': product.name, 'price': product.price, 'quantity': product.quantity}
+                for product in fake_products
+            ],
+            'payment': {'type': fake_payment.type, 'amount': fake_payment.amount},
+        }
+        headers = {'Authorization': f'Bearer {fake_session.access_token}', 'Idempotency-Key': 'retry-1'}
+        # Warming the caches is best effort, the stored check is answered and replayed anyway.
+        mocker.patch.object(ReceiptRepository, 'store', side_effect=OSError('No space left on device'))
+        first = await client.post(app.url_path_for('check:create'), json=check_data, headers=headers)
+        retry = await client.post(app.url_path_for('check:create'), json=check_data, headers=headers)
+        assert first.json()['custom_code'] == ResponseStatus.OK
+        assert retry.json() == first.json()
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert await CheckService.repository.count().execute() == 1
+
+        check_data['payment']['amount'] = 500
+        response = await client.post(app.url_path_for('check:create'), json=check_data, headers=headers)
+        assert response.json()['custom_code'] == ResponseStatus.IDEMPOTENCY_KEY_REUSED
+
+        # A duplicate waits for the request in flight and gets its response.
+        idempotency = Idempotency(key='retry-2')
+        cache_key = idempotency.get_cache_key('test')
+        fingerprint = idempotency.get_fingerprint(check_data)
+        await redis.set(cache_key, json.dumps({'state': 'in_flight', 'fingerprint': fingerprint}), expire=60)
+
+        async def finish() -> None:
+            await asyncio.sleep(0.1)
+            stored = {
+                'state': 'done',
+                'fingerprint': fingerprint,
+                'status_code': 200,
+                'media_type': 'application/json',
+                'body': '{"custom_code": 0}',
+            }
+            await redis.set(cache_key, json.dumps(stored), expire=60)
+
+        handler = mocker.AsyncMock()
+        response, _ = await asyncio.gather(idempotency.execute(redis, 'test', check_data, handler), finish())
+        assert response.body == b'{"custom_code": 0}'
+        handler.assert_not_called()
+
+        # A request that lost its marker leaves the marker of the request that took over alone.
+        idempotency = Idempotency(key='retry-3')
+        cache_key = idempotency.get_cache_key('test')
+        other = json.dumps({'state': 'in_flight', 'fingerprint': fingerprint, 'token': 'other'})
+
+        async def taken_over() -> None:
+            await redis.set(cache_key, other, expire=60)
+            raise RuntimeError('failed')
+
+        with pytest.raises(RuntimeError):
+            await idempotency.execute(redis, 'test', check_data, taken_over)
+        assert await redis.get(cache_key) == other
 
     async def test_check_create_product_cannot_be_empty(
             self,
@@ -119,6 +288,7 @@ class TestChecksViews(TestBase):
         json_data = response.json()
         assert json_data['custom_code'] == ResponseStatus.NOT_ENOUGH_MONEY
         assert DefaultResponseSchema(**json_data)
+        assert await CheckService.repository.count().execute() == 0
 
     async def test_check_create_total_empty(
             self,
@@ -155,6 +325,68 @@ class TestChecksViews(TestBase):
         assert json_data['custom_code'] == ResponseStatus.EMPTY_CHECK
         assert DefaultResponseSchema(**json_data)
 
+    async def test_check_create_batch(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        mset = mocker.spy(redis, 'mset')
+        products_as_dicts = [
+            {
+                'name': product.name,
+                'price': product.price,
+                'quantity': product.quantity,
+            } for product in fake_products
+        ]
+        checks = [
+            {'products': products_as_dicts, 'payment': {'type': fake_payment.type, 'amount': 1000}},
+            {'products': products_as_dicts, 'payment': {'type': fake_payment.type, 'amount': 100}},
+            {'products': products_as_dicts[:1], 'payment': {'type': enums.PaymentType.CASHLESS, 'amount': 500}},
+        ]
+        response = await client.post(
+            app.url_path_for('checks:create:batch'),
+            json=checks,
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        json_data = response.json()
+        assert json_data['custom_code'] == ResponseStatus.OK
+        assert DefaultResponseSchema(**json_data)
+        results = json_data['data']
+        assert [result['index'] for result in results] == [0, 1, 2]
+        assert [result['custom_code'] for result in results] == [
+            ResponseStatus.OK,
+            ResponseStatus.NOT_ENOUGH_MONEY,
+            ResponseStatus.OK,
+        ]
+        assert results[1]['check'] is None
+        for result, products_count in ((results[0], 3), (results[2], 1)):
+            check_uuid = result['check']['uuid']
+            check = await CheckService.repository.get().where(uuid=check_uuid).execute()
+            assert check['product_count'] == products_count
+            assert check['rest'] == pytest.approx(result['check']['rest'])
+            assert await ProductService.repository.count().where(check=check_uuid).execute() == products_count
+            assert await PaymentService.repository.get().where(check=check_uuid).execute()
+        assert await CheckService.repository.count().execute() == 2
+        # The created checks and their receipts are cached in a round trip each.
+        assert mset.call_count == 2
+        assert await redis.get(check_cache.get_key(get_check_key(results[0]['check']['uuid'], fake_user.uuid)))
+
+        settings = mocker.patch('api.v1.checks.services.settings')
+        settings.CHECK_BATCH_MAX_SIZE = 2
+        response = await client.post(
+            app.url_path_for('checks:create:batch'),
+            json=checks,
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        assert response.json()['custom_code'] == ResponseStatus.VALIDATION_ERROR
+
     async def test_check_all(
             self,
             app: FastAPI,
@@ -181,6 +413,13 @@ class TestChecksViews(TestBase):
         assert json_data['custom_code'] == ResponseStatus.OK
         assert DefaultResponseSchema(**json_data)
         assert len(json_data['data']['results']) == 1
+        # Rendered by Postgres, the same document as CheckSchema renders.
+        check = CheckService.get_schema(await CheckService.repository.get_check(fake_check.uuid))
+        result = json_data['data']['results'][0]
+        assert sorted(result.pop('products'), key=lambda product: product['name']) == sorted(
+            json.loads(check.json())['products'], key=lambda product: product['name'],
+        )
+        assert result == json.loads(check.json(exclude={'products'}))
 
     async def test_check_all_with_filters(
             self,
@@ -202,11 +441,15 @@ class TestChecksViews(TestBase):
         filter_created_at = datetime.datetime(year=2024, month=1, day=5)
         utc_zone = datetime.timezone(datetime.timedelta(hours=0))
         filter_created_at = filter_created_at.replace(tzinfo=utc_zone)
+        await CheckPartitionService.ensure([datetime.date(2024, 1, 1)])
         await CheckService.repository.create(
             **{
                 'uuid': second_check_uuid,
                 'user': str(fake_user.uuid),
-                'created_at': filter_created_at
+                'created_at': filter_created_at,
+                'total': 882.9,
+                'rest': 117.1,
+                'product_count': 2,
             }
         ).execute()
         await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
@@ -217,13 +460,15 @@ class TestChecksViews(TestBase):
                 'price': 324.3,
                 'quantity': 2,
                 'check': second_check_uuid,
+                'created_at': filter_created_at,
             },
             {
                 'uuid': '3279f47c-e018-44bd-b850-ef272bd8fce6',
                 'name': 'fridge',
                 'price': 234.3,
                 'quantity': 1,
-                'check': second_check_uuid
+                'check': second_check_uuid,
+                'created_at': filter_created_at,
             },
         ]).execute()
         await PaymentService.repository.create(**fake_payment.dict()).execute()
@@ -231,7 +476,8 @@ class TestChecksViews(TestBase):
             'uuid': '116eca4b-6834-43c7-a5d5-a8ad92db176b',
             'type': enums.PaymentType.CASHLESS,
             'amount': 1000,
-            'check': second_check_uuid
+            'check': second_check_uuid,
+            'created_at': filter_created_at,
         }).execute()
         response = await client.get(
             app.url_path_for('checks:all'),
@@ -254,6 +500,27 @@ class TestChecksViews(TestBase):
         checks = json_data['data']['results']
         for check in checks:
             assert search_row in [product.get('name') for product in check.get('products')]
+        # The whole check comes back, not only the matching products
+        assert [len(check.get('products')) for check in checks] == [2]
+
+        # Full-text search
+        for params in ({'search': 'Fridge', 'search_mode': 'fulltext'}, {'search': 'fridge', 'pagination': 'cursor'}):
+            response = await client.get(
+                app.url_path_for('checks:all'),
+                params=params,
+                headers={'Authorization': f'Bearer {fake_session.access_token}'},
+            )
+            json_data = response.json()
+            assert json_data['custom_code'] == ResponseStatus.OK
+            assert [check.get('uuid') for check in json_data['data']['results']] == [second_check_uuid]
+        response = await client.get(
+            app.url_path_for('checks:all'),
+            params={'search': 'milk or chair', 'search_mode': 'fulltext', 'pagination': 'cursor'},
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        json_data = response.json()
+        assert json_data['custom_code'] == ResponseStatus.OK
+        assert len(json_data['data']['results']) == 2
 
         # created_at_before test
         date_format = "%Y-%m-%dT%H:%M:%S%z"
@@ -292,6 +559,7 @@ class TestChecksViews(TestBase):
         json_data = response.json()
         assert json_data['custom_code'] == ResponseStatus.OK
         checks = json_data['data']['results']
+        assert [check.get('uuid') for check in checks] == [second_check_uuid]
         for check in checks:
             assert check.get('total') >= total_gte
 
@@ -305,6 +573,7 @@ class TestChecksViews(TestBase):
         json_data = response.json()
         assert json_data['custom_code'] == ResponseStatus.OK
         checks = json_data['data']['results']
+        assert [check.get('uuid') for check in checks] == [str(fake_check.uuid)]
         for check in checks:
             assert check.get('total') <= total_lte
 
@@ -321,6 +590,99 @@ class TestChecksViews(TestBase):
         for check in checks:
             assert check.get('payment').get('type') == payment_type
 
+    async def test_check_export_ndjson(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_check: CheckCreateInDb,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        await CheckService.repository.create(**fake_check.dict()).execute()
+        await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
+        await PaymentService.repository.create(**fake_payment.dict()).execute()
+        older_check_uuid = str(uuid.uuid4())
+        older_created_at = datetime.datetime(2024, 1, 5, tzinfo=datetime.timezone.utc)
+        await CheckPartitionService.ensure([datetime.date(2024, 1, 1)])
+        await CheckService.repository.create(
+            uuid=older_check_uuid,
+            user=str(fake_user.uuid),
+            created_at=older_created_at,
+            total=234.3,
+            rest=765.7,
+            product_count=1,
+        ).execute()
+        await ProductService.repository.create(
+            uuid=str(uuid.uuid4()), name='fridge', price=234.3, quantity=1, check=older_check_uuid,
+            created_at=older_created_at,
+        ).execute()
+        await PaymentService.repository.create(
+            uuid=str(uuid.uuid4()), type=enums.PaymentType.CASHLESS, amount=1000, check=older_check_uuid,
+            created_at=older_created_at,
+        ).execute()
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+
+        response = await client.get(app.url_path_for('checks:export:ndjson'), headers=headers)
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        checks = [CheckSchema.parse_raw(line) for line in response.text.splitlines()]
+        assert [str(check.uuid) for check in checks] == [older_check_uuid, str(fake_check.uuid)]
+        assert len(checks[1].products) == 3
+        assert checks[1].total == pytest.approx(297.7)
+        assert checks[0].payment.type == enums.PaymentType.CASHLESS
+
+        response = await client.get(
+            app.url_path_for('checks:export:ndjson'),
+            params={'payment_type': enums.PaymentType.CASH.value, 'search': 'knife'},
+            headers=headers,
+        )
+        assert [json.loads(line)['uuid'] for line in response.text.splitlines()] == [str(fake_check.uuid)]
+
+    async def test_check_reports(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_check: CheckCreateInDb,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        await CheckService.repository.create(**fake_check.dict()).execute()
+        await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
+        await PaymentService.repository.create(**fake_payment.dict()).execute()
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+
+        response = await client.get(app.url_path_for('checks:report:csv'), headers=headers)
+        assert response.headers['content-type'].startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row['Product'] for row in rows] == ['Butter', 'Knife', 'Milk']
+        assert {row['Check'] for row in rows} == {str(fake_check.uuid)}
+        assert float(rows[1]['Line total']) == pytest.approx(234)
+        assert float(rows[1]['Check total']) == pytest.approx(297.7)
+        assert rows[0]['Payment type'] == enums.PaymentType.CASH.value
+
+        response = await client.get(
+            app.url_path_for('checks:report:xlsx'),
+            params={'payment_type': enums.PaymentType.CASHLESS.value},
+            headers=headers,
+        )
+        assert len(list(load_workbook(io.BytesIO(response.content)).active.iter_rows())) == 1
+        response = await client.get(app.url_path_for('checks:report:xlsx'), headers=headers)
+        worksheet = load_workbook(io.BytesIO(response.content)).active
+        rows = list(worksheet.iter_rows(values_only=True))
+        assert rows[0][:3] == ('Check', 'Created at', 'Product')
+        assert [row[2] for row in rows[1:]] == ['Butter', 'Knife', 'Milk']
+        assert isinstance(rows[1][1], datetime.datetime)
+
     async def test_check_get(
             self,
             app: FastAPI,
@@ -339,6 +701,7 @@ class TestChecksViews(TestBase):
         ).execute()
         await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
         await PaymentService.repository.create(**fake_payment.dict()).execute()
+        serialize_response = mocker.spy(fastapi.routing, 'serialize_response')
         response = await client.get(
             app.url_path_for('checks:get', check_uuid=fake_check.uuid),
             headers={'Authorization': f'Bearer {fake_session.access_token}'},
@@ -347,6 +710,74 @@ class TestChecksViews(TestBase):
         assert json_data['custom_code'] == ResponseStatus.OK
         assert DefaultResponseSchema(**json_data)
         assert json_data['data']['uuid'] == str(fake_check.uuid)
+        # DefaultResponse is rendered from validated content, response_model is documentation only.
+        serialize_response.assert_not_called()
+        check = CheckService.get_schema(await CheckService.repository.get_check(fake_check.uuid))
+        assert response.content == DefaultResponseSchema(data=check).json().encode()
+
+    async def test_response_render_field_options(self) -> None:
+        class Nested(BaseSchema):
+            created_at: datetime.datetime = Field(alias='createdAt')
+
+        class Aliased(BaseSchema):
+            check_uuid: uuid.UUID = Field(alias='checkUuid')
+            secret: str = Field('hidden', exclude=True)
+            nested: Nested
+
+        content = Aliased(checkUuid=uuid.uuid4(), nested={'createdAt': datetime.datetime(2024, 4, 1, 12, 30)})
+        response = DefaultResponse(content=content)
+        assert response.body == DefaultResponseSchema(data=content).json().encode()
+        assert b'hidden' not in response.body
+
+    async def test_check_get_conditional(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_check: CheckCreateInDb,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        await CheckService.repository.create(**fake_check.dict()).execute()
+        await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
+        await PaymentService.repository.create(**fake_payment.dict()).execute()
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+        check_url = app.url_path_for('checks:get', check_uuid=fake_check.uuid)
+        response = await client.get(check_url, headers=headers)
+        assert response.status_code == 200
+        etag = response.headers['etag']
+        last_modified = response.headers['last-modified']
+
+        response = await client.get(check_url, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['etag'] == etag
+        response = await client.get(check_url, headers={**headers, 'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+        response = await client.get(check_url, headers={**headers, 'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+
+        list_url = app.url_path_for('checks:all')
+        response = await client.get(list_url, headers=headers)
+        etag = response.headers['etag']
+        assert 'last-modified' not in response.headers
+        response = await client.get(list_url, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+        await client.post(
+            app.url_path_for('check:create'),
+            json={
+                'products': [{'name': 'Bread', 'price': 10, 'quantity': 1}],
+                'payment': {'type': enums.PaymentType.CASH, 'amount': 10},
+            },
+            headers=headers,
+        )
+        response = await client.get(list_url, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json()['data']['total_count'] == 2
 
     async def test_check_get_wrong_uuid(
             self,
@@ -400,6 +831,41 @@ class TestChecksViews(TestBase):
         assert isinstance(response.text, str)
         assert response.status_code == 200
 
+    async def test_client_check_get_renders_file(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_check: CheckCreateInDb,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        await CheckService.repository.create(**fake_check.dict()).execute()
+        await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
+        await PaymentService.repository.create(**fake_payment.dict()).execute()
+        assert not ReceiptRepository.exists(fake_check.uuid)
+        response = await client.get(app.url_path_for('client:checks:get', check_uuid=fake_check.uuid))
+        assert response.status_code == 200
+        path = ReceiptRepository.get_path(fake_check.uuid)
+        with open(path, encoding='utf-8') as receipt:
+            assert receipt.read() == response.text
+        assert response.headers['etag'] == ReceiptRepository.get_etag(path)
+
+        response = await client.get(
+            app.url_path_for('client:checks:get', check_uuid=fake_check.uuid),
+            headers={'If-None-Match': response.headers['etag']},
+        )
+        assert response.status_code == 304
+
+        response = await client.get(
+            app.url_path_for('client:checks:get', check_uuid='55791d38-18a0-47b7-a806-2be7375dfcd3'),
+        )
+        assert response.json()['custom_code'] == ResponseStatus.NOT_FOUND
+        assert not ReceiptRepository.exists('55791d38-18a0-47b7-a806-2be7375dfcd3')
+
     async def test_client_check_get_without_auth(
             self,
             app: FastAPI,
@@ -423,3 +889,187 @@ class TestChecksViews(TestBase):
         assert response.headers['content-type'] == 'text/plain; charset=utf-8'
         assert isinstance(response.text, str)
         assert response.status_code == 200
+
+    async def test_check_get_cached(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        response = await client.post(
+            app.url_path_for('check:create'),
+            json={
+                'products': [
+                    {'name': product.name, 'price': product.price, 'quantity': product.quantity}
+                    for product in fake_products
+                ],
+                'payment': {'type': fake_payment.type, 'amount': fake_payment.amount},
+            },
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        created = response.json()['data']
+        assert await redis.get(f'check:{fake_user.uuid}:{created["uuid"]}')
+        assert await redis.get(f'receipt:{created["uuid"]}')
+
+        fetch = mocker.spy(CheckService.repository, 'get_check')
+        local_hits = check_cache.local_hits
+        response = await client.get(
+            app.url_path_for('checks:get', check_uuid=created['uuid']),
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        assert response.json()['data'] == created
+        assert check_cache.local_hits == local_hits + 1
+
+        os.remove(ReceiptRepository.get_path(created['uuid']))
+        receipt_cache.clear()
+        redis_hits = receipt_cache.redis_hits
+        response = await client.get(app.url_path_for('client:checks:get', check_uuid=created['uuid']))
+        assert response.status_code == 200
+        assert response.text == CheckService.generate_check_text(CheckSchema(**created))
+        assert receipt_cache.redis_hits == redis_hits + 1
+        assert fetch.call_count == 0
+
+        other_user = UserCreateInDbWithUUID(
+            uuid='0e4d5cdd-a0a4-4d1f-b1b3-6d7ac3a1e7f2',
+            name='Jane',
+            email='other@example.com',
+            hashed_password=fake_user.hashed_password,
+        )
+        await UserService.repository.create(**other_user.dict()).execute()
+        other_session = await SessionService.create_session(redis, other_user)
+        response = await client.get(
+            app.url_path_for('checks:get', check_uuid=created['uuid']),
+            headers={'Authorization': f'Bearer {other_session.access_token}'},
+        )
+        assert response.json()['custom_code'] == ResponseStatus.CHECK_NOT_FOUND
+        assert fetch.call_count == 1
+
+        response = await client.get(app.url_path_for('cache_stats'))
+        stats = response.json()['data']
+        assert stats['check']['local_hits'] == check_cache.local_hits
+        assert stats['receipt']['redis_hits'] == receipt_cache.redis_hits
+
+    async def test_check_all_cursor_pagination(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        created_at = datetime.datetime(year=2024, month=1, day=1, tzinfo=datetime.timezone.utc)
+        check_uuids = [str(uuid.uuid4()) for _ in range(12)]
+        check_created_at = [created_at + datetime.timedelta(hours=index // 2) for index in range(12)]
+        await CheckPartitionService.ensure([datetime.date(2024, 1, 1)])
+        await CheckService.repository.create(items=[
+            {
+                'uuid': check_uuid,
+                'user': str(fake_user.uuid),
+                # Two checks per timestamp, so the uuid tiebreaker is exercised.
+                'created_at': check_created_at[index],
+                'total': 10,
+                'rest': 90,
+                'product_count': 1,
+            } for index, check_uuid in enumerate(check_uuids)
+        ]).execute()
+        await ProductService.repository.create(items=[
+            {
+                'uuid': str(uuid.uuid4()), 'name': 'Bread', 'price': 10, 'quantity': 1,
+                'check': check_uuid, 'created_at': check_created_at[index],
+            }
+            for index, check_uuid in enumerate(check_uuids)
+        ]).execute()
+        await PaymentService.repository.create(items=[
+            {
+                'uuid': str(uuid.uuid4()), 'type': enums.PaymentType.CASH, 'amount': 100,
+                'check': check_uuid, 'created_at': check_created_at[index],
+            }
+            for index, check_uuid in enumerate(check_uuids)
+        ]).execute()
+        headers = {'Authorization': f'Bearer {fake_session.access_token}'}
+
+        response = await client.get(
+            app.url_path_for('checks:all'),
+            params={'pagination': 'cursor', 'page_size': 10},
+            headers=headers,
+        )
+        first_page = response.json()['data']
+        assert first_page['total_count'] is None
+        assert first_page['previous_cursor'] is None
+        assert len(first_page['results']) == 10
+
+        response = await client.get(
+            app.url_path_for('checks:all'),
+            params={'cursor': first_page['next_cursor'], 'page_size': 10},
+            headers=headers,
+        )
+        second_page = response.json()['data']
+        assert second_page['next_cursor'] is None
+        assert len(second_page['results']) == 2
+        seen = [check['uuid'] for check in first_page['results'] + second_page['results']]
+        assert sorted(seen) == sorted(check_uuids)
+        dates = [check['created_at'] for check in first_page['results'] + second_page['results']]
+        assert dates == sorted(dates, reverse=True)
+
+        response = await client.get(
+            app.url_path_for('checks:all'),
+            params={'cursor': second_page['previous_cursor'], 'page_size': 10},
+            headers=headers,
+        )
+        previous_page = response.json()['data']
+        assert previous_page['results'] == first_page['results']
+        assert previous_page['previous_cursor'] is None
+
+        response = await client.get(
+            app.url_path_for('checks:all'),
+            params={'cursor': first_page['next_cursor'], 'ordering': 'total'},
+            headers=headers,
+        )
+        assert response.json()['custom_code'] == ResponseStatus.PAGINATION_PAGE_ERROR
+
+    async def test_check_all_count_strategies(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            fake_user: UserCreateInDbWithUUID,  # noqa
+            fake_session: Session,
+            fake_check: CheckCreateInDb,
+            fake_products: List[ProductInDb],
+            fake_payment: PaymentInDb,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        await CheckService.repository.create(
+            **fake_check.dict()
+        ).execute()
+        await ProductService.repository.create(items=[fake_product.dict() for fake_product in fake_products]).execute()
+        await PaymentService.repository.create(**fake_payment.dict()).execute()
+        expected_counts = {'exact': 1, 'window': 1, 'estimated': 1, 'none': None}
+        for strategy, expected_count in expected_counts.items():
+            response = await client.get(
+                app.url_path_for('checks:all'),
+                params={'count': strategy},
+                headers={'Authorization': f'Bearer {fake_session.access_token}'},
+            )
+            json_data = response.json()
+            assert json_data['custom_code'] == ResponseStatus.OK
+            assert json_data['data']['count_strategy'] == strategy
+            assert json_data['data']['total_count'] == expected_count
+            assert json_data['data']['next'] is None
+            assert len(json_data['data']['results']) == 1
+
+        response = await client.get(
+            app.url_path_for('checks:all'),
+            params={'page': 2, 'page_size': 10},
+            headers={'Authorization': f'Bearer {fake_session.access_token}'},
+        )
+        assert response.json()['custom_code'] == ResponseStatus.PAGINATION_PAGE_ERROR
@@ -0,0 +1,48 @@
+import pytest
+from api.v1.healthcheck.config import HealthCheck
+from cache import RedisBackend
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sdk.responses import ResponseStatus
+from tests.utils import MockCacheBackend
+
+
+@pytest.mark.asyncio
+class TestHealthCheckViews:
+    async def test_redis_pool_is_shared(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            redis: MockCacheBackend,
+            mocker: MockerFixture,
+    ) -> None:
+        create_pool = mocker.patch('cache.RedisBackend.create_pool', return_value=redis)
+        for _ in range(3):
+            response = await client.get(app.url_path_for('redis_check'))
+            assert response.json()['custom_code'] == ResponseStatus.OK
+        create_pool.assert_awaited_once()
+
+    async def test_redis_pool_stats(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            mocker: MockerFixture,
+    ) -> None:
+        # Connections are opened on demand, the pool is inspected without a server.
+        backend = await RedisBackend.create_pool('redis://localhost:6379/1', max_connections=3)
+        mocker.patch('cache.RedisBackend.create_pool', return_value=backend)
+        response = await client.get(app.url_path_for('redis_pool_stats'))
+        assert response.json()['data'] == {'max_connections': 3, 'created': 0, 'in_use': 0, 'idle': 0}
+
+    async def test_partitions_check(
+            self,
+            app: FastAPI,
+            client: AsyncClient,
+            mocker: MockerFixture,
+    ) -> None:
+        response = await client.get(app.url_path_for('partitions_check'))
+        assert response.json()['data'] == HealthCheck.OK_STATUS
+        mocker.patch('sdk.partitions.MonthlyPartitions.get_months', return_value=[])
+        response = await client.get(app.url_path_for('partitions_check'))
+        assert response.json()['data'].startswith('checks has no partition for ')
@@ -1,9 +1,19 @@
+import asyncio
 import contextlib
+import fnmatch
 import os
 from argparse import Namespace
 from types import SimpleNamespace
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
 from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 from typing import Union
 
 from alembic.config import Config
@@ -44,36 +54,206 @@ def alembic_config_from_url(pg_url: Optional[str] = None) -> Config:
     return make_alembic_config(cmd_options)
 
 
+async def index_session(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    now = int(args[2])
+    index = db.setdefault(keys[0], {})
+    for member in [member for member, score in index.items() if score <= now]:
+        index.pop(member)
+    member = args[0].decode() if isinstance(args[0], bytes) else args[0]
+    index[member] = now + int(args[1])
+    return 1
+
+
+async def create_session(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    db[keys[0]] = args[0]
+    return await index_session(db, [keys[1]], [keys[0], args[1], args[2]])
+
+
+async def revoke_session(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    now = int(args[2])
+    revocations = db.setdefault(keys[0], {})
+    for field in [field for field, value in revocations.items() if field != 'ver' and int(value) <= now]:
+        revocations.pop(field)
+    if int(args[1]) > now:
+        revocations[args[0]] = int(args[1])
+    return 1
+
+
+async def rotate_session(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    revocations = db.get(keys[0], {})
+    if int(revocations.get('ver', 0)) > int(args[2]) or args[0] in revocations or keys[1] not in db:
+        return 0
+    await revoke_session(db, [keys[0]], [args[0], args[1], args[5]])
+    db.pop(keys[1])
+    db.get(keys[3], {}).pop(keys[1], None)
+    db[keys[2]] = args[3]
+    return await index_session(db, [keys[3]], [keys[2], args[4], args[5]])
+
+
+async def release_marker(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    if db.get(keys[0]) != args[0]:
+        return 0
+    db.pop(keys[0])
+    return 1
+
+
+async def extend_marker(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    return int(db.get(keys[0]) == args[0])
+
+
+async def store_response(db: Dict[str, Any], keys: Sequence[str], args: Sequence[Any]) -> int:
+    if db.get(keys[0]) != args[0]:
+        return 0
+    db[keys[0]] = args[1]
+    return 1
+
+
+class MockPipeline:
+    """Queues calls of MockCacheBackend methods, runs them on execute()"""
+
+    def __init__(self, backend: 'MockCacheBackend') -> None:
+        self._backend = backend
+        self._commands = []
+        self.results = []
+
+    def __getattr__(self, name: str) -> Callable[..., 'MockPipeline']:
+        command = getattr(self._backend, name)
+
+        def queue(*args, **kwargs) -> 'MockPipeline':
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> None:
+        self.results = [await command(*args, **kwargs) for command, args, kwargs in self._commands]
+
+
 class MockCacheBackend:
     """Mock Cache Backend"""
 
+    # Python versions of the RedisScripts, by name.
+    scripts: Dict[str, Callable[..., Awaitable[Any]]] = {
+        'index_session': index_session,
+        'create_session': create_session,
+        'revoke_session': revoke_session,
+        'idempotency_release': release_marker,
+        'idempotency_extend': extend_marker,
+        'idempotency_store': store_response,
+        'rotate_session': rotate_session,
+    }
+
     def __init__(self) -> None:
         self._db = {}
+        self.published: List[Tuple[str, str]] = []
+        self.subscribers: Dict[str, List[asyncio.Queue]] = {}
 
     async def get(self, key: str) -> Optional[str]:
         return self._db.get(key)
 
-    async def delete(self, key: str) -> None:
-        with contextlib.suppress(KeyError):
-            self._db.pop(key)
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        return [self._db.get(key) for key in keys]
+
+    async def delete(self, *keys: Union[str, bytes]) -> None:
+        for key in keys:
+            with contextlib.suppress(KeyError):
+                self._db.pop(key.decode() if isinstance(key, bytes) else key)
 
     async def keys(self, match: str) -> Iterable[str]:
         keywords = match.split('*')
         return [k for k in self._db.keys() if all(kw in k for kw in keywords)]
 
-    async def set(self, key: str, value: Union[str, bytes, int], expire: int) -> None:
+    async def scan(self, match: str, count: int = 1000) -> AsyncIterator[List[bytes]]:
+        keys = [key.encode() for key in self._db if fnmatch.fnmatchcase(key, match)]
+        for start in range(0, len(keys), count):
+            yield keys[start:start + count]
+
+    async def zrangebyscore(
+        self,
+        key: str,
+        min_score: float = float('-inf'),
+        max_score: float = float('inf'),
+    ) -> List[Tuple[bytes, float]]:
+        members = sorted(self._db.get(key, {}).items(), key=lambda member: member[1])
+        return [(member.encode(), float(score)) for member, score in members if min_score <= score <= max_score]
+
+    async def zscan(self, key: str, match: str) -> List[Tuple[bytes, float]]:
+        members = self._db.get(key, {}).items()
+        return [(member.encode(), float(score)) for member, score in members if fnmatch.fnmatchcase(member, match)]
+
+    async def zrem(self, key: str, *members: Union[str, bytes]) -> None:
+        index = self._db.get(key, {})
+        for member in members:
+            index.pop(member.decode() if isinstance(member, bytes) else member, None)
+
+    async def hget(self, key: str, field: str) -> Optional[bytes]:
+        value = self._db.get(key, {}).get(field)
+        return None if value is None else str(value).encode()
+
+    async def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        return {field.encode(): str(value).encode() for field, value in self._db.get(key, {}).items()}
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        values = self._db.setdefault(key, {})
+        values[field] = int(values.get(field, 0)) + amount
+        return values[field]
+
+    async def set(self, key: str, value: Union[str, bytes, int], expire: int = 0, nx: bool = False) -> bool:
+        if nx and key in self._db:
+            return False
         self._db[key] = value
+        return True
+
+    async def setnx(self, key: str, value: Union[str, bytes, int], expire: int) -> bool:
+        return await self.set(key, value, expire=expire, nx=True)
+
+    async def mset(self, values: Dict[str, Union[str, bytes, int]], expire: int = 0) -> None:
+        self._db.update(values)
+
+    async def expire(self, key: str, expire: int) -> bool:
+        return key in self._db
 
-    async def setnx(self, key: str, value: Union[str, bytes, int], expire: int) -> None:
-        v = self._db.get(key)  # pragma: no cover
-        if v is None:  # pragma: no cover
-            self._db[key] = value  # pragma: no cover
+    async def ttl(self, key: Union[str, bytes]) -> int:
+        # Expiry is not kept, stored keys live as long as a session.
+        key = key.decode() if isinstance(key, bytes) else key
+        return settings.JWT_REFRESH_TOKEN_EXP_DELTA_MINUTES * 60 if key in self._db else -2
+
+    @contextlib.asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator[MockPipeline]:
+        pipeline = MockPipeline(self)
+        yield pipeline
+        await pipeline.execute()
+
+    async def run_script(self, name: str, keys: Sequence[str] = (), args: Sequence[Any] = ()) -> Any:
+        return await self.scripts[name](self._db, keys, args)
 
     async def incr(self, key: str) -> str:
         v = self._db.get(key)
         if v is not None:
             self._db[key] = int(v) + 1
 
+    async def publish(self, channel: str, message: Union[str, bytes, int]) -> int:
+        self.published.append((channel, str(message)))
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait(message if isinstance(message, bytes) else str(message).encode())
+        return len(queues)
+
+    async def listen(
+            self,
+            channel: str,
+            on_subscribe: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(channel, []).append(queue)
+        try:
+            if on_subscribe is not None:
+                on_subscribe()
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers[channel].remove(queue)
+
     async def ping(self) -> bool:
         return True
 